@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, documents, summaries, billing, organizations, activity, analytics
+from app.api.v1.endpoints import auth, users, documents, summaries, billing, organizations, activity, analytics, search, questions
 
 api_router = APIRouter()
 
@@ -8,6 +8,8 @@ api_router.include_router(users.router, prefix="/users", tags=["Users"])
 api_router.include_router(organizations.router, prefix="/organizations", tags=["Organizations"])
 api_router.include_router(documents.router, prefix="/documents", tags=["Documents"])
 api_router.include_router(summaries.router, prefix="/summaries", tags=["Summaries"])
+api_router.include_router(questions.router, prefix="/questions", tags=["Questions"])
 api_router.include_router(billing.router, prefix="/billing", tags=["Billing"])
 api_router.include_router(activity.router, prefix="/activity", tags=["Activity"])
 api_router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
+api_router.include_router(search.router, prefix="/search", tags=["Search"])
@@ -1,43 +1,153 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime, timezone
+import base64
 from app.core.database import get_db
 from app.core.deps import get_current_user
 from app.models.user import User
-from app.models.activity_log import ActivityLog
+from app.models.activity_log import ActivityType
 from app.schemas.activity_log import ActivityLogResponse
+from app.services.activity_archive import activity_log_sources, retention_cutoff
 
 router = APIRouter()
 
 
+def _to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; normalise client-supplied ones to match."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _sort_key(db: Session, column):
+    """created_at as pages are ordered and compared.
+
+    SQLite keeps timestamps as text: to the second from the server default, to
+    the microsecond when written from Python. Compared as they are, the cursor
+    row's own second never matches; both are normalised to milliseconds.
+    """
+    if db.bind.dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:%f", column)
+    return column
+
+
+def _sort_value(db: Session, created_at: datetime):
+    """A cursor's timestamp in the form _sort_key compares it to."""
+    if db.bind.dialect.name == "sqlite":
+        return f"{created_at:%Y-%m-%d %H:%M:%S}.{created_at.microsecond // 1000:03d}"
+    return created_at
+
+
+def _encode_cursor(created_at, activity_id: str) -> str:
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = f"{created_at}|{activity_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, activity_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return _to_naive_utc(datetime.fromisoformat(created_at)), activity_id
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
 @router.get("/", response_model=List[ActivityLogResponse])
 async def list_activity_logs(
-    limit: int = 50,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    action_type: Optional[ActivityType] = None,
+    user_id: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    target_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get activity logs for the current organization."""
-    activities = db.query(ActivityLog).options(
-        joinedload(ActivityLog.user)
-    ).filter(
-        ActivityLog.organization_id == current_user.organization_id
-    ).order_by(
-        ActivityLog.created_at.desc()
-    ).limit(limit).all()
-    
-    # Add user name to response
-    result = []
-    for activity in activities:
-        activity_dict = {
-            "id": activity.id,
-            "user_id": activity.user_id,
-            "organization_id": activity.organization_id,
-            "action_type": activity.action_type,
-            "target": activity.target,
-            "details": activity.details,
-            "created_at": activity.created_at,
-            "user_name": activity.user.full_name if activity.user else "Unknown User"
+    """Get activity logs for the current organization, newest first.
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
+    start_date = _to_naive_utc(start_date)
+    end_date = _to_naive_utc(end_date)
+
+    # Bounding by the retention window lets PostgreSQL prune old partitions
+    # and keeps SQLite reads on the hot table whenever possible
+    since = retention_cutoff(current_user.organization.document_retention_days)
+    if start_date is not None and (since is None or start_date > since):
+        since = start_date
+
+    after = _decode_cursor(cursor) if cursor else None
+
+    rows = []
+    for model in activity_log_sources(db, since):
+        sort_key = _sort_key(db, model.created_at)
+        # Project only the columns the response needs, plus the uploader's name
+        query = db.query(
+            model.id,
+            model.user_id,
+            model.organization_id,
+            model.action_type,
+            model.target,
+            model.details,
+            model.created_at,
+            sort_key.label("sort_key"),
+            User.full_name.label("user_name")
+        ).outerjoin(
+            User, User.id == model.user_id
+        ).filter(
+            model.organization_id == current_user.organization_id
+        )
+
+        if action_type is not None:
+            query = query.filter(model.action_type == action_type)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        if since is not None:
+            query = query.filter(model.created_at >= since)
+        if end_date is not None:
+            query = query.filter(model.created_at < end_date)
+        if target_prefix:
+            escaped = target_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.filter(model.target.like(f"{escaped}%", escape="\\"))
+        if after is not None:
+            after_created_at, after_id = after
+            after_created_at = _sort_value(db, after_created_at)
+            query = query.filter(or_(
+                sort_key < after_created_at,
+                and_(sort_key == after_created_at, model.id < after_id)
+            ))
+
+        # Fetch one extra row to know whether another page exists
+        rows.extend(query.order_by(
+            sort_key.desc(),
+            model.id.desc()
+        ).limit(limit + 1 - len(rows)).all())
+
+        if len(rows) > limit:
+            break
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].sort_key, rows[-1].id)
+
+    return [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "organization_id": row.organization_id,
+            "action_type": row.action_type,
+            "target": row.target,
+            "details": row.details,
+            "created_at": row.created_at,
+            "user_name": row.user_name or "Unknown User"
         }
-        result.append(activity_dict)
-    
-    return result
+        for row in rows
+    ]
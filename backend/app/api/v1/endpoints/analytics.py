@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.core.database import get_db
@@ -6,60 +6,71 @@ from app.core.deps import get_current_user
 from app.models.user import User
 from app.models.document import Document
 from app.models.summary import Summary
+from app.services.tenant_cache import tenant_cached_response
 
 router = APIRouter()
 
 
 @router.get("/stats")
 async def get_dashboard_stats(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get dashboard statistics for the organization."""
+    """Get dashboard statistics for the organization.
     
-    # Count total documents
-    documents_processed = db.query(func.count(Document.id)).filter(
-        Document.organization_id == current_user.organization_id
-    ).scalar() or 0
-    
-    # Count summaries this month
+    Send the ETag back as If-None-Match to get 304 Not Modified while nothing changed.
+    """
     from datetime import datetime, timedelta
     first_day_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
-    summaries_this_month = db.query(func.count(Summary.id)).filter(
-        Summary.organization_id == current_user.organization_id,
-        Summary.created_at >= first_day_of_month
-    ).scalar() or 0
-    
-    # Get organization to calculate remaining summaries
-    from app.models.organization import Organization
-    org = db.query(Organization).filter(Organization.id == current_user.organization_id).first()
-    
-    summaries_limit = org.summaries_limit if org else 100
-    summaries_remaining = max(0, summaries_limit - summaries_this_month)
-    
-    # Count active team members
-    active_team_members = db.query(func.count(User.id)).filter(
-        User.organization_id == current_user.organization_id,
-        User.is_active == True
-    ).scalar() or 0
-    
-    # Calculate storage used (sum of all document file sizes)
-    total_bytes = db.query(func.sum(Document.file_size)).filter(
-        Document.organization_id == current_user.organization_id
-    ).scalar() or 0
-    
-    storage_used_gb = total_bytes / (1024 * 1024 * 1024)  # Convert bytes to GB
-    storage_limit_gb = 10.0  # Default 10GB limit, can be made dynamic based on plan
-    
-    return {
-        "documents_processed": documents_processed,
-        "summaries_this_month": summaries_this_month,
-        "summaries_remaining": summaries_remaining,
-        "active_team_members": active_team_members,
-        "storage_used_gb": round(storage_used_gb, 2),
-        "storage_limit_gb": storage_limit_gb
-    }
+    def build():
+        # Count total documents
+        documents_processed = db.query(func.count(Document.id)).filter(
+            Document.organization_id == current_user.organization_id
+        ).scalar() or 0
+        
+        # Count summaries this month
+        summaries_this_month = db.query(func.count(Summary.id)).filter(
+            Summary.organization_id == current_user.organization_id,
+            Summary.created_at >= first_day_of_month
+        ).scalar() or 0
+        
+        # Get organization to calculate remaining summaries
+        from app.models.organization import Organization
+        org = db.query(Organization).filter(Organization.id == current_user.organization_id).first()
+        
+        summaries_limit = org.summaries_limit if org else 100
+        summaries_remaining = max(0, summaries_limit - summaries_this_month)
+        
+        # Count active team members
+        active_team_members = db.query(func.count(User.id)).filter(
+            User.organization_id == current_user.organization_id,
+            User.is_active == True
+        ).scalar() or 0
+        
+        # Calculate storage used (sum of all document file sizes)
+        total_bytes = db.query(func.sum(Document.file_size)).filter(
+            Document.organization_id == current_user.organization_id
+        ).scalar() or 0
+        
+        storage_used_gb = total_bytes / (1024 * 1024 * 1024)  # Convert bytes to GB
+        storage_limit_gb = 10.0  # Default 10GB limit, can be made dynamic based on plan
+        
+        return {
+            "documents_processed": documents_processed,
+            "summaries_this_month": summaries_this_month,
+            "summaries_remaining": summaries_remaining,
+            "active_team_members": active_team_members,
+            "storage_used_gb": round(storage_used_gb, 2),
+            "storage_limit_gb": storage_limit_gb
+        }
+    
+    # Monthly counts start over on the 1st without any write, so the month is part of the ETag
+    return tenant_cached_response(
+        request, current_user.organization_id, "analytics.stats",
+        {"month": first_day_of_month.strftime("%Y-%m")}, build
+    )
 
 
 @router.get("/recent-documents")
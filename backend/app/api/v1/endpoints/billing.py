@@ -2,12 +2,17 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.deps import get_current_user, get_current_admin_user
+from app.core.metrics import record_cache_lookup
 from app.models.user import User
 from app.models.organization import Organization
 from app.schemas.billing import StripeCheckoutSession, SubscriptionResponse
-from app.services.stripe_service import create_checkout_session, create_stripe_customer, handle_webhook_event
+from app.services.stripe_service import create_checkout_session, create_stripe_customer
+from app.services.stripe_webhooks import verify_webhook_event, record_webhook_event
+from app.services.tenant_cache import tenant_cached_response
+from app.services.invoice_cache import (
+    get_cached_invoices, is_stale, refresh_failed_recently, refresh_invoices, schedule_refresh
+)
 from app.core.config import settings
-import stripe
 
 router = APIRouter()
 
@@ -57,28 +62,38 @@ async def create_subscription_checkout(
 
 @router.get("/subscription", response_model=SubscriptionResponse)
 async def get_subscription_status(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get current subscription status."""
-    organization = db.query(Organization).filter(
-        Organization.id == current_user.organization_id
-    ).first()
-    
-    if not organization:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Organization not found"
-        )
-    
-    return {
-        "organization_id": organization.id,
-        "subscription_status": organization.subscription_status,
-        "plan_type": organization.plan_type,
-        "stripe_subscription_id": organization.stripe_subscription_id,
-        "summaries_limit": organization.summaries_limit,
-        "summaries_used_current_month": organization.summaries_used_current_month
-    }
+    """Get current subscription status.
+    
+    Send the ETag back as If-None-Match to get 304 Not Modified while nothing changed.
+    """
+    def build():
+        organization = db.query(Organization).filter(
+            Organization.id == current_user.organization_id
+        ).first()
+        
+        if not organization:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Organization not found"
+            )
+        
+        return {
+            "organization_id": organization.id,
+            "subscription_status": organization.subscription_status,
+            "plan_type": organization.plan_type,
+            "stripe_subscription_id": organization.stripe_subscription_id,
+            "summaries_limit": organization.summaries_limit,
+            "summaries_used_current_month": organization.summaries_used_current_month
+        }
+    
+    return tenant_cached_response(
+        request, current_user.organization_id, "billing.subscription", {}, build,
+        response_model=SubscriptionResponse
+    )
 
 
 @router.post("/cancel-subscription")
@@ -113,7 +128,12 @@ async def cancel_subscription(
 
 @router.post("/webhook")
 async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
-    """Handle Stripe webhook events."""
+    """Receive Stripe webhook events.
+    
+    Events are verified and recorded, then acknowledged right away; the webhook
+    worker applies them in the background. Retried deliveries are recognised by
+    their event ID and acknowledged without being queued again.
+    """
     payload = await request.body()
     sig_header = request.headers.get('stripe-signature')
     
@@ -123,15 +143,18 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
             detail="Missing stripe-signature header"
         )
     
-    result = await handle_webhook_event(payload, sig_header, db)
+    event = verify_webhook_event(payload, sig_header)
     
-    if "error" in result:
+    if "error" in event:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result["error"]
+            detail=event["error"]
         )
     
-    return result
+    if not record_webhook_event(db, event, payload):
+        return {"status": "duplicate"}
+    
+    return {"status": "queued"}
 
 
 @router.get("/invoices")
@@ -154,26 +177,16 @@ async def get_invoices(
     if not organization.stripe_customer_id:
         return []
     
-    try:
-        # Fetch invoices from Stripe
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-        invoices = stripe.Invoice.list(
-            customer=organization.stripe_customer_id,
-            limit=10
-        )
-        
-        result = []
-        for invoice in invoices.data:
-            result.append({
-                "id": invoice.id,
-                "date": invoice.created,
-                "amount": invoice.amount_paid / 100,  # Convert cents to dollars
-                "status": invoice.status,
-                "downloadUrl": invoice.invoice_pdf if hasattr(invoice, 'invoice_pdf') else None
-            })
-        
-        return result
-    except Exception as e:
-        # If Stripe API fails, return empty list instead of error
-        print(f"Error fetching invoices: {e}")
-        return []
+    # Serve the cached copy; only the very first view waits for Stripe, and not
+    # again soon after that failed (the periodic refresh keeps retrying)
+    if organization.invoices_synced_at is None:
+        record_cache_lookup("invoices", "miss")
+        if not refresh_failed_recently(organization.id):
+            await refresh_invoices(organization.id, organization.stripe_customer_id)
+    elif is_stale(organization):
+        record_cache_lookup("invoices", "stale")
+        schedule_refresh(organization.id, organization.stripe_customer_id)
+    else:
+        record_cache_lookup("invoices", "hit")
+    
+    return get_cached_invoices(db, organization.id)
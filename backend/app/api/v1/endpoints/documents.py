@@ -1,55 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import hashlib
 import uuid
 import os
 from app.core.database import get_db
 from app.core.deps import get_current_user
 from app.core.config import settings
+from app.core.http_cache import RangeNotSatisfiable, http_date, is_not_modified, parse_range
+from app.core.metrics import record_cache_lookup
+from app.core.tracing import set_span_attributes, span, traced
 from app.models.user import User
 from app.models.document import Document
 from app.schemas.document import DocumentResponse, DocumentWithText
-from app.services.document_service import save_uploaded_file, extract_text_from_file, delete_file
+from app.services.document_service import save_uploaded_file, extract_text_from_file, delete_file, resolve_file_type
+from app.services.search import index_documents, remove_documents
+from app.services.vector_index import embed_document, remove_document_embeddings
+from app.services.storage import get_storage
+from app.services.summary_pipeline import enqueue_auto_summary
+from app.services.tenant_cache import tenant_cached_response
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+MAX_VERSIONS = 100  # Longest version history returned
 
 router = APIRouter()
 
 
 @router.post("/upload", response_model=DocumentResponse)
+@traced("upload_document")
 async def upload_document(
     file: UploadFile = File(...),
+    previous_version_id: Optional[str] = Form(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Upload a document."""
+    """Upload a document, optionally as a new version of an existing one."""
     # Validate file type
-    if file.content_type not in settings.allowed_file_types_list:
+    file_type = resolve_file_type(file.content_type, file.filename)
+    if file_type not in settings.allowed_file_types_list:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File type not supported. Allowed types: {settings.ALLOWED_FILE_TYPES}"
         )
     
-    # Read file content
-    file_content = await file.read()
-    file_size = len(file_content)
+    previous_version = None
+    if previous_version_id:
+        previous_version = db.query(Document).filter(
+            Document.id == previous_version_id,
+            Document.organization_id == current_user.organization_id
+        ).first()
+        if not previous_version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Previous version not found"
+            )
     
-    # Validate file size
-    if file_size > settings.max_file_size_bytes:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large. Max size: {settings.MAX_FILE_SIZE_MB}MB"
-        )
+    # Stream the upload into storage, enforcing the size limit as bytes arrive
+    file_size = 0
+    content_hash = hashlib.sha256()
     
-    # Generate unique filename
+    async def read_chunks():
+        nonlocal file_size
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            content_hash.update(chunk)
+            if file_size > settings.max_file_size_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"File too large. Max size: {settings.MAX_FILE_SIZE_MB}MB"
+                )
+            yield chunk
+    
+    # Generate unique filename, stored under an organization-specific prefix
     file_extension = os.path.splitext(file.filename)[1]
     unique_filename = f"{uuid.uuid4()}{file_extension}"
-    
-    # Create organization-specific upload directory
-    org_upload_dir = os.path.join(settings.UPLOAD_DIR, current_user.organization_id)
+    storage_key = f"{current_user.organization_id}/{unique_filename}"
     
     # Save file
     try:
-        file_path = await save_uploaded_file(file_content, unique_filename, org_upload_dir)
+        file_path = await save_uploaded_file(read_chunks(), storage_key)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -61,25 +92,33 @@ async def upload_document(
         filename=unique_filename,
         original_filename=file.filename,
         file_path=file_path,
-        file_type=file.content_type,
+        file_type=file_type,
         file_size=file_size,
+        content_hash=content_hash.hexdigest(),
         organization_id=current_user.organization_id,
         uploaded_by=current_user.id,
+        version=previous_version.version + 1 if previous_version else 1,
+        previous_version_id=previous_version.id if previous_version else None,
         status="uploaded"
     )
     
-    db.add(document)
-    db.commit()
-    db.refresh(document)
+    with span("db.commit"):
+        db.add(document)
+        db.commit()
+        db.refresh(document)
+    set_span_attributes(**{"document.id": document.id, "document.size": file_size})
     
     # Extract text in background (simplified - should use Celery)
     try:
-        extracted_text, page_count = await extract_text_from_file(file_path, file.content_type)
+        async with get_storage(file_path).local_path(file_path) as local_path:
+            extracted_text, page_count = await extract_text_from_file(local_path, file_type)
         document.extracted_text = extracted_text
         document.page_count = page_count
         document.status = "completed"
-        db.commit()
-        db.refresh(document)
+        index_documents(db, [document.id])
+        with span("db.commit", **{"document.id": document.id}):
+            db.commit()
+            db.refresh(document)
     except Exception as e:
         print(f"Text extraction error: {str(e)}")
         document.status = "failed"
@@ -87,22 +126,39 @@ async def upload_document(
         db.commit()
         db.refresh(document)
     
+    if document.status == "completed" and settings.EMBEDDINGS_ENABLED:
+        try:
+            await embed_document(db, document)
+        except Exception as e:
+            # The document stays usable; it just won't show up in semantic search
+            print(f"Embedding error: {str(e)}")
+            db.rollback()
+    
+    # Summarized in the background for organizations with auto_generate_summaries on
+    enqueue_auto_summary(db, document)
+    
     return document
 
 
 @router.get("/", response_model=List[DocumentResponse])
 async def list_documents(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100
 ):
-    """List all documents in the organization."""
-    documents = db.query(Document).filter(
-        Document.organization_id == current_user.organization_id
-    ).offset(skip).limit(limit).all()
+    """List all documents in the organization.
     
-    return documents
+    Send the ETag back as If-None-Match to get 304 Not Modified while nothing changed.
+    """
+    return tenant_cached_response(
+        request, current_user.organization_id, "documents.list", {"skip": skip, "limit": limit},
+        lambda: db.query(Document).filter(
+            Document.organization_id == current_user.organization_id
+        ).offset(skip).limit(limit).all(),
+        response_model=List[DocumentResponse]
+    )
 
 
 @router.get("/{document_id}", response_model=DocumentWithText)
@@ -126,6 +182,46 @@ async def get_document(
     return document
 
 
+@router.get("/{document_id}/versions", response_model=List[DocumentResponse])
+async def list_document_versions(
+    document_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """All versions of a document, newest first."""
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.organization_id == current_user.organization_id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    versions = [document]
+    # Walk back to the first version, then forward to the latest
+    while versions[-1].previous_version_id and len(versions) < MAX_VERSIONS:
+        previous = db.query(Document).filter(
+            Document.id == versions[-1].previous_version_id,
+            Document.organization_id == current_user.organization_id
+        ).first()
+        if previous is None:
+            break
+        versions.append(previous)
+    while len(versions) < MAX_VERSIONS:
+        newer = db.query(Document).filter(
+            Document.previous_version_id == versions[0].id,
+            Document.organization_id == current_user.organization_id
+        ).order_by(Document.created_at.desc()).first()
+        if newer is None:
+            break
+        versions.insert(0, newer)
+    
+    return versions
+
+
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: str,
@@ -147,7 +243,14 @@ async def delete_document(
     # Delete file from disk
     await delete_file(document.file_path)
     
+    # Later versions now follow this one's predecessor
+    db.query(Document).filter(
+        Document.previous_version_id == document.id
+    ).update({Document.previous_version_id: document.previous_version_id}, synchronize_session=False)
+    
     # Delete from database
+    remove_documents(db, [document.id])
+    remove_document_embeddings(db, document.organization_id, [document.id])
     db.delete(document)
     db.commit()
     
@@ -157,10 +260,16 @@ async def delete_document(
 @router.get("/{document_id}/download")
 async def download_document(
     document_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Download/view a document file."""
+    """Download/view a document file.
+    
+    Supports conditional requests (If-None-Match / If-Modified-Since) and single
+    byte ranges, so viewers can fetch a file incrementally and browsers can reuse
+    their cached copy.
+    """
     document = db.query(Document).filter(
         Document.id == document_id,
         Document.organization_id == current_user.organization_id
@@ -172,14 +281,87 @@ async def download_document(
             detail="Document not found"
         )
     
-    if not os.path.exists(document.file_path):
+    storage = get_storage(document.file_path)
+    
+    async def check_file_exists():
+        if not await storage.exists(document.file_path):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="File not found in storage"
+            )
+    
+    # Documents uploaded before content hashing get theirs computed once, on first download.
+    # With a hash, revalidations below are answered without touching storage.
+    file_checked = False
+    if not document.content_hash:
+        await check_file_exists()
+        file_checked = True
+        content_hash = hashlib.sha256()
+        async for chunk in storage.open(document.file_path):
+            content_hash.update(chunk)
+        document.content_hash = content_hash.hexdigest()
+        db.commit()
+    
+    etag = f'"{document.content_hash}"'
+    cache_headers = {
+        "etag": etag,
+        "last-modified": http_date(document.created_at),
+        "cache-control": f"private, max-age={settings.DOWNLOAD_CACHE_MAX_AGE_SECONDS}",
+    }
+    
+    not_modified = is_not_modified(request, etag, document.created_at)
+    if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+        # Revalidations of a copy the client already holds
+        record_cache_lookup("document_download", "hit" if not_modified else "miss")
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    
+    if not file_checked:
+        await check_file_exists()
+    
+    try:
+        byte_range = parse_range(request, document.file_size, etag)
+    except RangeNotSatisfiable as e:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"content-range": f"bytes */{e.size}"}
+        )
+    
+    return await storage.file_response(
+        document.file_path,
+        document.original_filename,
+        document.file_type,
+        byte_range=byte_range,
+        headers=cache_headers
+    )
+
+
+@router.get("/{document_id}/download-url")
+async def get_download_url(
+    document_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get a time-limited direct download URL, when the storage backend supports one."""
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.organization_id == current_user.organization_id
+    ).first()
+    
+    if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found on disk"
+            detail="Document not found"
         )
     
-    return FileResponse(
-        path=document.file_path,
-        filename=document.original_filename,
-        media_type=document.file_type
+    url = get_storage(document.file_path).presigned_url(
+        document.file_path,
+        document.original_filename,
+        document.file_type
     )
+    
+    return {
+        "url": url or f"{settings.BACKEND_URL}/api/documents/{document.id}/download",
+        "direct": url is not None,
+        "expires_in": settings.S3_PRESIGNED_URL_EXPIRE_SECONDS if url else None
+    }
@@ -4,9 +4,12 @@ from app.core.database import get_db
 from app.core.deps import get_current_user, get_current_admin_user
 from app.models.user import User
 from app.models.organization import Organization
+from app.models.chunk_summary import ChunkSummary
 from app.models.activity_log import ActivityType
 from app.schemas.organization import OrganizationResponse, OrganizationUpdate, OrganizationCreate
 from app.services.activity_logger import log_activity
+from app.services.search import remove_organization
+from app.services.vector_index import remove_organization_embeddings
 
 router = APIRouter()
 
@@ -128,6 +131,9 @@ async def delete_organization(
     org_name = organization.name
     
     # Delete the organization (cascade will handle related data)
+    remove_organization(db, organization.id)
+    remove_organization_embeddings(db, organization.id)
+    db.query(ChunkSummary).filter(ChunkSummary.organization_id == organization.id).delete(synchronize_session=False)
     db.delete(organization)
     db.commit()
     
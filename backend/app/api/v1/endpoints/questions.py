@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.deps import get_current_user
+from app.core.tracing import set_span_attributes, traced
+from app.models.user import User
+from app.models.document import Document
+from app.models.organization import Organization
+from app.schemas.question import AnswerResponse, QuestionCreate
+from app.services.document_qa import answer_document_question
+from app.services.llm_router import LLMUnavailable
+from app.services.llm_scheduler import LLMRateLimited, set_llm_tenant
+
+EXCERPT_CHARS = 300
+
+router = APIRouter()
+
+
+@router.post("/", response_model=AnswerResponse)
+@traced("ask_question")
+async def ask_question(
+    question_in: QuestionCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Answer a question about a document from its most relevant passages."""
+    set_span_attributes(**{"document.id": question_in.document_id})
+    
+    document = db.query(Document).filter(
+        Document.id == question_in.document_id,
+        Document.organization_id == current_user.organization_id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    if document.status != "completed" or not document.extracted_text:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Document text not available"
+        )
+    
+    plan_type = db.query(Organization.plan_type).filter(
+        Organization.id == current_user.organization_id
+    ).scalar()
+    set_llm_tenant(current_user.organization_id, plan_type)
+    try:
+        answer, excerpts, cached = await answer_document_question(db, document, question_in.question)
+    except LLMRateLimited as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": e.retry_after_header}
+        )
+    except LLMUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": e.retry_after_header}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to answer question: {str(e)}"
+        )
+    
+    return {
+        "id": answer.id,
+        "document_id": answer.document_id,
+        "question": answer.question,
+        "answer": answer.answer,
+        "sources": [
+            {"chunk_index": excerpt.chunk_index, "excerpt": excerpt.text[:EXCERPT_CHARS]}
+            for excerpt in excerpts
+        ],
+        "tokens_used": answer.tokens_used,
+        "cached": cached,
+        "created_at": answer.created_at,
+    }
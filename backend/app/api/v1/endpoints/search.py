@@ -0,0 +1,161 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.core.database import get_db
+from app.core.deps import get_current_user
+from app.core.tracing import span
+from app.models.user import User
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.schemas.search import SearchResult, SemanticSearchResult
+from app.services.search import InvalidCursor, decode_cursor, encode_cursor, is_supported, search_documents
+from app.services.vector_index import ChunkHit, embed_query, get_index, nearest_documents
+
+EXCERPT_CHARS = 300
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[SearchResult])
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Search the organization's documents and summaries, best matches first.
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
+    if not is_supported(db):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Search is not available on this database"
+        )
+    
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    # Fetch one extra hit to know whether another page exists
+    with span("search.query", **{"search.limit": limit}):
+        hits = search_documents(db, current_user.organization_id, q, limit + 1, after)
+    if len(hits) > limit:
+        hits = hits[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(hits[-1])
+    
+    documents = {
+        row.id: row for row in db.query(
+            Document.id,
+            Document.original_filename,
+            Document.file_type,
+            Document.page_count,
+            Document.created_at
+        ).filter(
+            Document.id.in_([hit.document_id for hit in hits]),
+            Document.organization_id == current_user.organization_id
+        ).all()
+    } if hits else {}
+    
+    return [
+        {
+            "document_id": hit.document_id,
+            "original_filename": documents[hit.document_id].original_filename,
+            "file_type": documents[hit.document_id].file_type,
+            "page_count": documents[hit.document_id].page_count,
+            "created_at": documents[hit.document_id].created_at,
+            "score": hit.score,
+            "snippet": hit.snippet,
+        }
+        for hit in hits
+        if hit.document_id in documents
+    ]
+
+
+def _semantic_results(db: Session, organization_id: str, hits: List[ChunkHit]) -> List[dict]:
+    """Attach document details and an excerpt of each hit's chunk, cut from the text by the database."""
+    if not hits:
+        return []
+    rows = {
+        row.id: row for row in db.query(
+            DocumentChunk.id,
+            Document.id.label("document_id"),
+            Document.original_filename,
+            Document.file_type,
+            Document.page_count,
+            Document.created_at,
+            func.substr(
+                Document.extracted_text,
+                DocumentChunk.start_offset + 1,
+                case(
+                    (DocumentChunk.end_offset - DocumentChunk.start_offset < EXCERPT_CHARS,
+                     DocumentChunk.end_offset - DocumentChunk.start_offset),
+                    else_=EXCERPT_CHARS
+                )
+            ).label("excerpt")
+        ).join(
+            Document, Document.id == DocumentChunk.document_id
+        ).filter(
+            DocumentChunk.id.in_([hit.chunk_id for hit in hits]),
+            Document.organization_id == organization_id
+        ).all()
+    }
+    return [
+        {
+            "document_id": hit.document_id,
+            "original_filename": rows[hit.chunk_id].original_filename,
+            "file_type": rows[hit.chunk_id].file_type,
+            "page_count": rows[hit.chunk_id].page_count,
+            "created_at": rows[hit.chunk_id].created_at,
+            "score": hit.score,
+            "excerpt": rows[hit.chunk_id].excerpt or "",
+        }
+        for hit in hits
+        if hit.chunk_id in rows
+    ]
+
+
+@router.get("/semantic", response_model=List[SemanticSearchResult])
+async def semantic_search(
+    q: str = Query(..., min_length=1, max_length=2000),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Find the organization's documents whose content is closest in meaning to the query."""
+    hits = await nearest_documents(db, current_user.organization_id, await embed_query(q), limit)
+    return _semantic_results(db, current_user.organization_id, hits)
+
+
+@router.get("/similar/{document_id}", response_model=List[SemanticSearchResult])
+async def similar_documents(
+    document_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Find other documents in the organization like this one."""
+    document = db.query(Document.id).filter(
+        Document.id == document_id,
+        Document.organization_id == current_user.organization_id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    query = get_index(db, current_user.organization_id).document_vector(document_id)
+    if query is None:
+        return []
+    
+    hits = await nearest_documents(db, current_user.organization_id, query, limit, exclude_document_ids=[document_id])
+    return _semantic_results(db, current_user.organization_id, hits)
@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
 from app.core.deps import get_current_user
+from app.core.tracing import set_span_attributes, span, traced
 from app.models.user import User
 from app.models.document import Document
 from app.models.summary import Summary
 from app.models.organization import Organization
 from app.schemas.summary import SummaryResponse, SummaryCreate
-from app.services.ai_service import generate_summary_with_context
+from app.services.summarizer import summarize_document
+from app.services.summary_pipeline import release_summary_quota, reserve_summary_quota, summary_slot
+from app.services.llm_router import LLMUnavailable
+from app.services.llm_scheduler import LLMRateLimited, set_llm_tenant
+from app.services.single_flight import summary_flight_key, summary_flights
+from app.services.search import index_documents
+from app.services.tenant_cache import tenant_cached_response
 
 router = APIRouter()
 
 
 @router.post("/", response_model=SummaryResponse)
+@traced("create_summary")
 async def create_summary(
     document_id: str,
     summary_type: str = "standard",
@@ -21,6 +29,8 @@ async def create_summary(
     db: Session = Depends(get_db)
 ):
     """Create a summary for a document."""
+    set_span_attributes(**{"document.id": document_id, "summary.type": summary_type})
+    
     # Get document
     document = db.query(Document).filter(
         Document.id == document_id,
@@ -39,47 +49,81 @@ async def create_summary(
             detail="Document text not available"
         )
     
-    # Check organization's summary limit
     organization = db.query(Organization).filter(
         Organization.id == current_user.organization_id
     ).first()
-    
-    if not organization.can_create_summary():
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Monthly summary limit reached ({organization.summaries_limit}). Please upgrade your plan."
-        )
-    
-    # Generate summary
+    organization_id, plan_type = organization.id, organization.plan_type
+    
+    summary = None
+    
+    async def generate() -> str:
+        nonlocal summary
+        # Count the summary against the monthly limit before spending tokens; a single
+        # conditional UPDATE, so concurrent requests and automatic jobs can't overrun it
+        if not reserve_summary_quota(db, organization_id):
+            db.refresh(organization)
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Monthly summary limit reached ({organization.summaries_limit}). Please upgrade your plan."
+            )
+        
+        try:
+            # Generate summary
+            set_llm_tenant(organization_id, plan_type)
+            try:
+                async with summary_slot():
+                    summary_text, tokens_used = await summarize_document(db, document, summary_type)
+            except LLMRateLimited as e:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=str(e),
+                    headers={"Retry-After": e.retry_after_header}
+                )
+            except LLMUnavailable as e:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=str(e),
+                    headers={"Retry-After": e.retry_after_header}
+                )
+            
+            # Create summary record
+            summary = Summary(
+                document_id=document_id,
+                summary_text=summary_text,
+                summary_type=summary_type,
+                tokens_used=tokens_used,
+                organization_id=organization_id
+            )
+            
+            db.add(summary)
+            index_documents(db, [document_id])
+            
+            with span("db.commit", **{"document.id": document_id}):
+                db.commit()
+        except BaseException:
+            # No summary was stored; give the reservation back
+            db.rollback()
+            release_summary_quota(db, organization_id)
+            raise
+        db.refresh(summary)
+        return summary.id
+    
+    # Identical requests already in flight (double-clicks, teammates) share that one's summary
     try:
-        summary_text, tokens_used = await generate_summary_with_context(
-            document.extracted_text,
-            document.original_filename,
-            summary_type
+        summary_id, shared = await summary_flights.run(
+            summary_flight_key(current_user.organization_id, document_id, summary_type), generate
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate summary: {str(e)}"
         )
+    set_span_attributes(**{"summary.shared": shared})
     
-    # Create summary record
-    summary = Summary(
-        document_id=document_id,
-        summary_text=summary_text,
-        summary_type=summary_type,
-        tokens_used=tokens_used,
-        organization_id=current_user.organization_id
-    )
-    
-    db.add(summary)
-    
-    # Increment usage counter
-    organization.increment_summary_usage()
-    
-    db.commit()
-    db.refresh(summary)
-    
+    if shared:
+        summary = db.query(Summary).filter(Summary.id == summary_id).first()
     return summary
 
 
@@ -133,17 +177,23 @@ async def get_summary(
 
 @router.get("/", response_model=List[SummaryResponse])
 async def list_summaries(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100
 ):
-    """List all summaries in the organization."""
-    summaries = db.query(Summary).filter(
-        Summary.organization_id == current_user.organization_id
-    ).offset(skip).limit(limit).all()
-    
-    return summaries
+    """List all summaries in the organization.
+    
+    Send the ETag back as If-None-Match to get 304 Not Modified while nothing changed.
+    """
+    return tenant_cached_response(
+        request, current_user.organization_id, "summaries.list", {"skip": skip, "limit": limit},
+        lambda: db.query(Summary).filter(
+            Summary.organization_id == current_user.organization_id
+        ).offset(skip).limit(limit).all(),
+        response_model=List[SummaryResponse]
+    )
 
 
 @router.delete("/{summary_id}")
@@ -165,6 +215,7 @@ async def delete_summary(
         )
     
     db.delete(summary)
+    index_documents(db, [summary.document_id])
     db.commit()
     
     return {"message": "Summary deleted successfully"}
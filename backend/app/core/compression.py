@@ -0,0 +1,178 @@
+"""Brotli and gzip compression of API responses.
+
+Responses are compressed when the client accepts it, the body is at least
+COMPRESSION_MINIMUM_SIZE bytes and the content type is text-like (JSON, text,
+XML, JavaScript). Brotli is preferred when the `brotli` package is installed.
+
+File downloads are left alone: they advertise byte ranges, which refer to the
+stored bytes, and most uploaded formats (PDF, DOCX, PPTX) are compressed already.
+"""
+import asyncio
+import zlib
+from typing import List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import HTTP_RESPONSE_BYTES
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip only without it
+    brotli = None
+
+# Bodies this large are compressed in a worker thread rather than on the event loop
+THREAD_OFFLOAD_SIZE = 256 * 1024
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+
+
+def _accepted_encodings(accept_encoding: str) -> List[Tuple[str, float]]:
+    """Codings and q-values from an Accept-Encoding header."""
+    accepted = []
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted.append((coding.strip().lower(), quality))
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """"br" or "gzip", whichever the client accepts (brotli first), or None."""
+    if not accept_encoding:
+        return None
+    accepted = dict(_accepted_encodings(accept_encoding))
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers or "accept-ranges" in headers or "content-range" in headers:
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type or "+xml" in content_type
+
+
+class _Compressor:
+    """Incremental compressor for one response body."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits 16 + 15: gzip header and trailer around a deflate stream
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so streamed responses keep arriving as they're produced."""
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH)
+
+    async def run(self, data: bytes, last: bool) -> bytes:
+        """Compress a chunk (the final one if `last`), off the event loop when it's large."""
+        step = self.finish if last else self.compress
+        if len(data) >= THREAD_OFFLOAD_SIZE:
+            return await asyncio.to_thread(step, data)
+        return step(data)
+
+
+class CompressionMiddleware:
+    """Compress eligible responses with brotli or gzip.
+
+    A plain ASGI middleware: single-message bodies are compressed in one go and
+    get an exact Content-Length; streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 5, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        start_message: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = Headers(raw=message["headers"])
+                # Whether or not this one is compressed, the representation depends on Accept-Encoding
+                if _is_compressible(headers):
+                    MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+                passthrough = encoding is None or not _is_compressible(headers) or message["status"] in (204, 304)
+                return
+            if message["type"] != "http.response.body":
+                if start_message is not None:
+                    # Extensions such as zerocopysend or pathsend carry the body themselves;
+                    # such responses (file downloads) are never compressed
+                    start, start_message = start_message, None
+                    await send(start)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                # First body message: decide now that we know whether more is coming
+                start, start_message = start_message, None
+                if not passthrough and not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                if passthrough:
+                    HTTP_RESPONSE_BYTES.labels(encoding="identity").inc(len(body))
+                    await send(start)
+                    await send(message)
+                    return
+
+                headers = MutableHeaders(raw=start["headers"])
+                headers["content-encoding"] = encoding
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # The compressed bytes differ from the identity ones a strong validator promises
+                    headers["etag"] = f"W/{etag}"
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                if not more_body:
+                    compressed = await compressor.run(body, last=True)
+                    headers["content-length"] = str(len(compressed))
+                    HTTP_RESPONSE_BYTES.labels(encoding=encoding).inc(len(compressed))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                del headers["content-length"]
+                await send(start)
+
+            if passthrough:
+                HTTP_RESPONSE_BYTES.labels(encoding="identity").inc(len(body))
+                await send(message)
+                return
+            chunk = await compressor.run(body, last=not more_body)
+            HTTP_RESPONSE_BYTES.labels(encoding=encoding).inc(len(chunk))
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 from functools import lru_cache
 
 
@@ -39,10 +39,38 @@ class Settings(BaseSettings):
     STRIPE_WEBHOOK_SECRET: str
     STRIPE_PRICE_ID_BASIC: str = ""
     STRIPE_PRICE_ID_PRO: str = ""
+    STRIPE_API_BASE: str = ""  # Point at a local stand-in such as stripe-mock (http://localhost:12111)
+    STRIPE_GATEWAY: str = "stripe"  # stripe, fake (in-memory, no network)
+    STRIPE_TIMEOUT_SECONDS: int = 20
+    STRIPE_MAX_CONNECTIONS: int = 10  # Pooled HTTP connections and worker threads for Stripe calls
+    STRIPE_MAX_RETRIES: int = 3
+    STRIPE_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    INVOICE_CACHE_TTL_SECONDS: int = 3600  # Invoices older than this are refreshed in the background
+    INVOICE_REFRESH_BATCH_SIZE: int = 50  # Organizations refreshed per periodic run
+    INVOICE_REFRESH_RETRY_SECONDS: int = 300  # After a failed refresh, page views don't wait on Stripe for this long
+    STRIPE_WEBHOOK_POLL_SECONDS: float = 5.0  # How often the webhook worker looks for queued events
+    STRIPE_WEBHOOK_MAX_ATTEMPTS: int = 5
+    STRIPE_WEBHOOK_CONCURRENCY: int = 4  # Customers processed in parallel; events per customer stay ordered
     
     # Google Gemini
     GEMINI_API_KEY: str
-    GEMINI_MODEL: str = "gemini-1.5-flash"
+    GEMINI_MODEL: str = "gemini-2.5-flash"
+    
+    # OpenAI-compatible APIs (OpenAI, Azure, vLLM, Ollama...)
+    OPENAI_API_BASE: str = "https://api.openai.com/v1"
+    OPENAI_API_KEY: str = ""
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    
+    # LLM Routing
+    # Task (brief, standard, detailed, section, answer or default) to providers in order of preference,
+    # e.g. {"brief": ["openai:gpt-4o-mini", "gemini:gemini-2.5-flash"]}. Unlisted tasks use gemini:GEMINI_MODEL.
+    LLM_ROUTES: Dict[str, List[str]] = {}
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 120.0
+    LLM_SLOW_CALL_SECONDS: float = 30.0  # Slower answers count as failures for the circuit breaker
+    LLM_HEDGING_ENABLED: bool = True  # Race the next provider when a call is slower than usual
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 2.0
+    LLM_BREAKER_FAILURES: int = 5  # Failures in a row that take a provider out of rotation
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 30.0
     
     # URLs
     BACKEND_URL: str = "http://localhost:8000"
@@ -53,15 +81,115 @@ class Settings(BaseSettings):
     
     # File Upload
     MAX_FILE_SIZE_MB: int = 10
-    ALLOWED_FILE_TYPES: str = "application/pdf,application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    ALLOWED_FILE_TYPES: str = (
+        "application/pdf,"
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document,"
+        "application/vnd.openxmlformats-officedocument.presentationml.presentation,"
+        "text/plain,text/markdown,text/x-markdown,text/html"
+    )
     UPLOAD_DIR: str = "./uploads"
     
+    # Text Extraction
+    PDF_EXTRACTION_ENGINE: str = "auto"  # auto, pypdfium2, pdfminer, pypdf2; others are fallbacks
+    
+    # Search
+    SEARCH_MAX_INDEXED_CHARS: int = 500_000  # Longer texts are indexed up to this point (tsvector caps at 1MB)
+    
+    # Semantic Search
+    EMBEDDINGS_ENABLED: bool = True
+    EMBEDDING_BACKEND: str = "hashing"  # hashing, sentence-transformers (runs a local model on the CPU)
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_DIMENSIONS: int = 1024  # Hashing embedder only (fewer collide too often); models have their own size
+    EMBEDDING_CHUNK_CHARS: int = 1500
+    EMBEDDING_ANN_THRESHOLD: int = 20000  # Chunks in an organization before queries use the IVF index
+    EMBEDDING_IVF_PROBES: int = 8
+    EMBEDDING_INDEX_CACHE_SIZE: int = 32  # Organizations whose vector index is kept in memory
+    
+    # Long Document Summaries
+    SUMMARY_MAP_REDUCE_MIN_CHARS: int = 40_000  # Longer texts are summarized section by section
+    SUMMARY_SECTION_CHARS: int = 12_000
+    SUMMARY_SECTION_CONCURRENCY: int = 4
+    SUMMARY_SECTION_MAX_OUTPUT_TOKENS: int = 300
+    
+    # Summary Pipeline
+    SUMMARY_CONCURRENCY: int = 8  # Summaries generated at once per worker, requested and automatic
+    SUMMARY_AUTO_CONCURRENCY: int = 2  # Of those, at most this many automatic, so users never wait behind uploads
+    SUMMARY_AUTO_QUEUE_SIZE: int = 1000  # Automatic summaries waiting per worker; uploads past this aren't summarized
+    
+    # LLM Scheduling (per worker process)
+    LLM_GLOBAL_CONCURRENCY: int = 16  # Model calls in flight at once
+    LLM_GLOBAL_RPM: int = 1000  # Match the provider's requests-per-minute limit
+    LLM_GLOBAL_TPM: int = 1_000_000  # Match the provider's tokens-per-minute limit
+    LLM_BASIC_CONCURRENCY: int = 2
+    LLM_BASIC_TPM: int = 100_000
+    LLM_BASIC_WEIGHT: int = 1  # Relative share of the model when tenants compete
+    LLM_PRO_CONCURRENCY: int = 8
+    LLM_PRO_TPM: int = 500_000
+    LLM_PRO_WEIGHT: int = 4
+    LLM_MAX_WAIT_SECONDS: float = 10.0  # Requests that would wait longer for budget get a 429
+    LLM_MAX_QUEUED_PER_TENANT: int = 64  # Interactive calls queued per organization before 429s
+    LLM_MAX_TRACKED_TENANTS: int = 10_000  # Idle organizations' budgets are forgotten past this
+    
+    # Question Answering
+    QA_CONTEXT_CHUNKS: int = 4  # Most relevant chunks sent to the model per question
+    QA_MAX_OUTPUT_TOKENS: int = 400
+    
+    # File Storage
+    STORAGE_BACKEND: str = "local"  # local, s3
+    S3_BUCKET: str = ""
+    S3_ENDPOINT_URL: str = ""  # e.g. http://localhost:9000 for MinIO; empty for AWS
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_MAX_POOL_CONNECTIONS: int = 20
+    S3_PRESIGNED_DOWNLOADS: bool = True  # Redirect downloads to the bucket instead of proxying
+    S3_PRESIGNED_URL_EXPIRE_SECONDS: int = 300
+    DOWNLOAD_CACHE_MAX_AGE_SECONDS: int = 86400  # Stored files never change once uploaded
+    
     # Subscription Limits
     BASIC_SUMMARIES_PER_MONTH: int = 100
     PRO_SUMMARIES_PER_MONTH: int = 500
     
+    # Activity Log Retention
+    ACTIVITY_HOT_DAYS: int = 30  # SQLite: rows older than this move to activity_logs_archive
+    ACTIVITY_PARTITION_MONTHS_AHEAD: int = 3  # PostgreSQL: monthly partitions created in advance
+    ACTIVITY_ARCHIVE_DIR: str = "./archives/activity"
+    ACTIVITY_ARCHIVE_BATCH_SIZE: int = 1000
+    
+    # Document Retention Sweeper
+    RETENTION_BATCH_SIZE: int = 100
+    RETENTION_BATCH_PAUSE_SECONDS: float = 1.0  # Pause between batches to yield to live traffic
+    RETENTION_FILE_DELETE_CONCURRENCY: int = 8
+    
+    # Background Maintenance
+    ENABLE_SCHEDULER: bool = True  # Disable on all but one worker when running several
+    MAINTENANCE_INTERVAL_MINUTES: int = 60
+    
+    # Observability
+    METRICS_ENABLED: bool = True  # Prometheus metrics at /metrics
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "console"  # console, file (one JSON span per line)
+    TRACING_FILE: str = "./traces.jsonl"
+    
+    # Response Cache (list and stats endpoints the frontend polls)
+    RESPONSE_CACHE_ENABLED: bool = False  # ETags work without it; this also keeps bodies per worker until the data changes
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    
+    # Response Compression
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes; smaller bodies aren't worth the CPU
+    COMPRESSION_GZIP_LEVEL: int = 5  # 6 and up cost over twice the CPU on large bodies for ~10% fewer bytes
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; used when the brotli package is installed
+    
+    # Query Debugging (development and staging)
+    QUERY_DEBUG_ENABLED: bool = False  # Per-request query counts, N+1 warnings and slow query log
+    SLOW_QUERY_THRESHOLD_MS: int = 200
+    N_PLUS_ONE_THRESHOLD: int = 5  # Same statement this many times in one request
+    
     # Redis (optional)
-    REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_URL: str = "redis://localhost:6379/0"  # Empty: identical summary requests are coalesced per worker only
+    SINGLE_FLIGHT_LOCK_SECONDS: float = 30.0  # Renewed while the summary is generated; bounds a crashed worker's hold
+    SINGLE_FLIGHT_WAIT_SECONDS: float = 300.0  # Longest a request waits on another worker's identical summary
     
     # Email (optional)
     SMTP_HOST: str = "smtp.gmail.com"
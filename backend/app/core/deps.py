@@ -4,6 +4,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.security import decode_token
+from app.core.tracing import set_current_tenant
 from app.models.user import User
 from app.models.organization import Organization
 
@@ -47,6 +48,7 @@ async def get_current_user(
             detail="Inactive user"
         )
     
+    set_current_tenant(user.organization_id)
     return user
 
 
@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+from fastapi import Request
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header cannot be served for a resource of the given size."""
+
+    def __init__(self, size: int):
+        self.size = size
+        super().__init__(f"Requested range not satisfiable for {size} bytes")
+
+
+def _opaque_tag(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _opaque_tag(etag)
+    return any(_opaque_tag(candidate) == target for candidate in if_none_match.split(","))
+
+
+def http_date(value: datetime) -> str:
+    """Format a datetime as an IMF-fixdate; naive values are taken to be UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Whether a conditional GET can be answered with 304 Not Modified.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted without it.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def parse_range(request: Request, size: int, etag: str) -> Optional[Tuple[int, int]]:
+    """Parse a single-range `Range: bytes=...` header into inclusive (start, end) offsets.
+
+    Returns None when the whole resource should be sent: no Range header, an If-Range
+    validator that no longer matches, or a multi-range or malformed header (which
+    RFC 9110 allows servers to ignore). Raises RangeNotSatisfiable for ranges
+    entirely past the end.
+    """
+    header = request.headers.get("range")
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    if_range = request.headers.get("if-range")
+    if if_range is not None and _opaque_tag(if_range) != _opaque_tag(etag):
+        return None
+
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text == "":
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length <= 0:
+                raise RangeNotSatisfiable(size)
+            return max(size - length, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable(size)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
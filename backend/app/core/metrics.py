@@ -0,0 +1,197 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Labels are limited to route templates, methods, status codes and fixed names,
+# never raw paths or IDs, so the number of series stays bounded.
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served"
+)
+HTTP_RESPONSE_BYTES = Counter(
+    "http_response_bytes_total",
+    "Response body bytes sent, by content encoding (identity, gzip or br)",
+    ["encoding"]
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "http_request_db_queries",
+    "Database queries issued while serving one request",
+    ["route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250)
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries while serving one request",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Latency of individual database queries, including background jobs",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds",
+    "Latency of LLM calls",
+    ["model", "outcome"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens sent to and received from the LLM",
+    ["model", "kind"]
+)
+EXTRACTION_PAGE_DURATION = Histogram(
+    "document_extraction_page_seconds",
+    "Text extraction time per page",
+    ["file_type", "engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+EXTRACTION_DURATION = Histogram(
+    "document_extraction_seconds",
+    "Text extraction time per document",
+    ["file_type", "engine"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+LLM_HEDGES = Counter(
+    "llm_hedged_requests_total",
+    "Hedge requests for slow LLM calls: started, skipped for lack of a scheduler slot, and won",
+    ["outcome"]
+)
+LLM_CIRCUIT_OPENED = Counter(
+    "llm_circuit_opened_total",
+    "Times an LLM provider's circuit breaker opened",
+    ["model"]
+)
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds",
+    "Time LLM calls waited for admission by the scheduler",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+LLM_RATE_LIMITED = Counter(
+    "llm_rate_limited_total",
+    "LLM calls refused by the scheduler",
+    ["reason"]
+)
+AUTO_SUMMARY_QUEUE_DEPTH = Gauge(
+    "summary_auto_queue_depth",
+    "Automatic summaries waiting in this worker"
+)
+AUTO_SUMMARY_JOBS = Counter(
+    "summary_auto_jobs_total",
+    "Automatic summary jobs by outcome (completed, failed, skipped, over_quota, coalesced, dropped)",
+    ["outcome"]
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result (hit, stale or miss)",
+    ["cache", "result"]
+)
+
+
+class RequestStats:
+    """Database activity attributed to the request being served."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Set by MetricsMiddleware; copied into threads started with asyncio.to_thread
+# and run_in_threadpool, so queries made there are attributed to the request too.
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats for the request being served, or None outside a request."""
+    return _request_stats.get()
+
+
+def record_cache_lookup(cache: str, result: str):
+    """Count a lookup in a named cache; result is "hit", "stale" or "miss"."""
+    CACHE_LOOKUPS.labels(cache=cache, result=result).inc()
+
+
+def instrument_engine(engine: Engine):
+    """Time every query on the engine and attribute it to the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start_time = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_query_start_time", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        DB_QUERY_DURATION.observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """Record latency, in-flight count and database usage for every HTTP request.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, so streamed responses
+    such as document downloads are neither buffered nor timed before they finish.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            _request_stats.reset(token)
+            # The router stores the matched route in the scope, giving its template
+            route = _route_template(scope)
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"], route=route, status=str(status_code)
+            ).observe(time.perf_counter() - start)
+            DB_QUERIES_PER_REQUEST.labels(route=route).observe(stats.queries)
+            DB_TIME_PER_REQUEST.labels(route=route).observe(stats.db_seconds)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """The current metrics in Prometheus text format, with its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
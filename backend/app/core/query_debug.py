@@ -0,0 +1,201 @@
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+
+# Longest statement included in a log line
+MAX_LOGGED_STATEMENT_LENGTH = 2000
+
+
+class QueryLog:
+    """The statements executed in one request or one query_budget block."""
+
+    def __init__(self):
+        self.queries: List[Tuple[str, str, float]] = []  # (statement, parameters, seconds)
+
+    def record(self, statement: str, parameters, seconds: float):
+        self.queries.append((statement, repr(parameters), seconds))
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(seconds for _, _, seconds in self.queries)
+
+    def repeated_statements(self, threshold: int) -> List[dict]:
+        """Statements run at least `threshold` times with differing parameters: likely N+1 loops."""
+        by_statement: Dict[str, List[str]] = defaultdict(list)
+        for statement, parameters, _ in self.queries:
+            by_statement[statement].append(parameters)
+        return [
+            {"statement": statement, "count": len(parameters), "distinct_parameters": len(set(parameters))}
+            for statement, parameters in by_statement.items()
+            if len(parameters) >= threshold and len(set(parameters)) > 1
+        ]
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by query_budget when a block runs more queries than allowed."""
+
+
+# Log for the request being served, set by QueryDebugMiddleware
+_request_log: ContextVar[Optional[QueryLog]] = ContextVar("query_debug_log", default=None)
+
+# Logs of active query_budget blocks. Not context-local: TestClient serves requests
+# on its own thread, so every query in the process counts against an open budget.
+_budget_logs: List[QueryLog] = []
+_budget_lock = threading.Lock()
+
+_installed_engines: set = set()
+
+
+def _log(kind: str, **fields):
+    # One write per line, so lines from worker threads don't interleave
+    sys.stdout.write(json.dumps({"event": kind, **fields}, default=str) + "\n")
+
+
+def _explain(conn, statement: str, parameters) -> Optional[List[str]]:
+    """The database's plan for a statement, fetched on the raw DBAPI connection so it isn't itself logged.
+
+    This is the request's own connection and transaction. Outside SQLite, a
+    failed statement aborts the transaction, so EXPLAIN runs in a savepoint
+    that is rolled back either way.
+    """
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    sqlite = conn.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if not sqlite:
+            cursor.execute("SAVEPOINT query_debug_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return [" ".join(str(column) for column in row) for row in cursor.fetchall()]
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            if not sqlite:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_debug_explain")
+                cursor.execute("RELEASE SAVEPOINT query_debug_explain")
+    finally:
+        cursor.close()
+
+
+def install_query_debug(engine: Engine):
+    """Record every query on the engine for request logs and query budgets, and log slow ones."""
+    if engine in _installed_engines:
+        return
+    _installed_engines.add(engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_debug_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_query_debug_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+
+        request_log = _request_log.get()
+        if request_log is not None:
+            request_log.record(statement, parameters, elapsed)
+        if _budget_logs:
+            with _budget_lock:
+                for budget_log in _budget_logs:
+                    budget_log.record(statement, parameters, elapsed)
+
+        if settings.QUERY_DEBUG_ENABLED and elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            _log(
+                "slow_query",
+                duration_ms=round(elapsed * 1000, 2),
+                statement=statement[:MAX_LOGGED_STATEMENT_LENGTH],
+                parameters=repr(parameters)[:MAX_LOGGED_STATEMENT_LENGTH],
+                plan=None if executemany else _explain(conn, statement, parameters)
+            )
+
+
+def current_query_log() -> Optional[QueryLog]:
+    """Queries recorded so far in the request being served, if query debugging is on."""
+    return _request_log.get()
+
+
+@contextmanager
+def query_budget(max_queries: int, engine: Optional[Engine] = None) -> Iterator[QueryLog]:
+    """Fail with QueryBudgetExceeded if the block runs more than max_queries queries.
+
+    Meant for tests, e.g. around a TestClient request to pin a route's query count::
+
+        with query_budget(3):
+            client.get("/api/analytics/recent-documents", headers=headers)
+    """
+    if engine is None:
+        from app.core.database import engine
+    install_query_debug(engine)
+
+    log = QueryLog()
+    with _budget_lock:
+        _budget_logs.append(log)
+    try:
+        yield log
+    finally:
+        with _budget_lock:
+            _budget_logs.remove(log)
+
+    if log.count > max_queries:
+        repeated = log.repeated_statements(settings.N_PLUS_ONE_THRESHOLD)
+        detail = "".join(
+            f"\n  {item['count']}x {item['statement'][:200]}" for item in repeated
+        )
+        raise QueryBudgetExceeded(
+            f"Expected at most {max_queries} queries, ran {log.count}"
+            + (f"; repeated statements:{detail}" if detail else "")
+        )
+
+
+class QueryDebugMiddleware:
+    """Log each request's query count, and warn about statements repeated in a loop."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = _request_log.set(log)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_log.reset(token)
+            route = getattr(scope.get("route"), "path", scope["path"])
+            _log(
+                "request_queries",
+                method=scope["method"],
+                route=route,
+                queries=log.count,
+                db_ms=round(log.total_seconds * 1000, 2)
+            )
+            for item in log.repeated_statements(settings.N_PLUS_ONE_THRESHOLD):
+                _log(
+                    "n_plus_one",
+                    method=scope["method"],
+                    route=route,
+                    count=item["count"],
+                    distinct_parameters=item["distinct_parameters"],
+                    statement=item["statement"][:MAX_LOGGED_STATEMENT_LENGTH]
+                )
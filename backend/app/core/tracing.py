@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+# Longest SQL statement recorded on a query span
+MAX_STATEMENT_LENGTH = 1000
+
+# Organization of the authenticated user, attached to every span in the request
+_current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+# Set by configure_tracing; None while tracing is disabled, which makes spans free
+_tracer = None
+_provider = None
+
+
+def set_current_tenant(organization_id: Optional[str]):
+    """Record the tenant for the request being served."""
+    _current_tenant.set(organization_id)
+
+
+def configure_tracing():
+    """Set up OpenTelemetry with a console or JSON-lines file exporter, if enabled."""
+    global _tracer, _provider
+    if not settings.TRACING_ENABLED or _tracer is not None:
+        return
+
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if settings.TRACING_EXPORTER == "file":
+        exporter = ConsoleSpanExporter(
+            out=open(settings.TRACING_FILE, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    else:
+        exporter = ConsoleSpanExporter()
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": settings.APP_NAME}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    _tracer = trace.get_tracer("app")
+
+
+def shutdown_tracing():
+    """Flush buffered spans to the exporter."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Time a block as a child of the current span, tagged with the current tenant.
+
+    Attributes with a None value are left out. Yields the span, or None when
+    tracing is disabled.
+    """
+    if _tracer is None:
+        yield None
+        return
+    tenant_id = _current_tenant.get()
+    if tenant_id is not None:
+        attributes.setdefault("tenant.id", tenant_id)
+    with _tracer.start_as_current_span(
+        name,
+        attributes={key: value for key, value in attributes.items() if value is not None}
+    ) as current:
+        yield current
+
+
+def set_span_attributes(**attributes: Any):
+    """Add attributes to the current span, e.g. IDs only known part-way through."""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+
+
+def traced(name: str):
+    """Decorator running a coroutine function inside a span of the given name."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_engine(engine: Engine):
+    """Record a span for every query on the engine, if tracing is enabled."""
+    if _tracer is None:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        attributes = {
+            "db.system": engine.dialect.name,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        }
+        tenant_id = _current_tenant.get()
+        if tenant_id is not None:
+            attributes["tenant.id"] = tenant_id
+        context._query_span = _tracer.start_span("db.query", attributes=attributes)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        query_span = getattr(context, "_query_span", None)
+        if query_span is not None:
+            query_span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        query_span = getattr(exception_context.execution_context, "_query_span", None)
+        if query_span is not None and query_span.is_recording():
+            query_span.record_exception(exception_context.original_exception)
+            query_span.end()
@@ -1,15 +1,29 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.database import engine
+from app.core.metrics import MetricsMiddleware, instrument_engine, render_metrics
+from app.core.tracing import configure_tracing, shutdown_tracing, trace_engine
+from app.core.query_debug import QueryDebugMiddleware, install_query_debug
 from app.api.v1.api import api_router
+from app.services.scheduler import register_periodic_job, start_scheduler, stop_scheduler
+from app.services.activity_archive import activity_maintenance_job
+from app.services.retention import run_retention_sweep
+from app.services.stripe_webhooks import process_pending_events, webhook_wakeup
+from app.services.invoice_cache import refresh_stale_invoices
+from app.services.summary_pipeline import start_summary_pipeline, stop_summary_pipeline
 
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
     description="Multi-Tenant Document Summarizer API",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson serializes large payloads (document text, summary lists) several times faster
+    default_response_class=ORJSONResponse
 )
 
 # Add session middleware for OAuth (must be before CORS)
@@ -29,12 +43,75 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Accept-Ranges", "Content-Range", "Content-Length", "Retry-After"],
 )
 
+# Brotli/gzip for JSON and text responses above a size threshold; downloads pass through
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+    )
+
+# Query counts, N+1 warnings and slow query log for development and staging
+if settings.QUERY_DEBUG_ENABLED:
+    install_query_debug(engine)
+    app.add_middleware(QueryDebugMiddleware)
+
+# Request metrics (added last so it wraps everything, including CORS preflights)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+    app.add_middleware(MetricsMiddleware)
+
+# Per-stage tracing spans (no-op unless TRACING_ENABLED)
+configure_tracing()
+trace_engine(engine)
+
 # Include API router
 app.include_router(api_router, prefix="/api")
 
 
+# Background maintenance jobs
+register_periodic_job(
+    "activity_maintenance",
+    settings.MAINTENANCE_INTERVAL_MINUTES * 60,
+    activity_maintenance_job
+)
+register_periodic_job(
+    "document_retention",
+    settings.MAINTENANCE_INTERVAL_MINUTES * 60,
+    run_retention_sweep
+)
+register_periodic_job(
+    "stripe_webhooks",
+    settings.STRIPE_WEBHOOK_POLL_SECONDS,
+    process_pending_events,
+    wakeup=webhook_wakeup
+)
+register_periodic_job(
+    "invoice_refresh",
+    settings.MAINTENANCE_INTERVAL_MINUTES * 60,
+    refresh_stale_invoices
+)
+
+
+@app.on_event("startup")
+async def startup():
+    """Start background maintenance jobs and the automatic summary queue."""
+    start_scheduler()
+    start_summary_pipeline()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background jobs and flush traces."""
+    await stop_scheduler()
+    await stop_summary_pipeline()
+    shutdown_tracing()
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -45,6 +122,15 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -2,7 +2,12 @@ from app.core.database import Base
 from app.models.organization import Organization
 from app.models.user import User, UserRole
 from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.models.document_answer import DocumentAnswer
 from app.models.summary import Summary
-from app.models.activity_log import ActivityLog, ActivityType
+from app.models.chunk_summary import ChunkSummary
+from app.models.activity_log import ActivityLog, ArchivedActivityLog, ActivityType
+from app.models.stripe_event import StripeEvent
+from app.models.invoice import Invoice
 
-__all__ = ["Base", "Organization", "User", "UserRole", "Document", "Summary", "ActivityLog", "ActivityType"]
+__all__ = ["Base", "Organization", "User", "UserRole", "Document", "DocumentChunk", "DocumentAnswer", "Summary", "ChunkSummary", "ActivityLog", "ArchivedActivityLog", "ActivityType", "StripeEvent", "Invoice"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -39,9 +39,50 @@ class ActivityLog(Base):
     # Timestamp
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
+    __table_args__ = (
+        # Filtered admin audits: by action type or by user, newest first
+        Index("ix_activity_logs_org_action_created", "organization_id", "action_type", "created_at"),
+        Index("ix_activity_logs_org_user_created", "organization_id", "user_id", "created_at"),
+    )
+    
     # Relationships
     user = relationship("User", foreign_keys=[user_id])
     organization = relationship("Organization")
     
     def __repr__(self):
         return f"<ActivityLog {self.action_type} by {self.user_id}>"
+
+
+
+class ArchivedActivityLog(Base):
+    """Cold storage for activity logs on SQLite, which has no native partitioning.
+    
+    Rows older than ACTIVITY_HOT_DAYS are moved here so the live table stays small.
+    On PostgreSQL activity_logs is range-partitioned by month instead and this
+    table stays empty.
+    """
+    __tablename__ = "activity_logs_archive"
+    
+    id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False)
+    action_type = Column(Enum(ActivityType), nullable=False)
+    target = Column(String, nullable=False)
+    details = Column(Text, nullable=True)
+    organization_id = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        Index("ix_activity_logs_archive_org_created", "organization_id", "created_at"),
+        Index("ix_activity_logs_archive_org_action_created", "organization_id", "action_type", "created_at"),
+        Index("ix_activity_logs_archive_org_user_created", "organization_id", "user_id", "created_at"),
+    )
+    
+    # No foreign keys on archived rows; the user may be gone by the time it is read
+    user = relationship(
+        "User",
+        primaryjoin="foreign(ArchivedActivityLog.user_id) == User.id",
+        viewonly=True,
+    )
+    
+    def __repr__(self):
+        return f"<ArchivedActivityLog {self.action_type} by {self.user_id}>"
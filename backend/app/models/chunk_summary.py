@@ -0,0 +1,35 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Text, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+import uuid
+
+
+class ChunkSummary(Base):
+    """The model's summary of one section of a document's text, keyed by the section's content hash.
+
+    Long documents are summarized section by section before a final combining
+    step; a new version of a document only sends its changed sections to the model.
+    """
+    __tablename__ = "chunk_summaries"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    content_hash = Column(String, nullable=False)  # sha256 hex digest of the section text
+    model = Column(String, nullable=False)  # Provider that wrote it, e.g. "gemini:gemini-2.5-flash"
+    summary_text = Column(Text, nullable=False)
+    tokens_used = Column(Integer, nullable=True)
+    
+    # Tenant isolation
+    organization_id = Column(String, ForeignKey("organizations.id"), nullable=False)
+    
+    # Metadata
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())  # Retention sweeps expire unused entries
+    
+    __table_args__ = (
+        # One summary per section and organization, whichever model wrote it
+        Index("ix_chunk_summaries_org_hash", "organization_id", "content_hash", unique=True),
+        Index("ix_chunk_summaries_org_last_used", "organization_id", "last_used_at"),
+    )
+    
+    def __repr__(self):
+        return f"<ChunkSummary {self.content_hash[:12]}>"
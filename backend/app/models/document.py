@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -14,6 +14,7 @@ class Document(Base):
     file_path = Column(String, nullable=False)
     file_type = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)  # in bytes
+    content_hash = Column(String, nullable=True)  # sha256 hex digest of the file, used as its ETag
     
     # Content
     extracted_text = Column(Text, nullable=True)
@@ -23,6 +24,10 @@ class Document(Base):
     organization_id = Column(String, ForeignKey("organizations.id"), nullable=False, index=True)
     uploaded_by = Column(String, ForeignKey("users.id"), nullable=False)
     
+    # Versioning: a re-upload of an existing document points at the version it replaces
+    version = Column(Integer, nullable=False, default=1)
+    previous_version_id = Column(String, ForeignKey("documents.id"), nullable=True, index=True)
+    
     # Processing status
     status = Column(String, default="uploaded")  # uploaded, processing, completed, failed
     
@@ -30,10 +35,17 @@ class Document(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        # Retention sweeps and recent-document listings scan by age within a tenant
+        Index("ix_documents_org_created", "organization_id", "created_at"),
+    )
+    
     # Relationships
     organization = relationship("Organization", back_populates="documents")
     uploaded_by_user = relationship("User", back_populates="documents")
     summaries = relationship("Summary", back_populates="document", cascade="all, delete-orphan")
+    answers = relationship("DocumentAnswer", back_populates="document", cascade="all, delete-orphan")
+    previous_version = relationship("Document", remote_side=[id], foreign_keys=[previous_version_id])
     
     def __repr__(self):
         return f"<Document {self.original_filename}>"
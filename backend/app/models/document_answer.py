@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Text, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.database import Base
+import uuid
+
+
+class DocumentAnswer(Base):
+    """A generated answer to a question about a document, reused when the question is asked again."""
+    __tablename__ = "document_answers"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    document_id = Column(String, ForeignKey("documents.id"), nullable=False)
+    
+    # Question and answer
+    question = Column(Text, nullable=False)
+    question_hash = Column(String, nullable=False)  # sha256 of the normalized question
+    answer = Column(Text, nullable=False)
+    source_chunks = Column(String, nullable=False, default="")  # Comma-separated chunk indexes given to the model
+    tokens_used = Column(Integer, nullable=True)
+    
+    # Tenant isolation
+    organization_id = Column(String, ForeignKey("organizations.id"), nullable=False, index=True)
+    
+    # Metadata
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_document_answers_document_question", "document_id", "question_hash", unique=True),
+    )
+    
+    # Relationships
+    document = relationship("Document", back_populates="answers")
+    
+    def __repr__(self):
+        return f"<DocumentAnswer for Document {self.document_id}>"
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Float, LargeBinary, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+import uuid
+
+
+class DocumentChunk(Base):
+    """A span of a document's extracted text and its embedding.
+
+    Embeddings are int8-quantized: the float vector is approximately
+    embedding * embedding_scale. The text itself is not copied; it is
+    extracted_text[start_offset:end_offset].
+    """
+    __tablename__ = "document_chunks"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    document_id = Column(String, ForeignKey("documents.id"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    start_offset = Column(Integer, nullable=False)
+    end_offset = Column(Integer, nullable=False)
+    content_hash = Column(String, nullable=False)  # sha256 hex digest of the chunk text
+    
+    # Embedding
+    embedder = Column(String, nullable=False)  # Model that produced the vector; others are ignored
+    embedding = Column(LargeBinary, nullable=False)
+    embedding_scale = Column(Float, nullable=False)
+    
+    # Tenant isolation
+    organization_id = Column(String, ForeignKey("organizations.id"), nullable=False)
+    
+    # Metadata
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Vector indexes load a tenant's chunks for one embedder
+        Index("ix_document_chunks_org_embedder", "organization_id", "embedder"),
+        # Unchanged chunks reuse an existing embedding instead of recomputing it
+        Index("ix_document_chunks_org_hash", "organization_id", "content_hash"),
+    )
+    
+    def __repr__(self):
+        return f"<DocumentChunk {self.document_id}#{self.chunk_index}>"
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class Invoice(Base):
+    """Local copy of a Stripe invoice, so the billing page never waits on the Stripe API."""
+    __tablename__ = "invoices"
+    
+    id = Column(String, primary_key=True)  # Stripe invoice ID (in_...)
+    
+    # Tenant isolation
+    organization_id = Column(String, ForeignKey("organizations.id"), nullable=False, index=True)
+    stripe_customer_id = Column(String, nullable=False)
+    
+    # Invoice details
+    amount_paid = Column(Integer, nullable=False, default=0)  # in cents
+    status = Column(String, nullable=True)  # draft, open, paid, uncollectible, void
+    invoice_pdf = Column(String, nullable=True)
+    stripe_created = Column(Integer, nullable=False)  # Invoice creation time (epoch seconds) from Stripe
+    
+    # Metadata
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<Invoice {self.id}>"
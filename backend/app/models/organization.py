@@ -19,6 +19,9 @@ class Organization(Base):
     plan_type = Column(String, default="basic")  # basic, pro
     summaries_limit = Column(Integer, default=100)
     summaries_used_current_month = Column(Integer, default=0)
+    stripe_event_created = Column(Integer, nullable=True)  # Creation time of the last applied Stripe event
+    invoices_synced_at = Column(DateTime(timezone=True), nullable=True)  # Last full invoice refresh from Stripe
+    embedding_generation = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped by every write to its document_chunks
     
     # Organization Settings
     auto_generate_summaries = Column(Boolean, default=True)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, DateTime, Integer, Text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class StripeEvent(Base):
+    """A Stripe webhook event, recorded on receipt and applied later by the webhook worker.
+    
+    The Stripe event ID is the primary key, so retried deliveries of the same event
+    are detected on insert and never applied twice.
+    """
+    __tablename__ = "stripe_events"
+    
+    id = Column(String, primary_key=True)  # Stripe event ID (evt_...)
+    type = Column(String, nullable=False)
+    customer_id = Column(String, nullable=True, index=True)  # Events are applied in order per customer
+    payload = Column(Text, nullable=False)  # Raw JSON body as received
+    stripe_created = Column(Integer, nullable=False)  # Event creation time (epoch seconds) from Stripe
+    
+    # Processing status
+    status = Column(String, default="pending", index=True)  # pending, processing, processed, failed
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    
+    # Metadata
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<StripeEvent {self.id} {self.type}>"
@@ -30,6 +30,8 @@ class DocumentResponse(BaseModel):
     file_size: int
     status: str
     page_count: Optional[int] = None
+    version: int = 1
+    previous_version_id: Optional[str] = None
     organization_id: str
     uploaded_by: str
     created_at: datetime
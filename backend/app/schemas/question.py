@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+
+class QuestionCreate(BaseModel):
+    document_id: str
+    question: str = Field(..., min_length=1, max_length=1000)
+
+
+class AnswerSource(BaseModel):
+    chunk_index: int
+    excerpt: str
+
+
+class AnswerResponse(BaseModel):
+    id: str
+    document_id: str
+    question: str
+    answer: str
+    sources: List[AnswerSource] = []
+    tokens_used: Optional[int] = None
+    cached: bool = False  # Reused from an earlier identical question
+    created_at: datetime
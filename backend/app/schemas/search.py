@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+
+class SearchResult(BaseModel):
+    document_id: str
+    original_filename: str
+    file_type: str
+    page_count: Optional[int] = None
+    created_at: datetime
+    score: float
+    snippet: str  # HTML-escaped, with matched terms wrapped in <mark>
+
+
+class SemanticSearchResult(BaseModel):
+    document_id: str
+    original_filename: str
+    file_type: str
+    page_count: Optional[int] = None
+    created_at: datetime
+    score: float  # Cosine similarity of the best-matching chunk
+    excerpt: str  # Start of the best-matching chunk, as plain text
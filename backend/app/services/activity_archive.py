@@ -0,0 +1,222 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.activity_log import ActivityLog, ArchivedActivityLog
+from app.models.organization import Organization
+
+PARTITION_NAME_PATTERN = re.compile(r"^activity_logs_y(\d{4})m(\d{2})$")
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+
+def _month_start(dt: datetime) -> datetime:
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(dt: datetime, months: int) -> datetime:
+    month_index = dt.month - 1 + months
+    return dt.replace(year=dt.year + month_index // 12, month=month_index % 12 + 1)
+
+
+def partition_name(month_start: datetime) -> str:
+    """Name of the monthly activity_logs partition starting at month_start."""
+    return f"activity_logs_y{month_start.year}m{month_start.month:02d}"
+
+
+def retention_cutoff(retention_days: Optional[int]) -> Optional[datetime]:
+    """Oldest timestamp still inside the retention window, or None to keep forever."""
+    if not retention_days or retention_days <= 0:
+        return None
+    return datetime.utcnow() - timedelta(days=retention_days)
+
+
+def activity_log_sources(db: Session, since: Optional[datetime] = None) -> list:
+    """Models to read activity logs from, newest rows first.
+
+    On PostgreSQL the planner prunes monthly partitions from the created_at bound,
+    so the single partitioned table is always enough. On SQLite the archive table
+    is only consulted when the requested window reaches past the hot period.
+    """
+    if _is_postgres(db):
+        return [ActivityLog]
+    hot_cutoff = datetime.utcnow() - timedelta(days=settings.ACTIVITY_HOT_DAYS)
+    if since is not None and since >= hot_cutoff:
+        return [ActivityLog]
+    return [ActivityLog, ArchivedActivityLog]
+
+
+def ensure_activity_partitions(db: Session, months_ahead: Optional[int] = None) -> List[str]:
+    """Create monthly activity_logs partitions for the current and upcoming months (PostgreSQL only)."""
+    if not _is_postgres(db):
+        return []
+    if months_ahead is None:
+        months_ahead = settings.ACTIVITY_PARTITION_MONTHS_AHEAD
+
+    current_month = _month_start(datetime.utcnow())
+    names = []
+    for offset in range(months_ahead + 1):
+        start = _add_months(current_month, offset)
+        end = _add_months(start, 1)
+        name = partition_name(start)
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF activity_logs "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        ))
+        names.append(name)
+    db.commit()
+    return names
+
+
+def compact_activity_logs(db: Session) -> int:
+    """Move rows older than the hot window into activity_logs_archive (SQLite only)."""
+    if _is_postgres(db):
+        return 0
+
+    hot_cutoff = datetime.utcnow() - timedelta(days=settings.ACTIVITY_HOT_DAYS)
+    live = ActivityLog.__table__
+    archive = ArchivedActivityLog.__table__
+    columns = [column.name for column in archive.columns]
+    moved = 0
+
+    while True:
+        ids = [row.id for row in db.query(ActivityLog.id).filter(
+            ActivityLog.created_at < hot_cutoff
+        ).limit(settings.ACTIVITY_ARCHIVE_BATCH_SIZE).all()]
+        if not ids:
+            break
+
+        db.execute(insert(archive).from_select(
+            columns,
+            select(*[live.c[name] for name in columns]).where(live.c.id.in_(ids))
+        ))
+        db.query(ActivityLog).filter(ActivityLog.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        moved += len(ids)
+
+    return moved
+
+
+def _write_archive_file(organization_id: str, rows: list):
+    """Append rows to gzip-compressed JSON Lines files, one file per organization and month."""
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(f"{row.created_at:%Y-%m}", []).append(row)
+
+    org_dir = os.path.join(settings.ACTIVITY_ARCHIVE_DIR, organization_id)
+    os.makedirs(org_dir, exist_ok=True)
+
+    for month, month_rows in by_month.items():
+        # Appending to a gzip file adds a new member; readers see one continuous stream
+        with gzip.open(os.path.join(org_dir, f"{month}.jsonl.gz"), "at", encoding="utf-8") as f:
+            for row in month_rows:
+                f.write(json.dumps({
+                    "id": row.id,
+                    "user_id": row.user_id,
+                    "organization_id": row.organization_id,
+                    "action_type": row.action_type.value,
+                    "target": row.target,
+                    "details": row.details,
+                    "created_at": row.created_at.isoformat(),
+                }) + "\n")
+
+
+def _archive_expired_rows(db: Session, model, organization_id: str, cutoff: datetime) -> int:
+    """Move one organization's expired rows from a single table into archive files."""
+    archived = 0
+    while True:
+        rows = db.query(model).filter(
+            model.organization_id == organization_id,
+            model.created_at < cutoff
+        ).order_by(model.created_at).limit(settings.ACTIVITY_ARCHIVE_BATCH_SIZE).all()
+        if not rows:
+            break
+
+        # Write before deleting: a crash in between duplicates archive lines, never loses them
+        _write_archive_file(organization_id, rows)
+        db.query(model).filter(
+            model.id.in_([row.id for row in rows])
+        ).delete(synchronize_session=False)
+        db.commit()
+        archived += len(rows)
+
+    return archived
+
+
+def _drop_expired_partitions(db: Session, oldest_cutoff: datetime) -> List[str]:
+    """Drop monthly partitions that end before every organization's retention cutoff."""
+    partitions = db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'activity_logs'"
+    )).scalars().all()
+
+    dropped = []
+    for name in partitions:
+        match = PARTITION_NAME_PATTERN.match(name)
+        if not match:
+            continue
+        partition_end = _add_months(datetime(int(match.group(1)), int(match.group(2)), 1), 1)
+        if partition_end > oldest_cutoff:
+            continue
+        # Rows are archived per organization above; only drop partitions that are now empty
+        if db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            continue
+        db.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+
+    db.commit()
+    return dropped
+
+
+def archive_expired_activity(db: Session) -> dict:
+    """Move activity logs past each organization's document_retention_days into archive files."""
+    archived = 0
+    cutoffs = []
+
+    for organization_id, retention_days in db.query(
+        Organization.id, Organization.document_retention_days
+    ).all():
+        cutoff = retention_cutoff(retention_days)
+        cutoffs.append(cutoff)
+        if cutoff is None:
+            continue
+        for model in activity_log_sources(db):
+            archived += _archive_expired_rows(db, model, organization_id, cutoff)
+
+    dropped = []
+    if _is_postgres(db) and cutoffs and None not in cutoffs:
+        dropped = _drop_expired_partitions(db, min(cutoffs))
+
+    return {"archived": archived, "dropped_partitions": dropped}
+
+
+def run_activity_maintenance() -> dict:
+    """Create upcoming partitions, compact the hot table and archive expired rows."""
+    db = SessionLocal()
+    try:
+        created = ensure_activity_partitions(db)
+        compacted = compact_activity_logs(db)
+        result = archive_expired_activity(db)
+        return {"partitions": created, "compacted": compacted, **result}
+    finally:
+        db.close()
+
+
+async def activity_maintenance_job() -> dict:
+    """Periodic job entry point; runs the blocking maintenance off the event loop."""
+    return await asyncio.to_thread(run_activity_maintenance)
+
+
+if __name__ == "__main__":
+    print(run_activity_maintenance())
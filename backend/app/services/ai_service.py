@@ -1,17 +1,18 @@
-import google.generativeai as genai
 from app.core.config import settings
-from typing import Optional
-
-# Configure Gemini
-genai.configure(api_key=settings.GEMINI_API_KEY)
+from app.core.tracing import set_span_attributes, traced
+from app.services.llm_providers import Completion
+from app.services.llm_router import LLMUnavailable, get_llm_router
+from app.services.llm_scheduler import LLMRateLimited, llm_slot
+from typing import List, Optional
 
 
+@traced("generate_summary")
 async def generate_summary(
     text: str,
     summary_type: str = "standard",
     max_tokens: Optional[int] = None
 ) -> tuple[str, int]:
-    """Generate a summary using OpenAI API."""
+    """Generate a summary with the model routed for this summary type."""
     
     # Define prompts based on summary type
     prompts = {
@@ -27,41 +28,64 @@ async def generate_summary(
     if len(text) > max_input_length:
         text = text[:max_input_length] + "..."
     
-    try:
-        # Initialize Gemini model - use gemini-2.5-flash for v1 API
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        
-        # Create the full prompt
-        full_prompt = f"""You are a helpful assistant that creates clear, concise summaries of documents.
+    # Create the full prompt
+    full_prompt = f"""You are a helpful assistant that creates clear, concise summaries of documents.
 
 {prompt}
 
 {text}"""
-        
-        # Generate summary
-        response = model.generate_content(
+    
+    try:
+        completion, _ = await _complete(
+            summary_type,
             full_prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=max_tokens or (150 if summary_type == "brief" else 500 if summary_type == "standard" else 1000),
-                temperature=0.3,
-            )
+            max_output_tokens=max_tokens or (150 if summary_type == "brief" else 500 if summary_type == "standard" else 1000),
+            temperature=0.3
         )
-        
-        # Handle response parts properly
-        if response.candidates:
-            summary = ""
-            for part in response.candidates[0].content.parts:
-                summary += part.text
-        else:
-            summary = response.text
-            
-        # Gemini doesn't return token count in same way, estimate it
-        tokens_used = len(text.split()) + len(summary.split())  # Rough estimate
-        
-        return summary, tokens_used
+    except (LLMRateLimited, LLMUnavailable):
+        raise
+    except Exception as e:
+        raise Exception(f"Error generating summary: {str(e)}")
+    
+    set_span_attributes(**{"llm.summary_type": summary_type})
+    return completion.text, completion.prompt_tokens + completion.completion_tokens
+
+
+async def summarize_section(text: str) -> tuple[str, int, str]:
+    """Summarize one section of a long document, for combining with the others afterwards.
+    
+    Sections can be summarized concurrently; each call is admitted separately.
+    Returns the summary, tokens used and the provider that wrote it.
+    """
+    prompt = f"""You are summarizing one section of a longer document. The summaries of all
+sections will be combined later, so keep every key fact, figure, name and conclusion,
+and don't add an introduction or refer to "this section".
+
+{text}"""
     
+    try:
+        completion, model = await _complete(
+            "section", prompt, settings.SUMMARY_SECTION_MAX_OUTPUT_TOKENS, 0.2
+        )
+    except (LLMRateLimited, LLMUnavailable):
+        raise
     except Exception as e:
-        raise Exception(f"Error generating summary with Gemini: {str(e)}")
+        raise Exception(f"Error summarizing section: {str(e)}")
+    
+    return completion.text, completion.prompt_tokens + completion.completion_tokens, model
+
+
+async def _complete(task: str, prompt: str, max_output_tokens: int, temperature: float) -> tuple[Completion, str]:
+    """Run one completion once the scheduler admits it; returns it and the provider that answered."""
+    # Rough estimate (words, as counted when a provider reports no usage), plus the most the model may write
+    async with llm_slot(len(prompt.split()) + max_output_tokens) as ticket:
+        completion, model = await get_llm_router().complete(task, prompt, max_output_tokens, temperature, ticket)
+    set_span_attributes(**{
+        "llm.model": model,
+        "llm.prompt_tokens": completion.prompt_tokens,
+        "llm.completion_tokens": completion.completion_tokens,
+    })
+    return completion, model
 
 
 async def generate_summary_with_context(
@@ -73,3 +97,35 @@ async def generate_summary_with_context(
     
     context = f"Document Title: {document_title}\n\n"
     return await generate_summary(context + text, summary_type)
+
+
+@traced("answer_question")
+async def answer_question(
+    question: str,
+    excerpts: List[str],
+    document_title: str
+) -> tuple[str, int]:
+    """Answer a question from a few retrieved excerpts of a document, rather than its full text."""
+    numbered = "\n\n".join(f"[{number}] {excerpt}" for number, excerpt in enumerate(excerpts, start=1))
+    prompt = f"""You answer questions about a document using only the numbered excerpts below.
+If the excerpts don't contain the answer, say so instead of guessing. Cite excerpts like [1].
+
+Document Title: {document_title}
+
+{numbered}
+
+Question: {question}"""
+    
+    try:
+        completion, _ = await _complete(
+            "answer",
+            prompt,
+            max_output_tokens=settings.QA_MAX_OUTPUT_TOKENS,
+            temperature=0.2
+        )
+    except (LLMRateLimited, LLMUnavailable):
+        raise
+    except Exception as e:
+        raise Exception(f"Error answering question: {str(e)}")
+    
+    return completion.text, completion.prompt_tokens + completion.completion_tokens
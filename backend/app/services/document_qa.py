@@ -0,0 +1,110 @@
+import hashlib
+import re
+from typing import List, NamedTuple, Sequence, Tuple
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import record_cache_lookup
+from app.core.tracing import set_span_attributes
+from app.models.document import Document
+from app.models.document_answer import DocumentAnswer
+from app.models.document_chunk import DocumentChunk
+from app.services.ai_service import answer_question
+from app.services.embeddings import get_embedder
+from app.services.vector_index import embed_document, embed_query, nearest_chunks
+
+
+class Excerpt(NamedTuple):
+    chunk_index: int
+    text: str
+
+
+def normalize_question(question: str) -> str:
+    """Case, spacing and trailing punctuation don't change what is being asked."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+
+def question_hash(question: str) -> str:
+    return hashlib.sha256(normalize_question(question).encode()).hexdigest()
+
+
+def load_excerpts(db: Session, document_id: str, chunk_indexes: Sequence[int]) -> List[Excerpt]:
+    """Chunk texts in document order, cut from the extracted text by the database."""
+    if not chunk_indexes:
+        return []
+    rows = db.query(
+        DocumentChunk.chunk_index,
+        func.substr(
+            Document.extracted_text,
+            DocumentChunk.start_offset + 1,
+            DocumentChunk.end_offset - DocumentChunk.start_offset
+        ).label("text")
+    ).join(
+        Document, Document.id == DocumentChunk.document_id
+    ).filter(
+        DocumentChunk.document_id == document_id,
+        DocumentChunk.embedder == get_embedder().name,
+        DocumentChunk.chunk_index.in_(list(chunk_indexes))
+    ).order_by(DocumentChunk.chunk_index).all()
+    return [Excerpt(row.chunk_index, row.text or "") for row in rows]
+
+
+async def _retrieve(db: Session, document: Document, question: str) -> List[Excerpt]:
+    """The document's chunks closest to the question, embedding the document first if it never was."""
+    has_chunks = db.query(DocumentChunk.id).filter(
+        DocumentChunk.document_id == document.id,
+        DocumentChunk.embedder == get_embedder().name
+    ).first()
+    if not has_chunks:
+        await embed_document(db, document)
+
+    chunk_indexes = nearest_chunks(db, document.id, await embed_query(question), settings.QA_CONTEXT_CHUNKS)
+    return load_excerpts(db, document.id, chunk_indexes)
+
+
+async def answer_document_question(db: Session, document: Document, question: str) -> Tuple[DocumentAnswer, List[Excerpt], bool]:
+    """Answer a question about a document, reusing an earlier answer to the same question.
+
+    Returns the answer, the excerpts it was based on, and whether it came from the cache.
+    """
+    key = question_hash(question)
+    cached = db.query(DocumentAnswer).filter(
+        DocumentAnswer.document_id == document.id,
+        DocumentAnswer.question_hash == key
+    ).first()
+    if cached is not None:
+        record_cache_lookup("document_answers", "hit")
+        indexes = [int(index) for index in cached.source_chunks.split(",") if index]
+        return cached, load_excerpts(db, document.id, indexes), True
+    record_cache_lookup("document_answers", "miss")
+
+    excerpts = await _retrieve(db, document, question)
+    answer, tokens_used = await answer_question(
+        question,
+        [excerpt.text for excerpt in excerpts],
+        document.original_filename
+    )
+    set_span_attributes(**{"qa.excerpts": len(excerpts), "qa.excerpt_chars": sum(len(e.text) for e in excerpts)})
+
+    record = DocumentAnswer(
+        document_id=document.id,
+        question=question.strip(),
+        question_hash=key,
+        answer=answer,
+        source_chunks=",".join(str(excerpt.chunk_index) for excerpt in excerpts),
+        tokens_used=tokens_used,
+        organization_id=document.organization_id
+    )
+    db.add(record)
+    try:
+        db.commit()
+    except IntegrityError:
+        # The same question was answered concurrently; keep the stored answer
+        db.rollback()
+        record = db.query(DocumentAnswer).filter(
+            DocumentAnswer.document_id == document.id,
+            DocumentAnswer.question_hash == key
+        ).one()
+    db.refresh(record)
+    return record, excerpts, False
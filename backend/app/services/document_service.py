@@ -1,65 +1,445 @@
+import asyncio
+import io
+import math
 import os
-from typing import Optional
+import re
+import time
+import zipfile
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from importlib.util import find_spec
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from xml.etree.ElementTree import iterparse
 from PyPDF2 import PdfReader
 from docx import Document as DocxDocument
-import io
+from app.core.config import settings
+from app.core.metrics import EXTRACTION_DURATION, EXTRACTION_PAGE_DURATION
+from app.core.tracing import set_span_attributes, span, traced
+from app.services.storage import FileContent, get_storage
 
+PDF_TYPE = "application/pdf"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+TEXT_TYPE = "text/plain"
+MARKDOWN_TYPE = "text/markdown"
+HTML_TYPE = "text/html"
 
-async def extract_text_from_pdf(file_path: str) -> tuple[str, int]:
-    """Extract text from a PDF file."""
+# Used when the browser sends no useful Content-Type, which is common for Markdown
+EXTENSION_TYPES = {
+    ".pdf": PDF_TYPE,
+    ".docx": DOCX_TYPE,
+    ".pptx": PPTX_TYPE,
+    ".txt": TEXT_TYPE,
+    ".md": MARKDOWN_TYPE,
+    ".markdown": MARKDOWN_TYPE,
+    ".html": HTML_TYPE,
+    ".htm": HTML_TYPE,
+}
+
+LINES_PER_PAGE = 60  # Printed page equivalent for plain text without form feeds
+HTML_READ_SIZE = 64 * 1024
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+DRAWING_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+PRESENTATION_NS = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+RELATIONSHIP_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_RELATIONSHIP_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+EXTENDED_PROPERTIES_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}"
+
+
+class Extractor(NamedTuple):
+    engine: str
+    label: str  # short format name used in metrics and error messages
+    func: Callable[[str], Tuple[str, int]]  # file path -> (text, page count); blocking
+
+
+# MIME type -> engines in the order they are tried
+_extractors: Dict[str, List[Extractor]] = {}
+
+# MIME type -> configured engine to try first ("auto" keeps registration order)
+_preferred_engines: Dict[str, str] = {
+    PDF_TYPE: settings.PDF_EXTRACTION_ENGINE,
+}
+
+
+def register_extractor(mime_type: str, engine: str, label: str, func: Callable[[str], Tuple[str, int]]):
+    """Register a text extraction engine for a MIME type.
+    
+    Engines registered earlier are tried first; when one fails, the next is used.
+    """
+    _extractors.setdefault(mime_type, []).append(Extractor(engine, label, func))
+
+
+def supported_file_types() -> List[str]:
+    """MIME types with at least one registered extractor."""
+    return sorted(_extractors)
+
+
+def _ordered_extractors(mime_type: str) -> List[Extractor]:
+    extractors = _extractors.get(mime_type, [])
+    preferred = _preferred_engines.get(mime_type, "auto")
+    if preferred == "auto":
+        return extractors
+    return sorted(extractors, key=lambda extractor: extractor.engine != preferred)
+
+
+@contextmanager
+def _timed_page(label: str, engine: str, page_number: int):
+    page_start = time.perf_counter()
+    with span("extract_page", **{"document.page": page_number, "extraction.engine": engine}):
+        yield
+    EXTRACTION_PAGE_DURATION.labels(file_type=label, engine=engine).observe(time.perf_counter() - page_start)
+
+
+def _extract_pdf_pypdfium2(file_path: str) -> Tuple[str, int]:
+    import pypdfium2 as pdfium
+    
+    pdf = pdfium.PdfDocument(file_path)
     try:
-        reader = PdfReader(file_path)
-        text = ""
-        page_count = len(reader.pages)
-        
-        for page in reader.pages:
+        pages = []
+        for index in range(len(pdf)):
+            with _timed_page("pdf", "pypdfium2", index + 1):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                pages.append(textpage.get_text_range().replace("\r\n", "\n"))
+                textpage.close()
+                page.close()
+        return "\n".join(pages), len(pages)
+    finally:
+        pdf.close()
+
+
+def _extract_pdf_pdfminer(file_path: str) -> Tuple[str, int]:
+    from pdfminer.converter import TextConverter
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    
+    resource_manager = PDFResourceManager(caching=True)
+    pages = []
+    with open(file_path, "rb") as f:
+        # laparams=None skips layout analysis, which is most of pdfminer's cost
+        for page_number, page in enumerate(PDFPage.get_pages(f), start=1):
+            with _timed_page("pdf", "pdfminer", page_number):
+                output = io.StringIO()
+                device = TextConverter(resource_manager, output, laparams=None)
+                PDFPageInterpreter(resource_manager, device).process_page(page)
+                device.close()
+                pages.append(output.getvalue())
+    return "\n".join(pages), len(pages)
+
+
+def _extract_pdf_pypdf2(file_path: str) -> Tuple[str, int]:
+    reader = PdfReader(file_path)
+    text = ""
+    page_count = len(reader.pages)
+    
+    for page_number, page in enumerate(reader.pages, start=1):
+        with _timed_page("pdf", "pypdf2", page_number):
             text += page.extract_text() + "\n"
-        
+    
+    return text, page_count
+
+
+def _observe_spread(label: str, engine: str, start: float, page_count: int):
+    """Record per-page time for engines that parse a whole file in one pass."""
+    if page_count:
+        EXTRACTION_PAGE_DURATION.labels(file_type=label, engine=engine).observe(
+            (time.perf_counter() - start) / page_count
+        )
+
+
+def _extract_docx(file_path: str) -> Tuple[str, int]:
+    start = time.perf_counter()
+    doc = DocxDocument(file_path)
+    text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+    page_count = len(doc.paragraphs)  # Approximate
+    
+    _observe_spread("docx", "python-docx", start, page_count)
+    return text, page_count
+
+
+def _docx_page_count(archive: zipfile.ZipFile) -> int:
+    """Page count Word stored in docProps/app.xml when it last laid out the document, or 0."""
+    try:
+        with archive.open("docProps/app.xml") as f:
+            for _, element in iterparse(f):
+                if element.tag == f"{EXTENDED_PROPERTIES_NS}Pages" and element.text:
+                    return int(element.text)
+    except (KeyError, ValueError):
+        pass
+    return 0
+
+
+def _extract_docx_streaming(file_path: str) -> Tuple[str, int]:
+    """Stream word/document.xml, clearing each paragraph once read, so memory stays flat.
+    
+    Unlike python-docx's paragraph list this includes table and text box content.
+    Pages come from docProps/app.xml, or from page breaks when that is missing or stale.
+    """
+    start = time.perf_counter()
+    parts = []
+    explicit_breaks = rendered_breaks = 0
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("word/document.xml") as f:
+            for _, element in iterparse(f):
+                tag = element.tag
+                if tag == f"{WORD_NS}t":
+                    parts.append(element.text or "")
+                elif tag == f"{WORD_NS}tab":
+                    parts.append("\t")
+                elif tag == f"{WORD_NS}br":
+                    if element.get(f"{WORD_NS}type") == "page":
+                        explicit_breaks += 1
+                    else:
+                        parts.append("\n")
+                elif tag == f"{WORD_NS}lastRenderedPageBreak":
+                    rendered_breaks += 1
+                elif tag == f"{WORD_NS}p":
+                    parts.append("\n")
+                    element.clear()
+        page_count = max(_docx_page_count(archive), explicit_breaks + 1, rendered_breaks + 1)
+    
+    _observe_spread("docx", "ooxml", start, page_count)
+    return "".join(parts), page_count
+
+
+def _pptx_slide_names(archive: zipfile.ZipFile) -> List[str]:
+    """Slide part names in presentation order."""
+    try:
+        with archive.open("ppt/_rels/presentation.xml.rels") as f:
+            targets = {
+                element.get("Id"): element.get("Target")
+                for _, element in iterparse(f)
+                if element.tag == f"{PACKAGE_RELATIONSHIP_NS}Relationship"
+            }
+        with archive.open("ppt/presentation.xml") as f:
+            slide_ids = [
+                element.get(f"{RELATIONSHIP_NS}id")
+                for _, element in iterparse(f)
+                if element.tag == f"{PRESENTATION_NS}sldId"
+            ]
+        return [
+            "ppt/" + targets[slide_id].lstrip("/").removeprefix("ppt/")
+            for slide_id in slide_ids
+            if slide_id in targets
+        ]
+    except KeyError:
+        # No usable presentation part; fall back to slide numbering
+        names = [name for name in archive.namelist() if re.fullmatch(r"ppt/slides/slide\d+\.xml", name)]
+        return sorted(names, key=lambda name: int(re.search(r"(\d+)\.xml$", name).group(1)))
+
+
+def _extract_pptx(file_path: str) -> Tuple[str, int]:
+    slides = []
+    with zipfile.ZipFile(file_path) as archive:
+        for slide_number, name in enumerate(_pptx_slide_names(archive), start=1):
+            with _timed_page("pptx", "ooxml", slide_number):
+                parts = []
+                with archive.open(name) as f:
+                    for _, element in iterparse(f):
+                        if element.tag == f"{DRAWING_NS}t":
+                            parts.append(element.text or "")
+                        elif element.tag == f"{DRAWING_NS}br":
+                            parts.append("\n")
+                        elif element.tag == f"{DRAWING_NS}p":
+                            parts.append("\n")
+                            element.clear()
+                slides.append("".join(parts).strip())
+    return "\n\n".join(slides), len(slides)
+
+
+def _extract_plain_text(file_path: str) -> Tuple[str, int]:
+    start = time.perf_counter()
+    lines = []
+    form_feeds = 0
+    with open(file_path, encoding="utf-8-sig", errors="replace") as f:
+        for line in f:
+            form_feeds += line.count("\f")
+            lines.append(line)
+    
+    # Form feeds mark page breaks in text exports; otherwise count printed pages
+    page_count = form_feeds + 1 if form_feeds else max(1, math.ceil(len(lines) / LINES_PER_PAGE))
+    _observe_spread("text", "text", start, page_count)
+    return "".join(lines).replace("\f", "\n"), page_count
+
+
+ATX_HEADING = re.compile(r" {0,3}#{1,6}(\s|$)")
+SETEXT_UNDERLINE = re.compile(r" {0,3}(=+|-+)\s*$")
+CODE_FENCE = re.compile(r" {0,3}(```|~~~)")
+
+
+def _extract_markdown(file_path: str) -> Tuple[str, int]:
+    """Markdown is kept as-is for the model; sections are its headings outside code blocks."""
+    start = time.perf_counter()
+    lines = []
+    headings = 0
+    content_before_heading = False
+    fence = None
+    previous_blank = True
+    with open(file_path, encoding="utf-8-sig", errors="replace") as f:
+        for line in f:
+            fence_match = CODE_FENCE.match(line)
+            if fence_match:
+                marker = fence_match.group(1)
+                fence = None if fence == marker else (fence or marker)
+            elif fence is None:
+                if ATX_HEADING.match(line) or (SETEXT_UNDERLINE.match(line) and not previous_blank):
+                    headings += 1
+                elif line.strip() and not headings:
+                    content_before_heading = True
+            previous_blank = not line.strip()
+            lines.append(line)
+    
+    page_count = max(1, headings + (1 if content_before_heading else 0))
+    _observe_spread("markdown", "markdown", start, page_count)
+    return "".join(lines), page_count
+
+
+class _HTMLTextParser(HTMLParser):
+    """Collect visible text from HTML as it streams in, without building a DOM."""
+    
+    SKIPPED = {"script", "style", "noscript", "template", "svg"}
+    HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+    BLOCKS = HEADINGS | {
+        "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption",
+        "footer", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table",
+        "td", "th", "title", "tr", "ul",
+    }
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.headings = 0
+        self._skip_depth = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self._skip_depth += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+            if tag in self.HEADINGS:
+                self.headings += 1
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+    
+    def handle_data(self, data):
+        if not self._skip_depth:
+            # Source line breaks are just whitespace; block tags decide where lines end
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+
+def _extract_html(file_path: str) -> Tuple[str, int]:
+    start = time.perf_counter()
+    parser = _HTMLTextParser()
+    with open(file_path, encoding="utf-8-sig", errors="replace") as f:
+        while chunk := f.read(HTML_READ_SIZE):
+            parser.feed(chunk)
+    parser.close()
+    
+    text = re.sub(r" *\n[ \n]*", "\n", "".join(parser.parts)).strip()
+    page_count = max(1, parser.headings)
+    _observe_spread("html", "html.parser", start, page_count)
+    return text, page_count
+
+
+# pypdfium2 and pdfminer.six are optional and imported on first use. pdfminer is
+# slower than PyPDF2 even without layout analysis, so it is only a last resort
+# for files the other engines can't parse (unless configured first).
+if find_spec("pypdfium2") is not None:
+    register_extractor(PDF_TYPE, "pypdfium2", "pdf", _extract_pdf_pypdfium2)
+register_extractor(PDF_TYPE, "pypdf2", "pdf", _extract_pdf_pypdf2)
+if find_spec("pdfminer") is not None:
+    register_extractor(PDF_TYPE, "pdfminer", "pdf", _extract_pdf_pdfminer)
+register_extractor(DOCX_TYPE, "ooxml", "docx", _extract_docx_streaming)
+register_extractor(DOCX_TYPE, "python-docx", "docx", _extract_docx)
+register_extractor(PPTX_TYPE, "ooxml", "pptx", _extract_pptx)
+register_extractor(TEXT_TYPE, "text", "text", _extract_plain_text)
+register_extractor(MARKDOWN_TYPE, "markdown", "markdown", _extract_markdown)
+register_extractor("text/x-markdown", "markdown", "markdown", _extract_markdown)
+register_extractor(HTML_TYPE, "html.parser", "html", _extract_html)
+
+
+def resolve_file_type(content_type: Optional[str], filename: Optional[str]) -> str:
+    """The MIME type to treat an upload as.
+    
+    Parameters such as charset are dropped, and a missing or generic type is
+    inferred from the file extension.
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("", "application/octet-stream"):
+        extension = os.path.splitext(filename or "")[1].lower()
+        return EXTENSION_TYPES.get(extension, content_type)
+    return content_type
+
+
+async def _extract(file_path: str, file_type: str) -> tuple[str, int]:
+    """Run the registered engines for a type in order until one succeeds, off the event loop."""
+    extractors = _ordered_extractors(file_type)
+    if not extractors:
+        raise ValueError(
+            f"Unsupported file type: {file_type}. Supported types: {', '.join(supported_file_types())}."
+        )
+    
+    errors = []
+    for extractor in extractors:
+        start = time.perf_counter()
+        try:
+            text, page_count = await asyncio.to_thread(extractor.func, file_path)
+        except Exception as e:
+            print(f"Text extraction with {extractor.engine} failed: {e}")
+            errors.append(f"{extractor.engine}: {e}")
+            continue
+        EXTRACTION_DURATION.labels(file_type=extractor.label, engine=extractor.engine).observe(
+            time.perf_counter() - start
+        )
+        set_span_attributes(**{
+            "document.file_type": extractor.label,
+            "document.page_count": page_count,
+            "extraction.engine": extractor.engine,
+        })
         return text.strip(), page_count
-    except Exception as e:
-        raise Exception(f"Error extracting text from PDF: {str(e)}")
+    
+    raise Exception(f"Error extracting text from {extractors[0].label.upper()}: {'; '.join(errors)}")
+
+
+async def extract_text_from_pdf(file_path: str) -> tuple[str, int]:
+    """Extract text from a PDF file."""
+    return await _extract(file_path, PDF_TYPE)
 
 
 async def extract_text_from_docx(file_path: str) -> tuple[str, int]:
     """Extract text from a DOCX file."""
-    try:
-        doc = DocxDocument(file_path)
-        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-        page_count = len(doc.paragraphs)  # Approximate
-        
-        return text.strip(), page_count
-    except Exception as e:
-        raise Exception(f"Error extracting text from DOCX: {str(e)}")
+    return await _extract(file_path, DOCX_TYPE)
 
 
+@traced("extract_text_from_file")
 async def extract_text_from_file(file_path: str, file_type: str) -> tuple[str, int]:
     """Extract text from a file based on its type."""
-    if file_type == "application/pdf":
-        return await extract_text_from_pdf(file_path)
-    elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-        return await extract_text_from_docx(file_path)
-    else:
-        raise ValueError(f"Unsupported file type: {file_type}. Only PDF and DOCX (Office 2007+) files are supported.")
+    return await _extract(file_path, file_type)
 
 
-async def save_uploaded_file(file_content: bytes, filename: str, upload_dir: str) -> str:
-    """Save an uploaded file to disk."""
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, filename)
-    
-    with open(file_path, "wb") as f:
-        f.write(file_content)
-    
-    return file_path
+@traced("save_uploaded_file")
+async def save_uploaded_file(file_content: FileContent, key: str) -> str:
+    """Save an uploaded file to the configured storage backend and return its locator."""
+    set_span_attributes(**{"storage.key": key, "storage.backend": settings.STORAGE_BACKEND})
+    return await get_storage().save(key, file_content)
 
 
 async def delete_file(file_path: str) -> bool:
-    """Delete a file from disk."""
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return True
-        return False
-    except Exception as e:
-        print(f"Error deleting file: {e}")
-        return False
+    """Delete a stored file."""
+    return await get_storage(file_path).delete(file_path)
+
+
+async def delete_files(file_paths: List[str], concurrency: int = 8) -> List[bool]:
+    """Delete many stored files concurrently, without blocking the event loop."""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def _delete(file_path: str) -> bool:
+        async with semaphore:
+            return await delete_file(file_path)
+    
+    return await asyncio.gather(*[_delete(file_path) for file_path in file_paths])
@@ -0,0 +1,156 @@
+import hashlib
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+LINE = re.compile(r"[^\n]+")
+TOKEN = re.compile(r"\w+")
+# Function words carry no topic; left in, they make every English chunk look alike
+STOPWORDS = frozenset(
+    "a an and are as at be but by can did do does for from had has have how i if in into is it its "
+    "may of on or our so than that the their them then there these they this to was we were what "
+    "when where which who why will with would you your".split()
+)
+
+
+class TextChunk(NamedTuple):
+    index: int
+    start: int  # Offsets into the extracted text
+    end: int
+    content_hash: str
+
+
+def _units(text: str, max_chars: int) -> List[Tuple[int, int]]:
+    """Line spans, with lines longer than max_chars split at whitespace."""
+    units = []
+    for line in LINE.finditer(text):
+        start, end = line.span()
+        while end - start > max_chars:
+            cut = text.rfind(" ", start + max_chars // 2, start + max_chars)
+            cut = cut + 1 if cut != -1 else start + max_chars
+            units.append((start, cut))
+            start = cut
+        if text[start:end].strip():
+            units.append((start, end))
+    return units
+
+
+def chunk_text(text: str, target_chars: Optional[int] = None) -> List[TextChunk]:
+    """Split text into chunks of roughly target_chars, ending only at line breaks.
+
+    Boundaries are content-defined: a chunk past half the target ends after a
+    line whose hash picks it (or when it reaches the target). An edit
+    therefore only changes the chunks around it; later boundaries fall on the
+    same lines as before, so unchanged chunks keep their content hash.
+    """
+    target_chars = target_chars or settings.EMBEDDING_CHUNK_CHARS
+    chunks = []
+    chunk_start = None
+    for start, end in _units(text, target_chars):
+        if chunk_start is None:
+            chunk_start = start
+        length = end - chunk_start
+        line_hash = hashlib.blake2b(text[start:end].encode(), digest_size=2).digest()
+        if length >= target_chars or (length >= target_chars // 2 and line_hash[0] % 4 == 0):
+            chunks.append((chunk_start, end))
+            chunk_start = None
+    if chunk_start is not None:
+        chunks.append((chunk_start, len(text.rstrip())))
+
+    return [
+        TextChunk(index, start, end, hashlib.sha256(text[start:end].encode()).hexdigest())
+        for index, (start, end) in enumerate(chunks)
+    ]
+
+
+def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-row symmetric int8 quantization; returns (int8 vectors, float32 scales)."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class Embedder(ABC):
+    """Turns text into L2-normalized float32 vectors of a fixed size."""
+
+    name: str
+    dimensions: int
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """A (len(texts), dimensions) float32 array. Blocking; call from a worker thread."""
+
+
+class HashingEmbedder(Embedder):
+    """Signed feature hashing of words and word pairs.
+
+    Deterministic and dependency-free: fine for tests, benchmarks and
+    near-duplicate detection, but it has no notion of synonyms.
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+        self._feature = lru_cache(maxsize=65536)(self._feature_uncached)
+
+    def _feature_uncached(self, token: str) -> Tuple[int, float]:
+        digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+        return digest % self.dimensions, 1.0 if digest >> 63 else -1.0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [word for word in TOKEN.findall(text.lower()) if word not in STOPWORDS]
+            features = [self._feature(word) for word in words]
+            features += [self._feature(f"{a} {b}") for a, b in zip(words, words[1:])]
+            if features:
+                indexes, signs = zip(*features)
+                counts = np.bincount(indexes, weights=signs, minlength=self.dimensions)
+                # Sublinear term frequency, so repeated words don't dominate
+                vectors[row] = np.sign(counts) * np.log1p(np.abs(counts))
+        return normalize(vectors)
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """A local sentence-transformers model, run on the CPU (pip install sentence-transformers)."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dimensions = self._model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self._model.encode(texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True)
+        return vectors.astype(np.float32)
+
+
+_embedder: Optional[Embedder] = None
+
+
+def get_embedder() -> Embedder:
+    """The process-wide embedder, chosen by settings.EMBEDDING_BACKEND."""
+    global _embedder
+    if _embedder is None:
+        if settings.EMBEDDING_BACKEND == "sentence-transformers":
+            _embedder = SentenceTransformerEmbedder(settings.EMBEDDING_MODEL)
+        else:
+            _embedder = HashingEmbedder(settings.EMBEDDING_DIMENSIONS)
+    return _embedder
+
+
+def set_embedder(embedder: Embedder):
+    """Replace the embedder, e.g. with a HashingEmbedder in tests."""
+    global _embedder
+    _embedder = embedder
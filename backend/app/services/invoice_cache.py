@@ -0,0 +1,150 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.invoice import Invoice
+from app.models.organization import Organization
+from app.services.stripe_service import list_invoices
+
+INVOICE_EVENT_TYPES = {
+    "invoice.created",
+    "invoice.finalized",
+    "invoice.updated",
+    "invoice.paid",
+    "invoice.payment_failed",
+    "invoice.voided",
+    "invoice.marked_uncollectible",
+}
+
+# Refreshes in flight in this process, by organization; holding the task keeps it alive
+_refreshes: Dict[str, asyncio.Task] = {}
+# When each organization's last refresh failed (monotonic time), for backing off
+_failed_at: Dict[str, float] = {}
+
+
+def upsert_invoice(db: Session, organization_id: str, invoice: dict):
+    """Insert or update the cached copy of a Stripe invoice. Does not commit."""
+    record = db.query(Invoice).filter(Invoice.id == invoice["id"]).first()
+    if record is None:
+        record = Invoice(id=invoice["id"], organization_id=organization_id)
+        db.add(record)
+    record.stripe_customer_id = invoice["customer"]
+    record.amount_paid = invoice.get("amount_paid") or 0
+    record.status = invoice.get("status")
+    record.invoice_pdf = invoice.get("invoice_pdf")
+    record.stripe_created = invoice["created"]
+
+
+def apply_invoice_event(db: Session, event: dict):
+    """Update the cache from an invoice.* webhook event. Does not commit."""
+    invoice = event["data"]["object"]
+    org = db.query(Organization).filter(
+        Organization.stripe_customer_id == invoice.get("customer")
+    ).first()
+    if org:
+        upsert_invoice(db, org.id, invoice)
+
+
+def get_cached_invoices(db: Session, organization_id: str, limit: int = 10) -> List[dict]:
+    """The organization's most recent invoices, formatted for the billing page."""
+    invoices = db.query(Invoice).filter(
+        Invoice.organization_id == organization_id
+    ).order_by(Invoice.stripe_created.desc()).limit(limit).all()
+
+    return [
+        {
+            "id": invoice.id,
+            "date": invoice.stripe_created,
+            "amount": invoice.amount_paid / 100,  # Convert cents to dollars
+            "status": invoice.status,
+            "downloadUrl": invoice.invoice_pdf
+        }
+        for invoice in invoices
+    ]
+
+
+def is_stale(organization: Organization) -> bool:
+    """Whether the organization's invoices are due for a refresh from Stripe."""
+    if organization.invoices_synced_at is None:
+        return True
+    synced_at = organization.invoices_synced_at.replace(tzinfo=None)
+    return synced_at < datetime.utcnow() - timedelta(seconds=settings.INVOICE_CACHE_TTL_SECONDS)
+
+
+def _store_invoices(organization_id: str, invoices: List[dict]):
+    db = SessionLocal()
+    try:
+        for invoice in invoices:
+            upsert_invoice(db, organization_id, invoice)
+        db.query(Organization).filter(Organization.id == organization_id).update(
+            {"invoices_synced_at": datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _refresh(organization_id: str, customer_id: str) -> bool:
+    try:
+        invoices = await list_invoices(customer_id)
+        await asyncio.to_thread(_store_invoices, organization_id, invoices)
+    except Exception as e:
+        print(f"Error refreshing invoices for organization {organization_id}: {e}")
+        _failed_at[organization_id] = time.monotonic()
+        return False
+    _failed_at.pop(organization_id, None)
+    return True
+
+
+def _start_refresh(organization_id: str, customer_id: str) -> asyncio.Task:
+    task = _refreshes.get(organization_id)
+    if task is None:
+        task = asyncio.create_task(_refresh(organization_id, customer_id))
+        _refreshes[organization_id] = task
+        task.add_done_callback(lambda _: _refreshes.pop(organization_id, None))
+    return task
+
+
+async def refresh_invoices(organization_id: str, customer_id: str) -> bool:
+    """Refresh one organization's cached invoices from Stripe; returns whether it succeeded.
+
+    Concurrent calls share one refresh, and all wait for it to finish.
+    """
+    # Shielded, so a caller going away doesn't cancel the refresh others are waiting on
+    return await asyncio.shield(_start_refresh(organization_id, customer_id))
+
+
+def refresh_failed_recently(organization_id: str) -> bool:
+    """Whether the last refresh failed less than INVOICE_REFRESH_RETRY_SECONDS ago."""
+    failed_at = _failed_at.get(organization_id)
+    return failed_at is not None and time.monotonic() - failed_at < settings.INVOICE_REFRESH_RETRY_SECONDS
+
+
+def schedule_refresh(organization_id: str, customer_id: str):
+    """Refresh in the background; the caller keeps serving the cached copy."""
+    _start_refresh(organization_id, customer_id)
+
+
+async def refresh_stale_invoices() -> int:
+    """Periodic job: refresh organizations whose invoice cache has expired."""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.INVOICE_CACHE_TTL_SECONDS)
+
+    def _stale_organizations() -> list:
+        db = SessionLocal()
+        try:
+            return db.query(Organization.id, Organization.stripe_customer_id).filter(
+                Organization.stripe_customer_id.isnot(None),
+                or_(Organization.invoices_synced_at.is_(None), Organization.invoices_synced_at < cutoff)
+            ).order_by(Organization.invoices_synced_at).limit(settings.INVOICE_REFRESH_BATCH_SIZE).all()
+        finally:
+            db.close()
+
+    refreshed = 0
+    for organization_id, customer_id in await asyncio.to_thread(_stale_organizations):
+        if await refresh_invoices(organization_id, customer_id):
+            refreshed += 1
+    return refreshed
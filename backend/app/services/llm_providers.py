@@ -0,0 +1,117 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Optional
+import httpx
+from app.core.config import settings
+
+
+class Completion(NamedTuple):
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class LLMProvider(ABC):
+    """One model behind one API. `name` ("kind:model") identifies it in routes and metrics."""
+
+    name: str
+
+    @abstractmethod
+    async def complete(self, prompt: str, max_output_tokens: int, temperature: float) -> Completion:
+        """Run one completion. Raise on any failure; the router decides what to try next."""
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through the google-generativeai SDK.
+
+    The SDK blocks, so calls run in a worker thread; one the router gives up on
+    keeps its thread until the SDK returns.
+    """
+
+    def __init__(self, model: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self._genai = genai
+        self._model = genai.GenerativeModel(model)
+        self.name = f"gemini:{model}"
+
+    def _complete(self, prompt: str, max_output_tokens: int, temperature: float) -> Completion:
+        response = self._model.generate_content(
+            prompt,
+            generation_config=self._genai.types.GenerationConfig(
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            )
+        )
+
+        # Handle response parts properly
+        if response.candidates:
+            output = ""
+            for part in response.candidates[0].content.parts:
+                output += part.text
+        else:
+            output = response.text
+
+        # Gemini doesn't return token count in same way, estimate it
+        return Completion(output, len(prompt.split()), len(output.split()))
+
+    async def complete(self, prompt: str, max_output_tokens: int, temperature: float) -> Completion:
+        return await asyncio.to_thread(self._complete, prompt, max_output_tokens, temperature)
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any /chat/completions API in OpenAI's format: OpenAI, Azure, vLLM, Ollama, LiteLLM..."""
+
+    def __init__(self, model: str, base_url: Optional[str] = None, api_key: Optional[str] = None):
+        self.model = model
+        self.name = f"openai:{model}"
+        self._client = httpx.AsyncClient(
+            base_url=(base_url or settings.OPENAI_API_BASE).rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key or settings.OPENAI_API_KEY}"},
+            timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=settings.LLM_GLOBAL_CONCURRENCY)
+        )
+
+    async def complete(self, prompt: str, max_output_tokens: int, temperature: float) -> Completion:
+        response = await self._client.post("/chat/completions", json={
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_output_tokens,
+            "temperature": temperature,
+        })
+        response.raise_for_status()
+        body = response.json()
+        output = body["choices"][0]["message"]["content"] or ""
+        usage = body.get("usage") or {}
+        return Completion(
+            output,
+            usage.get("prompt_tokens", len(prompt.split())),
+            usage.get("completion_tokens", len(output.split()))
+        )
+
+
+class EchoProvider(LLMProvider):
+    """Answers with the end of the prompt after a fixed delay. For tests, benchmarks and offline development."""
+
+    def __init__(self, latency_ms: float = 0.0, name: str = "echo"):
+        self.latency_ms = latency_ms
+        self.name = name
+
+    async def complete(self, prompt: str, max_output_tokens: int, temperature: float) -> Completion:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        output = "Summary: " + " ".join(prompt.split()[-40:])
+        return Completion(output, len(prompt.split()), len(output.split()))
+
+
+def create_provider(name: str) -> LLMProvider:
+    """Build a provider from a route entry: "gemini:<model>", "openai:<model>" or "echo"."""
+    kind, _, model = name.partition(":")
+    if kind == "gemini":
+        return GeminiProvider(model or settings.GEMINI_MODEL)
+    if kind == "openai":
+        return OpenAICompatibleProvider(model or settings.OPENAI_MODEL)
+    if kind == "echo":
+        return EchoProvider(name=name)
+    raise ValueError(f"Unknown LLM provider: {name}")
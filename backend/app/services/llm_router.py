@@ -0,0 +1,254 @@
+"""Picks the provider for each model call, and falls back, hedges and sheds load.
+
+LLM_ROUTES maps a task (a summary type, "section", "answer" or "default") to
+providers in order of preference. Among those whose circuit is closed, the
+router ranks by observed latency and error rate, so a provider that slows down
+loses traffic to the next one. It then:
+
+- starts a hedge on the next-ranked provider when the first call runs past
+  that provider's usual latency (its smoothed latency plus four deviations),
+  and takes whichever answers first. A hedge is a second call, so it needs a
+  scheduler slot of its own and is skipped when none is free right away;
+- falls back down the list when a call fails;
+- opens a provider's circuit after LLM_BREAKER_FAILURES failed or slow calls
+  in a row, so it stops holding request slots; after a cooldown one trial call
+  decides whether it closes again.
+"""
+import asyncio
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import LLM_CIRCUIT_OPENED, LLM_HEDGES, LLM_REQUEST_DURATION, LLM_TOKENS
+from app.services.llm_providers import Completion, LLMProvider, create_provider
+from app.services.llm_scheduler import Ticket, release_llm_slot, try_llm_slot
+
+# Weight of the newest observation in the moving averages
+EWMA_ALPHA = 0.2
+# A later provider in a route must look this much better per place to be ranked first
+ROUTE_ORDER_BIAS = 0.25
+
+
+class LLMUnavailable(Exception):
+    """Every provider for the task has its circuit open; they're tried again after the cooldown."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def _charge(ticket: Ticket, task: asyncio.Task):
+    """Settle a call's slot with its real usage; a failed or abandoned call is charged the estimate."""
+    if not task.cancelled() and task.exception() is None:
+        completion = task.result()
+        ticket.tokens_used = completion.prompt_tokens + completion.completion_tokens
+
+
+class ProviderHealth:
+    """Smoothed latency and error rate of one provider, and its circuit breaker."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None  # Smoothed seconds per successful call
+        self.deviation = 0.0
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_running = False
+
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until or (self.open_until > 0 and self.trial_running)
+
+    def expected_cost(self) -> float:
+        """Expected seconds to a successful answer; unmeasured providers look free, so they get tried."""
+        if self.latency is None:
+            return 0.0
+        return self.latency / max(1.0 - self.error_rate, 0.05)
+
+    def hedge_delay(self) -> float:
+        if self.latency is None:
+            return settings.LLM_SLOW_CALL_SECONDS
+        return max(settings.LLM_HEDGE_MIN_DELAY_SECONDS, self.latency + 4 * self.deviation)
+
+    def begin(self, now: float):
+        if self.open_until and now >= self.open_until:
+            self.trial_running = True  # Half-open: this call decides
+
+    def end(self):
+        """The call was abandoned (a hedge that lost) without telling us anything."""
+        self.trial_running = False
+
+    def succeeded(self, latency: float, now: float) -> bool:
+        """Record a success; returns False if it was too slow and counted as a failure."""
+        if self.latency is None:
+            self.latency, self.deviation = latency, latency / 2
+        else:
+            self.deviation += EWMA_ALPHA * (abs(latency - self.latency) - self.deviation)
+            self.latency += EWMA_ALPHA * (latency - self.latency)
+        if latency > settings.LLM_SLOW_CALL_SECONDS:
+            self.failed(now)
+            return False
+        self.error_rate *= 1 - EWMA_ALPHA
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_running = False
+        return True
+
+    def failed(self, now: float) -> bool:
+        """Record a failure; returns True if that opened the circuit."""
+        self.error_rate += EWMA_ALPHA * (1.0 - self.error_rate)
+        self.consecutive_failures += 1
+        was_trial, self.trial_running = self.trial_running, False
+        if was_trial or self.consecutive_failures >= settings.LLM_BREAKER_FAILURES:
+            self.open_until = now + settings.LLM_BREAKER_COOLDOWN_SECONDS
+            return True
+        return False
+
+
+def default_routes() -> Dict[str, List[str]]:
+    routes = {"default": [f"gemini:{settings.GEMINI_MODEL}"]}
+    routes.update(settings.LLM_ROUTES)
+    return routes
+
+
+class LLMRouter:
+    def __init__(self, routes: Optional[Dict[str, List[str]]] = None, providers: Optional[List[LLMProvider]] = None):
+        self.routes = routes or default_routes()
+        self._providers: Dict[str, LLMProvider] = {provider.name: provider for provider in providers or []}
+        self.health: Dict[str, ProviderHealth] = {}
+
+    def _provider(self, name: str) -> LLMProvider:
+        if name not in self._providers:
+            self._providers[name] = create_provider(name)
+        return self._providers[name]
+
+    def _health(self, name: str) -> ProviderHealth:
+        if name not in self.health:
+            self.health[name] = ProviderHealth()
+        return self.health[name]
+
+    def candidates(self, task: str) -> List[str]:
+        """The task's providers with a closed (or trial-ready) circuit, best first."""
+        route = self.routes.get(task) or self.routes["default"]
+        now = time.monotonic()
+        ranked = [
+            (self._health(name).expected_cost() * (1 + ROUTE_ORDER_BIAS * place), place, name)
+            for place, name in enumerate(route)
+            if not self._health(name).is_open(now)
+        ]
+        return [name for _, _, name in sorted(ranked)]
+
+    async def _attempt(self, name: str, prompt: str, max_output_tokens: int, temperature: float) -> Completion:
+        health = self._health(name)
+        start = time.monotonic()
+        health.begin(start)
+        try:
+            completion = await asyncio.wait_for(
+                self._provider(name).complete(prompt, max_output_tokens, temperature),
+                timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS
+            )
+        except asyncio.CancelledError:
+            health.end()
+            raise
+        except Exception:
+            now = time.monotonic()
+            LLM_REQUEST_DURATION.labels(model=name, outcome="error").observe(now - start)
+            if health.failed(now):
+                LLM_CIRCUIT_OPENED.labels(model=name).inc()
+                print(f"LLM provider {name} is failing; not using it for {settings.LLM_BREAKER_COOLDOWN_SECONDS}s")
+            raise
+        now = time.monotonic()
+        LLM_REQUEST_DURATION.labels(model=name, outcome="success").observe(now - start)
+        LLM_TOKENS.labels(model=name, kind="prompt").inc(completion.prompt_tokens)
+        LLM_TOKENS.labels(model=name, kind="completion").inc(completion.completion_tokens)
+        if not health.succeeded(now - start, now) and health.is_open(now):
+            LLM_CIRCUIT_OPENED.labels(model=name).inc()
+        return completion
+
+    async def complete(self, task: str, prompt: str, max_output_tokens: int, temperature: float,
+                       ticket: Optional[Ticket] = None) -> Tuple[Completion, str]:
+        """Run a completion for a task; returns it and the name of the provider that answered.
+
+        `ticket` is the caller's scheduler slot, which the first call and any
+        fallbacks run under; it's settled with the usage of whichever answers.
+        """
+        waiting = self.candidates(task)
+        if not waiting:
+            now = time.monotonic()
+            route = self.routes.get(task) or self.routes["default"]
+            reopens_in = min(self._health(name).open_until for name in route) - now
+            # Past the cooldown only while another request's trial call is deciding
+            retry_after = reopens_in if reopens_in > 0 else settings.LLM_BREAKER_COOLDOWN_SECONDS
+            raise LLMUnavailable(f"Every provider for '{task}' is failing; try again shortly", retry_after)
+
+        running: Dict[asyncio.Task, str] = {}
+        hedge_tasks = set()
+
+        def start(name: str, hedge_ticket: Optional[Ticket] = None):
+            attempt = asyncio.create_task(self._attempt(name, prompt, max_output_tokens, temperature))
+            if hedge_ticket is not None:
+                hedge_tasks.add(attempt)
+
+                def finished(attempt: asyncio.Task):
+                    _charge(hedge_ticket, attempt)
+                    release_llm_slot(hedge_ticket)
+
+                attempt.add_done_callback(finished)
+            running[attempt] = name
+
+        primary = waiting.pop(0)
+        start(primary)
+        hedge_at = time.monotonic() + self._health(primary).hedge_delay()
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while running:
+                timeout = None
+                if settings.LLM_HEDGING_ENABLED and not hedged and waiting:
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slow tail: race the next provider, if the scheduler has room for another call
+                    hedged = True
+                    hedge_ticket = try_llm_slot(ticket.cost if ticket else len(prompt.split()) + max_output_tokens)
+                    if hedge_ticket is None:
+                        LLM_HEDGES.labels(outcome="skipped").inc()
+                        continue
+                    LLM_HEDGES.labels(outcome="started").inc()
+                    start(waiting.pop(0), hedge_ticket)
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        if task in hedge_tasks:
+                            LLM_HEDGES.labels(outcome="won").inc()
+                        elif ticket is not None:
+                            _charge(ticket, task)
+                        return task.result(), name
+                    last_error = task.exception()
+                if not running and waiting:
+                    # Fall back to the next provider
+                    start(waiting.pop(0))
+        finally:
+            for task in running:
+                task.cancel()
+        raise last_error
+
+
+_router: Optional[LLMRouter] = None
+
+
+def get_llm_router() -> LLMRouter:
+    global _router
+    if _router is None:
+        _router = LLMRouter()
+    return _router
+
+
+def set_llm_router(router: LLMRouter):
+    """Replace the router, e.g. with one routing everything to an EchoProvider in tests."""
+    global _router
+    _router = router
@@ -0,0 +1,304 @@
+"""Admission control for LLM calls: fair shares between tenants, and budgets.
+
+Every model call asks the scheduler for a slot first. Each organization has a
+tokens-per-minute budget and a concurrency limit set by its plan; calls within
+budget wait in a weighted fair queue (start-time fair queuing, weighted by
+plan), so one tenant's batch can't starve the others. Global request, token and
+concurrency caps keep the whole worker under the provider's rate limits.
+
+Interactive callers are told to retry later (LLMRateLimited, a 429) when their
+organization's budget would make them wait more than LLM_MAX_WAIT_SECONDS;
+background work just waits. Budgets are tracked per worker process.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Dict, NamedTuple, Optional
+from app.core.config import settings
+from app.core.metrics import LLM_QUEUE_WAIT, LLM_RATE_LIMITED
+from app.core.tracing import set_span_attributes
+
+
+class LLMTenant(NamedTuple):
+    organization_id: str
+    plan_type: str
+    background: bool = False  # Wait for budget instead of being rate limited
+
+
+# Set by the endpoint or job on whose behalf the model is called
+_tenant: ContextVar[Optional[LLMTenant]] = ContextVar("llm_tenant", default=None)
+
+# Calls made outside any tenant (scripts, benchmarks) share one budget
+UNATTRIBUTED = LLMTenant("", "basic", background=True)
+
+
+def set_llm_tenant(organization_id: str, plan_type: Optional[str], background: bool = False):
+    """Attribute model calls made from here on (including in spawned tasks) to an organization."""
+    _tenant.set(LLMTenant(organization_id, plan_type or "basic", background))
+
+
+class LLMRateLimited(Exception):
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(f"LLM {reason} exceeded; retry in {math.ceil(retry_after)}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def plan_limits(plan_type: str) -> tuple[int, int, int]:
+    """(concurrency, tokens per minute, fair-share weight) for a plan."""
+    if plan_type == "pro":
+        return settings.LLM_PRO_CONCURRENCY, settings.LLM_PRO_TPM, settings.LLM_PRO_WEIGHT
+    return settings.LLM_BASIC_CONCURRENCY, settings.LLM_BASIC_TPM, settings.LLM_BASIC_WEIGHT
+
+
+class TokenBucket:
+    """A per-minute budget that refills continuously. It may go into debt."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def resize(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = min(self.tokens, self.capacity)
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available; more than the capacity needs a full bucket."""
+        self._refill(now)
+        shortfall = min(amount, self.capacity) - self.tokens
+        return max(0.0, shortfall * 60.0 / self.capacity) if self.capacity > 0 else math.inf
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+
+    def give_back(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class Ticket:
+    """An admitted call. Set tokens_used once the real count is known."""
+
+    __slots__ = ("tenant", "cost", "start_tag", "finish_tag", "not_before", "enqueued", "future", "tokens_used")
+
+    def __init__(self, tenant: LLMTenant, cost: int):
+        self.tenant = tenant
+        self.cost = cost
+        self.tokens_used: Optional[int] = None
+
+
+class _TenantState:
+    __slots__ = ("plan_type", "concurrency", "weight", "budget", "queue", "in_flight", "last_finish")
+
+    def __init__(self, plan_type: str):
+        self.plan_type = plan_type
+        self.concurrency, tokens_per_minute, self.weight = plan_limits(plan_type)
+        self.budget = TokenBucket(tokens_per_minute)
+        self.queue: Deque[Ticket] = deque()
+        self.in_flight = 0
+        self.last_finish = 0.0
+
+    def set_plan(self, plan_type: str):
+        if plan_type != self.plan_type:
+            self.plan_type = plan_type
+            self.concurrency, tokens_per_minute, self.weight = plan_limits(plan_type)
+            self.budget.resize(tokens_per_minute)
+
+
+class LLMScheduler:
+    """Weighted fair queuing of model calls across organizations, within global limits."""
+
+    def __init__(self):
+        self._tenants: Dict[str, _TenantState] = {}
+        self._virtual_time = 0.0
+        self._in_flight = 0
+        self._requests = TokenBucket(settings.LLM_GLOBAL_RPM)
+        self._tokens = TokenBucket(settings.LLM_GLOBAL_TPM)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = math.inf
+
+    def _state(self, tenant: LLMTenant) -> _TenantState:
+        state = self._tenants.get(tenant.organization_id)
+        if state is None:
+            if len(self._tenants) >= settings.LLM_MAX_TRACKED_TENANTS:
+                self._forget_idle_tenants()
+            state = self._tenants[tenant.organization_id] = _TenantState(tenant.plan_type)
+        state.set_plan(tenant.plan_type)
+        return state
+
+    def _forget_idle_tenants(self):
+        """Drop tenants with nothing queued or running and a full budget; they'd start over the same."""
+        now = time.monotonic()
+        for organization_id, state in list(self._tenants.items()):
+            if not state.queue and not state.in_flight and state.budget.is_full(now):
+                del self._tenants[organization_id]
+
+    async def acquire(self, tenant: LLMTenant, cost: int) -> Ticket:
+        now = time.monotonic()
+        state = self._state(tenant)
+        budget_wait = state.budget.wait_time(cost, now)
+        if not tenant.background:
+            if budget_wait > settings.LLM_MAX_WAIT_SECONDS:
+                LLM_RATE_LIMITED.labels(reason="tokens_per_minute").inc()
+                raise LLMRateLimited(budget_wait, "tokens-per-minute budget")
+            if len(state.queue) >= settings.LLM_MAX_QUEUED_PER_TENANT:
+                LLM_RATE_LIMITED.labels(reason="queue_full").inc()
+                raise LLMRateLimited(1.0, "request queue")
+
+        # Charge the budget now, so later calls see this one; it runs once the budget recovers
+        state.budget.take(cost, now)
+        ticket = Ticket(tenant, cost)
+        ticket.not_before = now + budget_wait
+        ticket.enqueued = now
+        ticket.start_tag = max(self._virtual_time, state.last_finish)
+        ticket.finish_tag = ticket.start_tag + cost / state.weight
+        state.last_finish = ticket.finish_tag
+        ticket.future = asyncio.get_running_loop().create_future()
+        state.queue.append(ticket)
+        self._dispatch()
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                self.release(ticket)
+            else:
+                state.queue.remove(ticket)
+                state.budget.give_back(cost)
+            raise
+        LLM_QUEUE_WAIT.observe(time.monotonic() - now)
+        return ticket
+
+    def try_acquire(self, tenant: LLMTenant, cost: int) -> Optional[Ticket]:
+        """Admit a call right away if every limit has room and nobody is queued; never waits.
+
+        For optional extra calls, such as hedges, that are worth making only when free.
+        """
+        now = time.monotonic()
+        state = self._state(tenant)
+        if (
+            self._in_flight >= settings.LLM_GLOBAL_CONCURRENCY
+            or state.in_flight >= state.concurrency
+            or any(other.queue for other in self._tenants.values())
+            or state.budget.wait_time(cost, now) > 0
+            or self._requests.wait_time(1, now) > 0
+            or self._tokens.wait_time(cost, now) > 0
+        ):
+            return None
+        state.budget.take(cost, now)
+        self._requests.take(1, now)
+        self._tokens.take(cost, now)
+        state.in_flight += 1
+        self._in_flight += 1
+        return Ticket(tenant, cost)
+
+    def release(self, ticket: Ticket):
+        state = self._tenants.get(ticket.tenant.organization_id)
+        used = ticket.tokens_used if ticket.tokens_used is not None else ticket.cost
+        self._in_flight -= 1
+        # Settle the estimate against what the call really used
+        self._tokens.give_back(ticket.cost - used)
+        if state is not None:
+            state.in_flight -= 1
+            state.budget.give_back(ticket.cost - used)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Start the eligible call with the smallest finish tag, while global limits allow."""
+        now = time.monotonic()
+        while self._in_flight < settings.LLM_GLOBAL_CONCURRENCY:
+            best: Optional[Ticket] = None
+            retry_at = math.inf
+            for state in self._tenants.values():
+                if not state.queue or state.in_flight >= state.concurrency:
+                    continue
+                head = state.queue[0]
+                if head.not_before > now:
+                    retry_at = min(retry_at, head.not_before)
+                elif best is None or head.finish_tag < best.finish_tag:
+                    best = head
+            if best is None:
+                self._schedule(retry_at)
+                return
+
+            global_wait = max(self._requests.wait_time(1, now), self._tokens.wait_time(best.cost, now))
+            if global_wait > 0:
+                self._schedule(now + global_wait)
+                return
+
+            state = self._tenants[best.tenant.organization_id]
+            state.queue.popleft()
+            state.in_flight += 1
+            self._in_flight += 1
+            self._requests.take(1, now)
+            self._tokens.take(best.cost, now)
+            self._virtual_time = best.start_tag
+            best.future.set_result(None)
+
+    def _schedule(self, at: float):
+        """Dispatch again at `at` (monotonic time), unless a timer is already due sooner."""
+        if at == math.inf or at >= self._timer_at:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer_at = at
+        self._timer = asyncio.get_running_loop().call_later(max(0.0, at - time.monotonic()), self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._timer_at = math.inf
+        self._dispatch()
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
+
+
+def set_llm_scheduler(scheduler: LLMScheduler):
+    """Replace the scheduler, e.g. with fresh limits in tests or benchmarks."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+@asynccontextmanager
+async def llm_slot(estimated_tokens: int) -> AsyncIterator[Ticket]:
+    """Hold a model call slot for the current tenant: `async with llm_slot(n) as ticket: ...`."""
+    tenant = _tenant.get() or UNATTRIBUTED
+    scheduler = get_llm_scheduler()
+    ticket = await scheduler.acquire(tenant, estimated_tokens)
+    set_span_attributes(**{"llm.plan": tenant.plan_type, "llm.estimated_tokens": estimated_tokens})
+    try:
+        yield ticket
+    finally:
+        scheduler.release(ticket)
+
+
+def try_llm_slot(estimated_tokens: int) -> Optional[Ticket]:
+    """A slot for the current tenant if one is free right now, else None; pass it to release_llm_slot."""
+    return get_llm_scheduler().try_acquire(_tenant.get() or UNATTRIBUTED, estimated_tokens)
+
+
+def release_llm_slot(ticket: Ticket):
+    get_llm_scheduler().release(ticket)
@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.chunk_summary import ChunkSummary
+from app.models.document import Document
+from app.models.document_answer import DocumentAnswer
+from app.models.organization import Organization
+from app.models.summary import Summary
+from app.services.activity_archive import retention_cutoff
+from app.services.document_service import delete_files
+from app.services.search import remove_documents
+from app.services.tenant_cache import mark_tenant_changed
+from app.services.vector_index import remove_document_embeddings
+
+
+def _delete_expired_batch(organization_id: str, cutoff: datetime) -> dict:
+    """Delete one batch of expired documents and their summaries in a single transaction.
+
+    Returns the file paths and sizes of the deleted documents so the files can be
+    removed after the rows are gone; a failure there leaves orphaned files, never
+    rows pointing at missing files.
+    """
+    db: Session = SessionLocal()
+    try:
+        expired = db.query(Document.id, Document.file_path, Document.file_size).filter(
+            Document.organization_id == organization_id,
+            Document.created_at < cutoff
+        ).order_by(Document.created_at).limit(settings.RETENTION_BATCH_SIZE).all()
+
+        if not expired:
+            return {"documents": 0, "summaries": 0, "files": []}
+
+        document_ids = [row.id for row in expired]
+        # Surviving newer versions lose the link to an expired one
+        db.query(Document).filter(
+            Document.previous_version_id.in_(document_ids)
+        ).update({Document.previous_version_id: None}, synchronize_session=False)
+        remove_documents(db, document_ids)
+        remove_document_embeddings(db, organization_id, document_ids)
+        summaries_deleted = db.query(Summary).filter(
+            Summary.document_id.in_(document_ids)
+        ).delete(synchronize_session=False)
+        db.query(DocumentAnswer).filter(
+            DocumentAnswer.document_id.in_(document_ids)
+        ).delete(synchronize_session=False)
+        db.query(Document).filter(
+            Document.id.in_(document_ids)
+        ).delete(synchronize_session=False)
+        mark_tenant_changed(db, organization_id)
+        db.commit()
+
+        return {
+            "documents": len(document_ids),
+            "summaries": summaries_deleted,
+            "files": [(row.file_path, row.file_size) for row in expired],
+        }
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _expire_chunk_summaries(organization_id: str, cutoff: datetime) -> int:
+    """Drop cached section summaries no document has used since the cutoff."""
+    db: Session = SessionLocal()
+    try:
+        deleted = db.query(ChunkSummary).filter(
+            ChunkSummary.organization_id == organization_id,
+            ChunkSummary.last_used_at < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def sweep_organization(organization_id: str, retention_days: int) -> dict:
+    """Purge one organization's documents older than its retention period."""
+    report = {"documents": 0, "summaries": 0, "files": 0, "bytes_reclaimed": 0}
+    cutoff = retention_cutoff(retention_days)
+    if cutoff is None:
+        return report
+
+    while True:
+        batch = await asyncio.to_thread(_delete_expired_batch, organization_id, cutoff)
+        if not batch["documents"]:
+            break
+
+        deleted = await delete_files(
+            [file_path for file_path, _ in batch["files"]],
+            concurrency=settings.RETENTION_FILE_DELETE_CONCURRENCY
+        )
+
+        report["documents"] += batch["documents"]
+        report["summaries"] += batch["summaries"]
+        for (_, file_size), was_deleted in zip(batch["files"], deleted):
+            if was_deleted:
+                report["files"] += 1
+                report["bytes_reclaimed"] += file_size or 0
+
+        if batch["documents"] < settings.RETENTION_BATCH_SIZE:
+            break
+        # Rate limit: give live traffic the database and disk between batches
+        await asyncio.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+
+    await asyncio.to_thread(_expire_chunk_summaries, organization_id, cutoff)
+    return report
+
+
+async def run_retention_sweep() -> dict:
+    """Enforce document_retention_days for every organization."""
+    db: Session = SessionLocal()
+    try:
+        organizations = db.query(
+            Organization.id, Organization.document_retention_days
+        ).all()
+    finally:
+        db.close()
+
+    totals = {"organizations": 0, "documents": 0, "summaries": 0, "files": 0, "bytes_reclaimed": 0}
+    for organization_id, retention_days in organizations:
+        report = await sweep_organization(organization_id, retention_days)
+        if report["documents"]:
+            totals["organizations"] += 1
+            for key in ("documents", "summaries", "files", "bytes_reclaimed"):
+                totals[key] += report[key]
+
+    if totals["documents"]:
+        print(
+            f"Retention sweep removed {totals['documents']} documents, "
+            f"{totals['summaries']} summaries and reclaimed {totals['bytes_reclaimed']} bytes "
+            f"across {totals['organizations']} organizations"
+        )
+    return totals
+
+
+if __name__ == "__main__":
+    print(asyncio.run(run_retention_sweep()))
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+from app.core.config import settings
+
+# Registered jobs: (name, interval in seconds, coroutine function, optional wakeup event)
+_jobs: List[Tuple[str, float, Callable[[], Awaitable[object]], Optional[asyncio.Event]]] = []
+_tasks: List[asyncio.Task] = []
+
+
+def register_periodic_job(
+    name: str,
+    interval_seconds: float,
+    func: Callable[[], Awaitable[object]],
+    wakeup: Optional[asyncio.Event] = None
+):
+    """Register a coroutine function to be run periodically in the background.
+    
+    Setting the optional wakeup event runs the job again without waiting out the interval.
+    """
+    _jobs.append((name, interval_seconds, func, wakeup))
+
+
+async def _run_periodically(
+    name: str,
+    interval_seconds: float,
+    func: Callable[[], Awaitable[object]],
+    wakeup: Optional[asyncio.Event] = None
+):
+    """Run a job forever, sleeping between runs. Failures are logged, never raised."""
+    while True:
+        try:
+            await func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Periodic job '{name}' failed: {e}")
+        if wakeup is None:
+            await asyncio.sleep(interval_seconds)
+            continue
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+
+
+def start_scheduler():
+    """Start all registered periodic jobs on the running event loop."""
+    if not settings.ENABLE_SCHEDULER or _tasks:
+        return
+    for name, interval_seconds, func, wakeup in _jobs:
+        _tasks.append(asyncio.create_task(_run_periodically(name, interval_seconds, func, wakeup)))
+
+
+async def stop_scheduler():
+    """Cancel all running periodic jobs."""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -0,0 +1,196 @@
+"""Full-text search over documents' extracted text, filenames and summaries.
+
+PostgreSQL keeps a tsvector per document in `search_index` (GIN indexed); SQLite
+keeps the text in the FTS5 table `search_index_fts`. Both are created by the
+add_search_index migration. Index rows are built with INSERT ... SELECT, so
+document text never passes through Python, and matching, ranking and snippets
+are all computed by the database.
+"""
+import base64
+import html
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+# Created and dropped by migrations, not by Base.metadata
+INDEX_TABLES = ["search_index", "search_index_fts"]
+
+SEARCH_CONFIG = "english"  # PostgreSQL text search configuration; SQLite uses the porter tokenizer
+
+# Control characters can't occur in extracted text, so they mark highlights until the snippet is escaped
+HIGHLIGHT_START, HIGHLIGHT_END = "\x02", "\x03"
+
+
+class SearchHit(NamedTuple):
+    document_id: str
+    score: float
+    snippet: str
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def is_supported(db: Session) -> bool:
+    return db.get_bind().dialect.name in ("postgresql", "sqlite")
+
+
+def encode_cursor(hit: SearchHit) -> str:
+    raw = f"{hit.score!r}|{hit.document_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        score, document_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return float(score), document_id
+    except ValueError:
+        raise InvalidCursor(cursor)
+
+
+def _highlighted(snippet: Optional[str]) -> str:
+    """Escape a snippet for HTML, wrapping matched terms in <mark>."""
+    return html.escape(snippet or "").replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>")
+
+
+def _fts5_query(query: str) -> str:
+    """Quote every term so user input can't use (or break on) FTS5 query syntax."""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms if term.strip('"'))
+
+
+_POSTGRES_INDEX = text(f"""
+    INSERT INTO search_index (document_id, organization_id, search_vector, updated_at)
+    SELECT d.id, d.organization_id,
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(d.original_filename, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(
+            (SELECT string_agg(s.summary_text, ' ') FROM summaries s WHERE s.document_id = d.id), ''
+        )), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', left(coalesce(d.extracted_text, ''), :max_chars)), 'D'),
+        now()
+    FROM documents d
+    WHERE d.id IN :document_ids AND d.status = 'completed'
+    ON CONFLICT (document_id) DO UPDATE
+    SET search_vector = excluded.search_vector, updated_at = excluded.updated_at
+""").bindparams(bindparam("document_ids", expanding=True))
+
+_SQLITE_INDEX = text("""
+    INSERT INTO search_index_fts (document_id, organization_id, title, summary, body)
+    SELECT d.id, d.organization_id, d.original_filename,
+        (SELECT group_concat(s.summary_text, ' ') FROM summaries s WHERE s.document_id = d.id),
+        substr(coalesce(d.extracted_text, ''), 1, :max_chars)
+    FROM documents d
+    WHERE d.id IN :document_ids AND d.status = 'completed'
+""").bindparams(bindparam("document_ids", expanding=True))
+
+
+def index_documents(db: Session, document_ids: Sequence[str]):
+    """(Re)index documents after their text or summaries change; the caller commits.
+
+    Only completed documents are indexed, so failed extractions (whose text is an
+    error message) stay out of results.
+    """
+    if not document_ids or not is_supported(db):
+        return
+    db.flush()
+    remove_documents(db, document_ids)
+    statement = _POSTGRES_INDEX if db.get_bind().dialect.name == "postgresql" else _SQLITE_INDEX
+    db.execute(statement, {"document_ids": list(document_ids), "max_chars": settings.SEARCH_MAX_INDEXED_CHARS})
+
+
+def remove_documents(db: Session, document_ids: Sequence[str]):
+    """Drop documents from the index; the caller commits.
+
+    PostgreSQL also cascades document deletes, but the SQLite FTS table has no foreign keys.
+    """
+    if not document_ids or not is_supported(db):
+        return
+    table = "search_index" if db.get_bind().dialect.name == "postgresql" else "search_index_fts"
+    db.execute(
+        text(f"DELETE FROM {table} WHERE document_id IN :document_ids").bindparams(
+            bindparam("document_ids", expanding=True)
+        ),
+        {"document_ids": list(document_ids)}
+    )
+
+
+def remove_organization(db: Session, organization_id: str):
+    """Drop every index entry for an organization; the caller commits."""
+    if not is_supported(db):
+        return
+    table = "search_index" if db.get_bind().dialect.name == "postgresql" else "search_index_fts"
+    db.execute(text(f"DELETE FROM {table} WHERE organization_id = :organization_id"), {"organization_id": organization_id})
+
+
+_POSTGRES_SEARCH = f"""
+    WITH hits AS (
+        SELECT si.document_id, ts_rank_cd(si.search_vector, q.query, 32) AS score, q.query
+        FROM search_index si, websearch_to_tsquery('{SEARCH_CONFIG}', :query) AS q(query)
+        WHERE si.organization_id = :organization_id AND si.search_vector @@ q.query
+        {{after}}
+        ORDER BY score DESC, si.document_id DESC
+        LIMIT :limit
+    )
+    SELECT h.document_id, h.score,
+        ts_headline('{SEARCH_CONFIG}', left(coalesce(d.extracted_text, ''), :max_chars), h.query, :headline_options) AS snippet
+    FROM hits h
+    JOIN documents d ON d.id = h.document_id
+    ORDER BY h.score DESC, h.document_id DESC
+"""
+# ts_rank_cd returns real; compare in real too, or a cursor's score never equals itself
+_POSTGRES_AFTER = """
+        AND (ts_rank_cd(si.search_vector, q.query, 32) < CAST(:after_score AS real)
+            OR (ts_rank_cd(si.search_vector, q.query, 32) = CAST(:after_score AS real)
+                AND si.document_id < :after_id))
+"""
+
+_SQLITE_SEARCH = """
+    SELECT document_id, score, snippet FROM (
+        SELECT document_id,
+            -bm25(search_index_fts, 0, 0, 10.0, 4.0, 1.0) AS score,
+            snippet(search_index_fts, -1, :highlight_start, :highlight_end, '…', 24) AS snippet
+        FROM search_index_fts
+        WHERE search_index_fts MATCH :query AND organization_id = :organization_id
+    )
+    {after}
+    ORDER BY score DESC, document_id DESC
+    LIMIT :limit
+"""
+_SQLITE_AFTER = "WHERE score < :after_score OR (score = :after_score AND document_id < :after_id)"
+
+
+def search_documents(
+    db: Session,
+    organization_id: str,
+    query: str,
+    limit: int,
+    after: Optional[Tuple[float, str]] = None
+) -> List[SearchHit]:
+    """Best-ranked matches first, ties broken by document id so cursors are stable.
+
+    `after` is the (score, document_id) of the last hit on the previous page.
+    """
+    params = {"organization_id": organization_id, "limit": limit}
+    if after is not None:
+        params["after_score"], params["after_id"] = after
+
+    if db.get_bind().dialect.name == "postgresql":
+        sql = _POSTGRES_SEARCH.format(after=_POSTGRES_AFTER if after else "")
+        params.update(
+            query=query,
+            max_chars=settings.SEARCH_MAX_INDEXED_CHARS,
+            headline_options=(
+                f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_END}", '
+                "MaxFragments=2, MaxWords=24, MinWords=8, FragmentDelimiter=\" … \""
+            ),
+        )
+    else:
+        match = _fts5_query(query)
+        if not match:
+            return []
+        sql = _SQLITE_SEARCH.format(after=_SQLITE_AFTER if after else "")
+        params.update(query=match, highlight_start=HIGHLIGHT_START, highlight_end=HIGHLIGHT_END)
+
+    rows = db.execute(text(sql), params).all()
+    return [SearchHit(row.document_id, float(row.score), _highlighted(row.snippet)) for row in rows]
@@ -0,0 +1,179 @@
+"""Single-flight execution: concurrent calls with the same key share one run.
+
+Within a worker, callers with a key already in flight await the leader's result.
+Across workers, the leader holds a Redis lock (SET NX with an expiry it keeps
+renewing) and publishes its result when done; callers in other workers poll for
+it. Results are short strings, such as the ID of the row the run created.
+
+Without Redis (REDIS_URL empty or unreachable) runs are deduplicated per worker only.
+"""
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from redis.exceptions import RedisError
+from app.core.config import settings
+
+# Delete or extend the lock only if we still hold it
+_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+_EXTEND = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0"
+
+_REDIS_ERRORS = (RedisError, OSError, asyncio.TimeoutError)
+
+# After a connection failure, Redis isn't tried again for this long
+REDIS_RETRY_SECONDS = 30.0
+# How long a published result stays readable by followers in other workers
+RESULT_TTL_SECONDS = 60
+
+_redis_client = None
+_redis_down_until = 0.0
+
+
+async def _get_redis():
+    """A connected Redis client, or None to deduplicate in-process only."""
+    global _redis_client, _redis_down_until
+    if not settings.REDIS_URL or time.monotonic() < _redis_down_until:
+        return None
+    if _redis_client is None:
+        import redis.asyncio as redis
+
+        _redis_client = redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=2,
+            decode_responses=True
+        )
+    try:
+        await _redis_client.ping()
+    except Exception as e:
+        print(f"Redis unavailable, coalescing requests within this worker only: {e}")
+        _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        return None
+    return _redis_client
+
+
+class _LeaderCancelled(Exception):
+    """The leader went away without a result; a follower should take over."""
+
+
+class SingleFlight:
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._flights: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, func: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        """Run func unless a call with this key is already running; returns (result, shared).
+
+        Followers in this worker get the leader's exception too. Followers in other
+        workers run func themselves if the leader fails.
+        """
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                break
+            try:
+                return await asyncio.shield(flight), True
+            except _LeaderCancelled:
+                continue
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result, shared = await self._run_across_workers(key, func)
+        except asyncio.CancelledError:
+            flight.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result, shared
+        finally:
+            del self._flights[key]
+            if flight.done() and not flight.cancelled():
+                flight.exception()  # Retrieved, even if nobody was following
+
+    async def _run_across_workers(self, key: str, func: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        client = await _get_redis()
+        if client is None:
+            return await func(), False
+
+        lock_key = f"single-flight:{self.namespace}:{key}"
+        result_key = f"{lock_key}:result"
+        token = uuid.uuid4().hex
+        lock_ms = int(settings.SINGLE_FLIGHT_LOCK_SECONDS * 1000)
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_SECONDS
+        acquired = False
+        try:
+            while not acquired and time.monotonic() < deadline:
+                acquired = await client.set(lock_key, token, nx=True, px=lock_ms)
+                if acquired:
+                    break
+                holder = await client.get(lock_key)
+                if holder is None:
+                    continue  # Released in between; try again
+                result = await self._follow(client, lock_key, result_key, holder, deadline)
+                if result is not None:
+                    return result, True
+                # The other worker's leader failed or vanished; take over
+        except _REDIS_ERRORS as e:
+            print(f"Redis error, coalescing requests within this worker only: {e}")
+            return await func(), False
+
+        if not acquired:
+            # Waited too long for another worker; don't keep the caller waiting any longer
+            return await func(), False
+        return await self._lead(client, lock_key, result_key, token, lock_ms, func), False
+
+    async def _lead(self, client, lock_key: str, result_key: str, token: str, lock_ms: int,
+                    func: Callable[[], Awaitable[str]]) -> str:
+        async def keep_lock():
+            try:
+                while True:
+                    await asyncio.sleep(lock_ms / 3000)
+                    await client.eval(_EXTEND, 1, lock_key, token, lock_ms)
+            except _REDIS_ERRORS as e:
+                # The lock may expire early and let another worker in; that only costs a duplicate
+                print(f"Could not extend single-flight lock: {e}")
+
+        keeper = asyncio.create_task(keep_lock())
+        try:
+            result = await func()
+            try:
+                await client.set(result_key, f"{token}|{result}", ex=RESULT_TTL_SECONDS)
+            except Exception as e:
+                print(f"Could not publish single-flight result: {e}")
+            return result
+        finally:
+            keeper.cancel()
+            try:
+                await client.eval(_RELEASE, 1, lock_key, token)
+            except Exception as e:
+                # The lock expires by itself
+                print(f"Could not release single-flight lock: {e}")
+
+    async def _follow(self, client, lock_key: str, result_key: str, holder: str, deadline: float) -> Optional[str]:
+        """Wait for the holder's result; None if it let go of the lock without one."""
+        interval = 0.05
+        while time.monotonic() < deadline:
+            published = await client.get(result_key)
+            if published and published.startswith(f"{holder}|"):
+                return published.split("|", 1)[1]
+            if await client.get(lock_key) != holder:
+                # Published just before letting go?
+                published = await client.get(result_key)
+                if published and published.startswith(f"{holder}|"):
+                    return published.split("|", 1)[1]
+                return None
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, 0.5)
+        return None
+
+
+# create_summary and automatic summaries, keyed by organization, document and summary type
+summary_flights = SingleFlight("summary")
+
+
+def summary_flight_key(organization_id: str, document_id: str, summary_type: str) -> str:
+    return f"{organization_id}:{document_id}:{summary_type}"
@@ -0,0 +1,381 @@
+import asyncio
+import os
+import stat
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
+from urllib.parse import quote
+import anyio
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from app.core.config import settings
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# Upload content: either the whole file in memory or a stream of chunks
+FileContent = Union[bytes, AsyncIterator[bytes]]
+
+
+async def _iter_content(content: FileContent) -> AsyncIterator[bytes]:
+    if isinstance(content, (bytes, bytearray)):
+        yield bytes(content)
+    else:
+        async for chunk in content:
+            yield chunk
+
+
+def _content_disposition(filename: str, disposition_type: str = "attachment") -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition_type}; filename*=utf-8''{quoted}"
+    return f'{disposition_type}; filename="{filename}"'
+
+
+class SendfileResponse(FileResponse):
+    """FileResponse that can serve a byte range and hands the file descriptor to the
+    server when it supports zero-copy send.
+
+    Servers advertising the ASGI `http.response.zerocopysend` extension stream the file
+    with sendfile(2), so the bytes never pass through Python. Other servers get chunked
+    reads of just the requested range.
+    """
+
+    def __init__(self, path: str, byte_range: Optional[Tuple[int, int]] = None, **kwargs):
+        super().__init__(path, **kwargs)
+        self.byte_range = byte_range
+        if byte_range is not None:
+            self.status_code = 206
+
+    def set_stat_headers(self, stat_result: os.stat_result) -> None:
+        super().set_stat_headers(stat_result)
+        self.headers.setdefault("accept-ranges", "bytes")
+        if self.byte_range is not None:
+            start, end = self.byte_range
+            self.headers["content-length"] = str(end - start + 1)
+            self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.stat_result is None:
+            try:
+                stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            except FileNotFoundError:
+                raise RuntimeError(f"File at path {self.path} does not exist.")
+            if not stat.S_ISREG(stat_result.st_mode):
+                raise RuntimeError(f"File at path {self.path} is not a file.")
+            self.set_stat_headers(stat_result)
+            self.stat_result = stat_result
+
+        start, end = self.byte_range or (0, self.stat_result.st_size - 1)
+        count = end - start + 1
+
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope["method"].upper() == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": start,
+                    "count": count,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, "rb") as file:
+                await file.seek(start)
+                remaining = count
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0 and bool(chunk),
+                    })
+                    if not chunk:
+                        break
+        if self.background is not None:
+            await self.background()
+
+
+class StorageBackend(ABC):
+    """Where uploaded document files live.
+
+    Files are addressed by a key like "<organization_id>/<filename>" when written;
+    the backend returns a locator that is stored in Document.file_path and used for
+    every later read or delete.
+    """
+
+    @abstractmethod
+    async def save(self, key: str, content: FileContent) -> str:
+        """Store content under key and return its locator."""
+
+    @abstractmethod
+    async def open(self, locator: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream the bytes in [start, end] (inclusive; end=None reads to the end of the file)."""
+
+    @abstractmethod
+    async def delete(self, locator: str) -> bool:
+        """Delete a file. Returns False if it did not exist or could not be removed."""
+
+    @abstractmethod
+    async def exists(self, locator: str) -> bool:
+        """Check whether a file exists."""
+
+    @abstractmethod
+    async def size(self, locator: str) -> int:
+        """Size of a file in bytes."""
+
+    @abstractmethod
+    def local_path(self, locator: str):
+        """Async context manager yielding a local filesystem path for parsers that need one."""
+
+    def presigned_url(self, locator: str, filename: str, media_type: str) -> Optional[str]:
+        """Time-limited URL clients can download from directly, if the backend supports it."""
+        return None
+
+    async def file_response(
+        self,
+        locator: str,
+        filename: str,
+        media_type: str,
+        byte_range: Optional[Tuple[int, int]] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        """Response serving a file, or the inclusive byte_range of it with 206 Partial Content."""
+        url = self.presigned_url(locator, filename, media_type)
+        if url:
+            # The client re-sends its Range header to the bucket, which serves it natively
+            return RedirectResponse(url, status_code=307)
+
+        size = await self.size(locator)
+        start, end = byte_range or (0, size - 1)
+        response_headers = {
+            **(headers or {}),
+            "accept-ranges": "bytes",
+            "content-length": str(end - start + 1),
+            "content-disposition": _content_disposition(filename),
+        }
+        if byte_range is not None:
+            response_headers["content-range"] = f"bytes {start}-{end}/{size}"
+        return StreamingResponse(
+            self.open(locator, start, end) if size else iter([]),
+            status_code=206 if byte_range is not None else 200,
+            media_type=media_type,
+            headers=response_headers,
+        )
+
+
+class LocalStorageBackend(StorageBackend):
+    """Files on the local filesystem under settings.UPLOAD_DIR. Locators are file paths."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    async def save(self, key: str, content: FileContent) -> str:
+        file_path = os.path.join(self.root, key)
+        await asyncio.to_thread(os.makedirs, os.path.dirname(file_path), exist_ok=True)
+        try:
+            async with await anyio.open_file(file_path, "wb") as f:
+                async for chunk in _iter_content(content):
+                    await f.write(chunk)
+        except BaseException:
+            # Don't leave partial files behind when the upload is aborted
+            await asyncio.to_thread(self._remove_quietly, file_path)
+            raise
+        return file_path
+
+    @staticmethod
+    def _remove_quietly(file_path: str):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+    async def open(self, locator: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        async with await anyio.open_file(locator, "rb") as f:
+            await f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = await f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    async def delete(self, locator: str) -> bool:
+        try:
+            await asyncio.to_thread(os.remove, locator)
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Error deleting file {locator}: {e}")
+            return False
+
+    async def exists(self, locator: str) -> bool:
+        return await asyncio.to_thread(os.path.isfile, locator)
+
+    async def size(self, locator: str) -> int:
+        return (await asyncio.to_thread(os.stat, locator)).st_size
+
+    @asynccontextmanager
+    async def local_path(self, locator: str):
+        yield locator
+
+    async def file_response(
+        self,
+        locator: str,
+        filename: str,
+        media_type: str,
+        byte_range: Optional[Tuple[int, int]] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        return SendfileResponse(
+            path=locator,
+            byte_range=byte_range,
+            filename=filename,
+            media_type=media_type,
+            headers=headers,
+        )
+
+
+class S3StorageBackend(StorageBackend):
+    """Files in an S3-compatible bucket (AWS S3, MinIO, ...). Locators look like s3://bucket/key.
+
+    Downloads are served by redirecting to a presigned URL, so file bytes go straight
+    from the bucket to the client.
+    """
+
+    def __init__(self, bucket: str):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL or None,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+            config=Config(signature_version="s3v4", max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS),
+        )
+
+    def _split(self, locator: str) -> tuple[str, str]:
+        bucket, _, key = locator[len("s3://"):].partition("/")
+        return bucket, key
+
+    async def save(self, key: str, content: FileContent) -> str:
+        if isinstance(content, (bytes, bytearray)):
+            await asyncio.to_thread(self.client.put_object, Bucket=self.bucket, Key=key, Body=bytes(content))
+        else:
+            # Spool to disk so upload_fileobj can switch to multipart uploads for large files
+            with tempfile.SpooledTemporaryFile(max_size=8 * CHUNK_SIZE) as spool:
+                async for chunk in content:
+                    await asyncio.to_thread(spool.write, chunk)
+                spool.seek(0)
+                await asyncio.to_thread(self.client.upload_fileobj, spool, self.bucket, key)
+        return f"s3://{self.bucket}/{key}"
+
+    async def open(self, locator: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        bucket, key = self._split(locator)
+        params = {"Bucket": bucket, "Key": key}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end}"
+        response = await asyncio.to_thread(self.client.get_object, **params)
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete(self, locator: str) -> bool:
+        bucket, key = self._split(locator)
+        try:
+            await asyncio.to_thread(self.client.delete_object, Bucket=bucket, Key=key)
+            return True
+        except Exception as e:
+            print(f"Error deleting object {locator}: {e}")
+            return False
+
+    async def _head(self, locator: str) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+
+        bucket, key = self._split(locator)
+        try:
+            return await asyncio.to_thread(self.client.head_object, Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    async def exists(self, locator: str) -> bool:
+        return await self._head(locator) is not None
+
+    async def size(self, locator: str) -> int:
+        head = await self._head(locator)
+        if head is None:
+            raise FileNotFoundError(locator)
+        return head["ContentLength"]
+
+    @asynccontextmanager
+    async def local_path(self, locator: str):
+        bucket, key = self._split(locator)
+        suffix = os.path.splitext(key)[1]
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        try:
+            await asyncio.to_thread(self.client.download_file, bucket, key, path)
+            yield path
+        finally:
+            os.remove(path)
+
+    def presigned_url(self, locator: str, filename: str, media_type: str) -> Optional[str]:
+        if not settings.S3_PRESIGNED_DOWNLOADS:
+            return None
+        bucket, key = self._split(locator)
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": bucket,
+                "Key": key,
+                "ResponseContentDisposition": _content_disposition(filename),
+                "ResponseContentType": media_type,
+            },
+            ExpiresIn=settings.S3_PRESIGNED_URL_EXPIRE_SECONDS,
+        )
+
+
+@lru_cache()
+def _local_backend() -> LocalStorageBackend:
+    return LocalStorageBackend(settings.UPLOAD_DIR)
+
+
+@lru_cache()
+def _s3_backend() -> S3StorageBackend:
+    return S3StorageBackend(settings.S3_BUCKET)
+
+
+def get_storage(locator: Optional[str] = None) -> StorageBackend:
+    """Storage backend for a stored file, or the configured backend for new uploads.
+
+    Locators carry their backend, so files written before STORAGE_BACKEND changed
+    stay readable.
+    """
+    if locator is not None:
+        return _s3_backend() if locator.startswith("s3://") else _local_backend()
+    if settings.STORAGE_BACKEND == "s3":
+        return _s3_backend()
+    return _local_backend()
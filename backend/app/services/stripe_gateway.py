@@ -0,0 +1,255 @@
+import asyncio
+import random
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+from app.core.config import settings
+
+
+class StripeGateway(ABC):
+    """Everything the app asks of Stripe, behind an async interface.
+
+    The production implementation wraps the Stripe SDK; FakeStripeGateway keeps
+    state in memory so billing flows can run without network access.
+    """
+
+    @abstractmethod
+    async def create_customer(self, email: str, metadata: Dict[str, str], idempotency_key: Optional[str] = None) -> str:
+        """Create a customer and return its ID."""
+
+    @abstractmethod
+    async def create_checkout_session(
+        self,
+        price_id: str,
+        success_url: str,
+        cancel_url: str,
+        metadata: Dict[str, str],
+        idempotency_key: Optional[str] = None
+    ) -> dict:
+        """Create a subscription checkout session; returns {"session_id", "url"}."""
+
+    @abstractmethod
+    async def cancel_subscription(self, subscription_id: str) -> None:
+        """Cancel a subscription immediately."""
+
+    @abstractmethod
+    async def update_subscription_price(
+        self,
+        subscription_id: str,
+        price_id: str,
+        idempotency_key: Optional[str] = None
+    ) -> None:
+        """Switch a subscription's first item to a different price."""
+
+    @abstractmethod
+    async def list_invoices(self, customer_id: str, limit: int = 10) -> List[dict]:
+        """A customer's most recent invoices as plain dicts."""
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    if isinstance(error, stripe.error.StripeError):
+        return error.http_status is not None and error.http_status >= 500
+    return False
+
+
+class SdkStripeGateway(StripeGateway):
+    """Stripe SDK calls run on a dedicated thread pool over one pooled HTTP session.
+
+    Each call gets a timeout, retries with exponential backoff and jitter on
+    connection errors, rate limiting and 5xx responses, and an idempotency key
+    that stays the same across retries so a retried POST is never applied twice.
+    """
+
+    def __init__(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.STRIPE_MAX_CONNECTIONS,
+            pool_maxsize=settings.STRIPE_MAX_CONNECTIONS
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self.http_client = stripe.http_client.RequestsClient(
+            timeout=settings.STRIPE_TIMEOUT_SECONDS,
+            session=session
+        )
+        stripe.default_http_client = self.http_client
+        # Retries are handled here, with backoff that doesn't hold a thread while sleeping
+        stripe.max_network_retries = 0
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.STRIPE_MAX_CONNECTIONS,
+            thread_name_prefix="stripe"
+        )
+
+    async def _call(self, func: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        for attempt in range(settings.STRIPE_MAX_RETRIES + 1):
+            try:
+                return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+            except Exception as e:
+                if attempt >= settings.STRIPE_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = settings.STRIPE_RETRY_BASE_DELAY_SECONDS * (2 ** attempt)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+    async def create_customer(self, email: str, metadata: Dict[str, str], idempotency_key: Optional[str] = None) -> str:
+        customer = await self._call(
+            stripe.Customer.create,
+            email=email,
+            metadata=metadata,
+            idempotency_key=idempotency_key or str(uuid.uuid4())
+        )
+        return customer.id
+
+    async def create_checkout_session(
+        self,
+        price_id: str,
+        success_url: str,
+        cancel_url: str,
+        metadata: Dict[str, str],
+        idempotency_key: Optional[str] = None
+    ) -> dict:
+        session = await self._call(
+            stripe.checkout.Session.create,
+            payment_method_types=['card'],
+            line_items=[{
+                'price': price_id,
+                'quantity': 1,
+            }],
+            mode='subscription',
+            success_url=success_url,
+            cancel_url=cancel_url,
+            metadata=metadata,
+            idempotency_key=idempotency_key or str(uuid.uuid4())
+        )
+        return {
+            "session_id": session.id,
+            "url": session.url
+        }
+
+    async def cancel_subscription(self, subscription_id: str) -> None:
+        await self._call(stripe.Subscription.delete, subscription_id)
+
+    async def update_subscription_price(
+        self,
+        subscription_id: str,
+        price_id: str,
+        idempotency_key: Optional[str] = None
+    ) -> None:
+        subscription = await self._call(stripe.Subscription.retrieve, subscription_id)
+        await self._call(
+            stripe.Subscription.modify,
+            subscription_id,
+            items=[{
+                'id': subscription['items']['data'][0].id,
+                'price': price_id,
+            }],
+            idempotency_key=idempotency_key or str(uuid.uuid4())
+        )
+
+    async def list_invoices(self, customer_id: str, limit: int = 10) -> List[dict]:
+        invoices = await self._call(stripe.Invoice.list, customer=customer_id, limit=limit)
+        return [
+            {
+                "id": invoice.id,
+                "customer": invoice.customer,
+                "amount_paid": invoice.amount_paid,
+                "status": invoice.status,
+                "invoice_pdf": getattr(invoice, "invoice_pdf", None),
+                "created": invoice.created,
+            }
+            for invoice in invoices.data
+        ]
+
+
+class FakeStripeGateway(StripeGateway):
+    """In-memory Stripe stand-in for tests, benchmarks and offline development.
+
+    Honours idempotency keys the way Stripe does: repeating a key returns the
+    original result instead of creating a second object.
+    """
+
+    def __init__(self):
+        self.customers: Dict[str, dict] = {}
+        self.checkout_sessions: Dict[str, dict] = {}
+        self.subscriptions: Dict[str, dict] = {}
+        self.invoices: Dict[str, List[dict]] = {}  # customer ID -> invoices, newest last
+        self._idempotent_results: Dict[str, object] = {}
+
+    def _new_id(self, prefix: str) -> str:
+        return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+    def _idempotent(self, key: Optional[str], create: Callable[[], object]):
+        if key is None:
+            return create()
+        if key not in self._idempotent_results:
+            self._idempotent_results[key] = create()
+        return self._idempotent_results[key]
+
+    async def create_customer(self, email: str, metadata: Dict[str, str], idempotency_key: Optional[str] = None) -> str:
+        def create():
+            customer_id = self._new_id("cus")
+            self.customers[customer_id] = {"id": customer_id, "email": email, "metadata": dict(metadata)}
+            return customer_id
+        return self._idempotent(idempotency_key, create)
+
+    async def create_checkout_session(
+        self,
+        price_id: str,
+        success_url: str,
+        cancel_url: str,
+        metadata: Dict[str, str],
+        idempotency_key: Optional[str] = None
+    ) -> dict:
+        def create():
+            session_id = self._new_id("cs_test")
+            self.checkout_sessions[session_id] = {
+                "id": session_id,
+                "price": price_id,
+                "success_url": success_url,
+                "cancel_url": cancel_url,
+                "metadata": dict(metadata),
+            }
+            return {"session_id": session_id, "url": f"https://checkout.stripe.test/{session_id}"}
+        return self._idempotent(idempotency_key, create)
+
+    async def cancel_subscription(self, subscription_id: str) -> None:
+        if subscription_id not in self.subscriptions:
+            raise stripe.error.InvalidRequestError(f"No such subscription: '{subscription_id}'", "id")
+        self.subscriptions[subscription_id]["status"] = "canceled"
+
+    async def update_subscription_price(
+        self,
+        subscription_id: str,
+        price_id: str,
+        idempotency_key: Optional[str] = None
+    ) -> None:
+        if subscription_id not in self.subscriptions:
+            raise stripe.error.InvalidRequestError(f"No such subscription: '{subscription_id}'", "id")
+        self.subscriptions[subscription_id]["price"] = price_id
+
+    async def list_invoices(self, customer_id: str, limit: int = 10) -> List[dict]:
+        return list(reversed(self.invoices.get(customer_id, [])))[:limit]
+
+
+_gateway: Optional[StripeGateway] = None
+
+
+def get_stripe_gateway() -> StripeGateway:
+    """The process-wide Stripe gateway, chosen by settings.STRIPE_GATEWAY."""
+    global _gateway
+    if _gateway is None:
+        _gateway = FakeStripeGateway() if settings.STRIPE_GATEWAY == "fake" else SdkStripeGateway()
+    return _gateway
+
+
+def set_stripe_gateway(gateway: StripeGateway):
+    """Replace the gateway, e.g. with a FakeStripeGateway in tests."""
+    global _gateway
+    _gateway = gateway
@@ -0,0 +1,210 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+import stripe
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.organization import Organization
+from app.models.stripe_event import StripeEvent
+from app.services.invoice_cache import INVOICE_EVENT_TYPES, apply_invoice_event
+
+# Events left in "processing" this long are assumed to belong to a crashed worker
+STALE_CLAIM_AFTER = timedelta(minutes=5)
+
+# Set when an event is recorded, so the worker in this process picks it up immediately
+webhook_wakeup = asyncio.Event()
+
+
+def verify_webhook_event(payload: bytes, sig_header: str) -> dict:
+    """Verify the Stripe signature and return the parsed event, or {"error": ...}."""
+    try:
+        stripe.Webhook.construct_event(payload, sig_header, settings.STRIPE_WEBHOOK_SECRET)
+    except ValueError:
+        return {"error": "Invalid payload"}
+    except stripe.error.SignatureVerificationError:
+        return {"error": "Invalid signature"}
+    return json.loads(payload)
+
+
+def _event_customer_id(event: dict) -> Optional[str]:
+    data_object = event.get("data", {}).get("object", {})
+    customer = data_object.get("customer")
+    if isinstance(customer, dict):
+        customer = customer.get("id")
+    return customer
+
+
+def record_webhook_event(db: Session, event: dict, payload: bytes) -> bool:
+    """Queue a verified event for processing. Returns False if it was already recorded."""
+    db.add(StripeEvent(
+        id=event["id"],
+        type=event["type"],
+        customer_id=_event_customer_id(event),
+        payload=payload.decode("utf-8"),
+        stripe_created=event.get("created", 0),
+        status="pending",
+        attempts=0
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Stripe retried a delivery we already have
+        db.rollback()
+        return False
+    webhook_wakeup.set()
+    return True
+
+
+def _plan_for_price(price_id: Optional[str]) -> str:
+    if price_id and price_id == settings.STRIPE_PRICE_ID_PRO:
+        return "pro"
+    return "basic"
+
+
+def _apply_plan(org: Organization, plan_type: str):
+    org.plan_type = plan_type
+    if plan_type == "pro":
+        org.summaries_limit = settings.PRO_SUMMARIES_PER_MONTH
+    else:
+        org.summaries_limit = settings.BASIC_SUMMARIES_PER_MONTH
+
+
+def _find_subscription_org(db: Session, subscription: dict) -> Optional[Organization]:
+    org = db.query(Organization).filter(
+        Organization.stripe_subscription_id == subscription["id"]
+    ).first()
+    if org is None and subscription.get("customer"):
+        org = db.query(Organization).filter(
+            Organization.stripe_customer_id == subscription["customer"]
+        ).first()
+    return org
+
+
+def _is_stale(org: Organization, event: dict) -> bool:
+    """Stripe does not guarantee delivery order; ignore events older than the last one applied."""
+    created = event.get("created", 0)
+    if org.stripe_event_created is not None and created < org.stripe_event_created:
+        return True
+    org.stripe_event_created = created
+    return False
+
+
+def apply_webhook_event(db: Session, event: dict):
+    """Apply the state changes for one event. Does not commit."""
+    data_object = event["data"]["object"]
+
+    if event["type"] == "checkout.session.completed":
+        organization_id = data_object["metadata"]["organization_id"]
+
+        # Update organization with subscription details
+        org = db.query(Organization).filter(Organization.id == organization_id).first()
+        if org and not _is_stale(org, event):
+            org.stripe_subscription_id = data_object["subscription"]
+            org.subscription_status = "active"
+            _apply_plan(org, data_object["metadata"]["plan_type"])
+
+    elif event["type"] == "customer.subscription.updated":
+        org = _find_subscription_org(db, data_object)
+        if org and not _is_stale(org, event):
+            org.stripe_subscription_id = data_object["id"]
+            org.subscription_status = data_object.get("status", org.subscription_status)
+            items = data_object.get("items", {}).get("data", [])
+            if items:
+                _apply_plan(org, _plan_for_price(items[0].get("price", {}).get("id")))
+
+    elif event["type"] == "customer.subscription.deleted":
+        # Handle subscription cancellation
+        org = _find_subscription_org(db, data_object)
+        if org and not _is_stale(org, event):
+            org.subscription_status = "canceled"
+
+    elif event["type"] in INVOICE_EVENT_TYPES:
+        apply_invoice_event(db, event)
+
+
+def _claim_customer_events(db: Session, customer_id: Optional[str]) -> list:
+    """Claim a customer's pending events, oldest first, so no other worker applies them."""
+    events = db.query(StripeEvent).filter(
+        StripeEvent.customer_id == customer_id if customer_id is not None else StripeEvent.customer_id.is_(None),
+        StripeEvent.status == "pending"
+    ).order_by(StripeEvent.stripe_created, StripeEvent.received_at).all()
+
+    claimed = []
+    for event in events:
+        updated = db.query(StripeEvent).filter(
+            StripeEvent.id == event.id,
+            StripeEvent.status == "pending"
+        ).update({"status": "processing", "claimed_at": datetime.utcnow()}, synchronize_session=False)
+        if updated:
+            claimed.append(event.id)
+    db.commit()
+    return claimed
+
+
+def _process_customer(customer_id: Optional[str]) -> int:
+    """Apply one customer's pending events in order. Stops at the first failure to keep ordering."""
+    db = SessionLocal()
+    processed = 0
+    try:
+        event_ids = _claim_customer_events(db, customer_id)
+        for index, event_id in enumerate(event_ids):
+            record = db.query(StripeEvent).filter(StripeEvent.id == event_id).first()
+            try:
+                apply_webhook_event(db, json.loads(record.payload))
+                record.attempts = (record.attempts or 0) + 1
+                record.status = "processed"
+                record.error = None
+                record.processed_at = datetime.utcnow()
+                db.commit()
+                processed += 1
+            except Exception as e:
+                db.rollback()
+                record = db.query(StripeEvent).filter(StripeEvent.id == event_id).first()
+                record.attempts = (record.attempts or 0) + 1
+                record.error = str(e)
+                record.status = "failed" if record.attempts >= settings.STRIPE_WEBHOOK_MAX_ATTEMPTS else "pending"
+                # Release the later events too, so they are retried after this one
+                db.query(StripeEvent).filter(
+                    StripeEvent.id.in_(event_ids[index + 1:])
+                ).update({"status": "pending", "claimed_at": None}, synchronize_session=False)
+                db.commit()
+                print(f"Error applying Stripe event {event_id}: {e}")
+                break
+        return processed
+    finally:
+        db.close()
+
+
+def _pending_customers() -> list:
+    db = SessionLocal()
+    try:
+        # Requeue events whose worker died mid-way
+        db.query(StripeEvent).filter(
+            StripeEvent.status == "processing",
+            StripeEvent.claimed_at < datetime.utcnow() - STALE_CLAIM_AFTER
+        ).update({"status": "pending", "claimed_at": None}, synchronize_session=False)
+        db.commit()
+
+        return [row.customer_id for row in db.query(StripeEvent.customer_id).filter(
+            StripeEvent.status == "pending"
+        ).distinct().all()]
+    finally:
+        db.close()
+
+
+async def process_pending_events() -> int:
+    """Apply all queued webhook events: sequentially per customer, customers in parallel."""
+    customers = await asyncio.to_thread(_pending_customers)
+    if not customers:
+        return 0
+
+    semaphore = asyncio.Semaphore(settings.STRIPE_WEBHOOK_CONCURRENCY)
+
+    async def _run(customer_id: Optional[str]) -> int:
+        async with semaphore:
+            return await asyncio.to_thread(_process_customer, customer_id)
+
+    return sum(await asyncio.gather(*[_run(customer_id) for customer_id in customers]))
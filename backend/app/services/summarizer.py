@@ -0,0 +1,93 @@
+import asyncio
+from typing import Dict, List
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import record_cache_lookup
+from app.core.tracing import set_span_attributes
+from app.models.chunk_summary import ChunkSummary
+from app.models.document import Document
+from app.services import ai_service
+from app.services.embeddings import chunk_text
+
+
+async def summarize_document(db: Session, document: Document, summary_type: str = "standard") -> tuple[str, int]:
+    """Summarize a document; returns (summary, tokens used).
+
+    Short documents go to the model in one call. Long ones are split into
+    content-defined sections, each summarized once per organization and cached
+    by content hash (whichever model wrote it), and the section summaries are
+    then combined. A new version of a document therefore only costs model calls
+    for the sections that changed.
+    Committed section summaries survive a failure later on.
+    """
+    text = document.extracted_text
+    if len(text) < settings.SUMMARY_MAP_REDUCE_MIN_CHARS:
+        return await ai_service.generate_summary_with_context(text, document.original_filename, summary_type)
+
+    sections = chunk_text(text, settings.SUMMARY_SECTION_CHARS)
+    hashes = list({section.content_hash for section in sections})
+
+    summaries: Dict[str, str] = {}
+    for batch in range(0, len(hashes), 500):
+        for row in db.query(ChunkSummary.content_hash, ChunkSummary.summary_text).filter(
+            ChunkSummary.organization_id == document.organization_id,
+            ChunkSummary.content_hash.in_(hashes[batch:batch + 500])
+        ):
+            summaries[row.content_hash] = row.summary_text
+    if summaries:
+        db.query(ChunkSummary).filter(
+            ChunkSummary.organization_id == document.organization_id,
+            ChunkSummary.content_hash.in_(list(summaries))
+        ).update({ChunkSummary.last_used_at: func.now()}, synchronize_session=False)
+    for section in sections:
+        record_cache_lookup("chunk_summaries", "hit" if section.content_hash in summaries else "miss")
+
+    # One model call per distinct missing section, a few at a time
+    missing = {section.content_hash: section for section in sections if section.content_hash not in summaries}
+    semaphore = asyncio.Semaphore(settings.SUMMARY_SECTION_CONCURRENCY)
+
+    async def summarize(section):
+        async with semaphore:
+            return await ai_service.summarize_section(text[section.start:section.end])
+
+    results = await asyncio.gather(*(summarize(section) for section in missing.values()), return_exceptions=True)
+
+    tokens_used = 0
+    errors: List[BaseException] = []
+    for content_hash, result in zip(missing, results):
+        if isinstance(result, BaseException):
+            errors.append(result)
+            continue
+        summary, tokens, model = result
+        summaries[content_hash] = summary
+        tokens_used += tokens
+        try:
+            # One savepoint per row, so a duplicate doesn't take the others down with it
+            with db.begin_nested():
+                db.add(ChunkSummary(
+                    content_hash=content_hash,
+                    model=model,
+                    summary_text=summary,
+                    tokens_used=tokens,
+                    organization_id=document.organization_id
+                ))
+        except IntegrityError:
+            # Another request cached this section first; theirs is as good
+            pass
+    db.commit()
+    if errors:
+        raise errors[0]
+
+    set_span_attributes(**{"summary.sections": len(sections), "summary.sections_reused": len(sections) - len(missing)})
+
+    combined = "\n\n".join(
+        f"Section {number}:\n{summaries[section.content_hash]}" for number, section in enumerate(sections, start=1)
+    )
+    summary, reduce_tokens = await ai_service.generate_summary_with_context(
+        "The document is too long to include in full; these are summaries of its sections, in order.\n\n" + combined,
+        document.original_filename,
+        summary_type
+    )
+    return summary, tokens_used + reduce_tokens
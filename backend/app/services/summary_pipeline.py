@@ -0,0 +1,311 @@
+"""Summary generation slots and the automatic summary queue.
+
+Every summary, whether a user asked for it or it was queued after an upload,
+runs in one of SUMMARY_CONCURRENCY slots. Interactive requests are admitted
+ahead of queued automatic jobs, and automatic jobs never hold more than
+SUMMARY_AUTO_CONCURRENCY slots, so a burst of uploads can't make users wait.
+
+The queue lives in the worker that received the upload; jobs lost on restart
+can still be summarized on demand.
+"""
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import AUTO_SUMMARY_JOBS, AUTO_SUMMARY_QUEUE_DEPTH
+from app.core.tracing import set_current_tenant, set_span_attributes, traced
+from app.models.document import Document
+from app.models.organization import Organization
+from app.models.summary import Summary
+from app.services.llm_scheduler import set_llm_tenant
+from app.services.search import index_documents
+from app.services.single_flight import summary_flight_key, summary_flights
+from app.services.summarizer import summarize_document
+from app.services.tenant_cache import mark_tenant_changed
+
+# Priority lanes; lower numbers are admitted first
+INTERACTIVE, AUTO = 0, 1
+
+AUTO_SUMMARY_TYPE = "standard"
+
+
+class PriorityGate:
+    """A semaphore that admits waiters by lane, then in arrival order."""
+
+    def __init__(self, slots: int, auto_slots: int):
+        self.slots = slots
+        self.auto_slots = min(auto_slots, slots)
+        self._in_use = 0
+        self._auto_in_use = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    def _can_admit(self, lane: int) -> bool:
+        return self._in_use < self.slots and (lane != AUTO or self._auto_in_use < self.auto_slots)
+
+    def _admit(self, lane: int):
+        self._in_use += 1
+        if lane == AUTO:
+            self._auto_in_use += 1
+
+    def _wake_waiters(self):
+        while self._waiters:
+            lane, _, waiter = self._waiters[0]
+            if waiter.done():  # Cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_admit(lane):
+                # Interactive waiters sort first, so nobody behind this one fits either
+                return
+            heapq.heappop(self._waiters)
+            self._admit(lane)
+            waiter.set_result(None)
+
+    async def acquire(self, lane: int):
+        if not self._waiters and self._can_admit(lane):
+            self._admit(lane)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (lane, next(self._order), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as we were cancelled; hand the slot on
+                self.release(lane)
+            raise
+
+    def release(self, lane: int):
+        self._in_use -= 1
+        if lane == AUTO:
+            self._auto_in_use -= 1
+        self._wake_waiters()
+
+    @asynccontextmanager
+    async def slot(self, lane: int) -> AsyncIterator[None]:
+        await self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+
+_gate: Optional[PriorityGate] = None
+
+# Documents waiting, and documents waiting or being summarized (for coalescing)
+_queue: Deque[str] = deque()
+_pending: Set[str] = set()
+_wakeup: Optional[asyncio.Event] = None
+_worker: Optional[asyncio.Task] = None
+_jobs: Set[asyncio.Task] = set()
+
+
+def get_gate() -> PriorityGate:
+    global _gate
+    if _gate is None:
+        _gate = PriorityGate(settings.SUMMARY_CONCURRENCY, settings.SUMMARY_AUTO_CONCURRENCY)
+    return _gate
+
+
+def summary_slot(lane: int = INTERACTIVE):
+    """Hold a summary generation slot: `async with summary_slot(): ...`."""
+    return get_gate().slot(lane)
+
+
+def reserve_summary_quota(db: Session, organization_id: str) -> bool:
+    """Count a summary against this month's limit, if there's room; commits.
+
+    A single conditional UPDATE, so concurrent jobs can't overrun the limit.
+    """
+    reserved = db.query(Organization).filter(
+        Organization.id == organization_id,
+        Organization.summaries_used_current_month < Organization.summaries_limit
+    ).update(
+        {Organization.summaries_used_current_month: Organization.summaries_used_current_month + 1},
+        synchronize_session=False
+    )
+    mark_tenant_changed(db, organization_id)
+    db.commit()
+    return reserved == 1
+
+
+def release_summary_quota(db: Session, organization_id: str):
+    """Give back a reservation whose summary was never created; commits."""
+    db.query(Organization).filter(
+        Organization.id == organization_id,
+        Organization.summaries_used_current_month > 0
+    ).update(
+        {Organization.summaries_used_current_month: Organization.summaries_used_current_month - 1},
+        synchronize_session=False
+    )
+    mark_tenant_changed(db, organization_id)
+    db.commit()
+
+
+def enqueue_auto_summary(db: Session, document: Document) -> bool:
+    """Queue a freshly extracted document for summarizing, if its organization wants that.
+
+    Returns False when the organization has automatic summaries off or no quota
+    left, the document is already queued or being summarized, or the queue is full.
+    """
+    if document.status != "completed":
+        return False
+    organization = db.query(
+        Organization.auto_generate_summaries,
+        Organization.summaries_used_current_month,
+        Organization.summaries_limit
+    ).filter(Organization.id == document.organization_id).first()
+    if organization is None or not organization.auto_generate_summaries:
+        return False
+    if organization.summaries_used_current_month >= organization.summaries_limit:
+        AUTO_SUMMARY_JOBS.labels(outcome="over_quota").inc()
+        return False
+    if document.id in _pending:
+        AUTO_SUMMARY_JOBS.labels(outcome="coalesced").inc()
+        return False
+    if len(_queue) >= settings.SUMMARY_AUTO_QUEUE_SIZE:
+        AUTO_SUMMARY_JOBS.labels(outcome="dropped").inc()
+        print(f"Automatic summary queue full; not summarizing document {document.id}")
+        return False
+
+    _queue.append(document.id)
+    _pending.add(document.id)
+    AUTO_SUMMARY_QUEUE_DEPTH.set(len(_queue))
+    if _wakeup is not None:
+        _wakeup.set()
+    return True
+
+
+class SummaryQuotaExceeded(Exception):
+    def __init__(self):
+        super().__init__("Monthly summary limit reached")
+
+
+class _DocumentDeleted(Exception):
+    pass
+
+
+async def _create_summary(db: Session, document: Document, organization_id: str) -> str:
+    """Generate and store the automatic summary; returns its ID."""
+    document_id = document.id
+    # Admission: the quota is taken before any tokens are spent
+    if not reserve_summary_quota(db, organization_id):
+        raise SummaryQuotaExceeded()
+    try:
+        summary_text, tokens_used = await summarize_document(db, document, AUTO_SUMMARY_TYPE)
+        # The document may have been deleted while it was being summarized
+        if not db.query(Document.id).filter(Document.id == document_id).first():
+            raise _DocumentDeleted(document_id)
+        summary = Summary(
+            document_id=document_id,
+            summary_text=summary_text,
+            summary_type=AUTO_SUMMARY_TYPE,
+            tokens_used=tokens_used,
+            organization_id=organization_id
+        )
+        db.add(summary)
+        index_documents(db, [document_id])
+        db.commit()
+        return summary.id
+    except BaseException:
+        db.rollback()
+        release_summary_quota(db, organization_id)
+        raise
+
+
+@traced("auto_summary")
+async def _summarize(document_id: str) -> str:
+    """Summarize one queued document; returns the outcome."""
+    db: Session = SessionLocal()
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document is None or document.status != "completed" or not document.extracted_text:
+            return "skipped"
+        set_current_tenant(document.organization_id)
+        set_span_attributes(**{"document.id": document_id})
+
+        organization = db.query(
+            Organization.auto_generate_summaries, Organization.plan_type
+        ).filter(Organization.id == document.organization_id).first()
+        already_summarized = db.query(Summary.id).filter(
+            Summary.document_id == document_id,
+            Summary.summary_type == AUTO_SUMMARY_TYPE
+        ).first()
+        if organization is None or not organization.auto_generate_summaries or already_summarized:
+            return "skipped"
+
+        organization_id = document.organization_id
+        # Background work waits for the organization's LLM budget rather than being refused
+        set_llm_tenant(organization_id, organization.plan_type, background=True)
+        try:
+            _, shared = await summary_flights.run(
+                summary_flight_key(organization_id, document_id, AUTO_SUMMARY_TYPE),
+                lambda: _create_summary(db, document, organization_id)
+            )
+        except SummaryQuotaExceeded:
+            return "over_quota"
+        except _DocumentDeleted:
+            return "skipped"
+        except Exception as e:
+            print(f"Automatic summary of document {document_id} failed: {e}")
+            return "failed"
+        # A user asked for the same summary while this one was queued
+        return "coalesced" if shared else "completed"
+    finally:
+        db.close()
+
+
+async def _run_job(document_id: str):
+    """Run a job in an automatic slot the worker already acquired."""
+    try:
+        outcome = await _summarize(document_id)
+    except Exception as e:
+        print(f"Automatic summary of document {document_id} failed: {e}")
+        outcome = "failed"
+    finally:
+        _pending.discard(document_id)
+        get_gate().release(AUTO)
+    AUTO_SUMMARY_JOBS.labels(outcome=outcome).inc()
+
+
+async def _process_queue():
+    """Start queued jobs as automatic slots free up, forever."""
+    gate = get_gate()
+    while True:
+        await _wakeup.wait()
+        _wakeup.clear()
+        while _queue:
+            await gate.acquire(AUTO)
+            document_id = _queue.popleft()
+            AUTO_SUMMARY_QUEUE_DEPTH.set(len(_queue))
+            job = asyncio.create_task(_run_job(document_id))
+            _jobs.add(job)
+            job.add_done_callback(_jobs.discard)
+
+
+def start_summary_pipeline():
+    """Start this worker's automatic summary queue on the running event loop."""
+    global _wakeup, _worker
+    if _worker is not None:
+        return
+    _wakeup = asyncio.Event()
+    if _queue:
+        _wakeup.set()
+    _worker = asyncio.create_task(_process_queue())
+
+
+async def stop_summary_pipeline():
+    """Stop taking queued jobs and cancel the ones running."""
+    global _worker
+    if _worker is None:
+        return
+    tasks = [_worker, *_jobs]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _worker = None
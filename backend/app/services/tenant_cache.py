@@ -0,0 +1,243 @@
+"""Per-tenant data versions, for conditional GETs and a response cache.
+
+Every commit that changes an organization's documents, summaries or users, or
+the organization itself, bumps that organization's version. Endpoints the
+frontend polls derive a weak ETag from it, so a poll whose If-None-Match still
+matches gets a 304 right after authentication, without running the endpoint's
+queries. With RESPONSE_CACHE_ENABLED, each worker also keeps the last body per
+tenant, route and parameters, and serves it while the version is unchanged.
+
+Versions live in Redis so every worker agrees on them. With REDIS_URL empty
+they are kept per worker, which is only correct when there is a single worker.
+While Redis is unreachable no ETags are issued. A worker that failed to bump a
+version bumps a global epoch once Redis is back, which retires every ETag
+issued before.
+
+Changes made through the ORM are picked up at flush; bulk UPDATE and DELETE
+statements must call mark_tenant_changed.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+import orjson
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.http_cache import is_not_modified
+from app.core.metrics import record_cache_lookup
+from app.models.document import Document
+from app.models.organization import Organization
+from app.models.summary import Summary
+from app.models.user import User
+
+_CHANGED_KEY = "tenant_cache_changed"
+_VERSION_KEY = "tenant-version:{}"
+_EPOCH_KEY = "tenant-version:epoch"
+
+# Increment only versions that exist; a missing one is seeded afresh when next read
+_BUMP = "if redis.call('exists', KEYS[1]) == 1 then return redis.call('incr', KEYS[1]) end return 0"
+
+_REDIS_ERRORS = (RedisError, OSError)
+
+# After a connection failure, Redis isn't tried again for this long
+REDIS_RETRY_SECONDS = 30.0
+
+# Bookkeeping writes that don't change anything these endpoints return
+_IGNORED_ATTRIBUTES = {"last_login", "content_hash"}
+
+_redis_client = None
+_redis_down_until = 0.0
+_bump_failed = False
+
+_lock = threading.Lock()
+_local_versions: Dict[str, int] = {}
+_responses: "OrderedDict[Tuple[str, str, str], Tuple[str, bytes]]" = OrderedDict()
+
+
+def _redis_unavailable(error: Exception):
+    global _redis_down_until
+    print(f"Redis unavailable, not issuing ETags for tenant data: {error}")
+    _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+
+def _get_redis():
+    """A Redis client, or None while Redis is considered down.
+
+    Calls are synchronous: versions are bumped from SQLAlchemy's commit hook.
+    """
+    global _redis_client, _bump_failed
+    if time.monotonic() < _redis_down_until:
+        return None
+    if _redis_client is None:
+        import redis
+
+        _redis_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5,
+            decode_responses=True
+        )
+    if _bump_failed:
+        # Some change went unrecorded; retire every ETag issued so far
+        try:
+            _redis_client.incr(_EPOCH_KEY)
+        except _REDIS_ERRORS as e:
+            _redis_unavailable(e)
+            return None
+        _bump_failed = False
+    return _redis_client
+
+
+def tenant_version(organization_id: str) -> Optional[str]:
+    """The organization's current data version, or None if it can't be known right now."""
+    if not settings.REDIS_URL:
+        with _lock:
+            return str(_local_versions.setdefault(organization_id, time.time_ns()))
+
+    client = _get_redis()
+    if client is None:
+        return None
+    key = _VERSION_KEY.format(organization_id)
+    try:
+        epoch, version = client.mget(_EPOCH_KEY, key)
+        if version is None:
+            # New, or lost with a Redis restart: seed it above any value handed out before
+            client.set(key, time.time_ns(), nx=True)
+            epoch, version = client.mget(_EPOCH_KEY, key)
+    except _REDIS_ERRORS as e:
+        _redis_unavailable(e)
+        return None
+    return f"{epoch or 0}.{version}"
+
+
+def _bump(organization_ids: Set[str]):
+    global _bump_failed
+    if not settings.REDIS_URL:
+        with _lock:
+            for organization_id in organization_ids:
+                if organization_id in _local_versions:
+                    _local_versions[organization_id] += 1
+        return
+
+    client = _get_redis()
+    if client is None:
+        _bump_failed = True
+        return
+    try:
+        pipeline = client.pipeline(transaction=False)
+        for organization_id in organization_ids:
+            pipeline.eval(_BUMP, 1, _VERSION_KEY.format(organization_id))
+        pipeline.execute()
+    except _REDIS_ERRORS as e:
+        _bump_failed = True
+        _redis_unavailable(e)
+
+
+def mark_tenant_changed(db: Session, organization_id: str):
+    """Bump the organization's version when this session commits; for bulk statements the ORM doesn't see."""
+    db.info.setdefault(_CHANGED_KEY, set()).add(organization_id)
+
+
+def _organization_of(instance: Any, dirty: bool) -> Optional[str]:
+    if not isinstance(instance, (Document, Summary, User, Organization)):
+        return None
+    if dirty:
+        state = inspect(instance)
+        changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+        if not changed - _IGNORED_ATTRIBUTES:
+            return None
+    return instance.id if isinstance(instance, Organization) else instance.organization_id
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changes(session: Session, flush_context):
+    changed = set()
+    for instances, dirty in ((session.new, False), (session.deleted, False), (session.dirty, True)):
+        for instance in instances:
+            organization_id = _organization_of(instance, dirty)
+            if organization_id is not None:
+                changed.add(organization_id)
+    if changed:
+        session.info.setdefault(_CHANGED_KEY, set()).update(changed)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _bump_changed_versions(session: Session):
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if changed:
+        _bump(changed)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop(_CHANGED_KEY, None)
+
+
+def tenant_etag(organization_id: str, version: str, route: str, params: str) -> str:
+    digest = hashlib.sha1(f"{organization_id}|{route}|{params}|{version}".encode()).hexdigest()
+    return f'W/"{digest[:24]}"'
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def _render(content: Any, response_model: Any) -> bytes:
+    if response_model is not None:
+        # What FastAPI would do with the response_model, for ORM objects too
+        adapter = _adapter(response_model)
+        content = adapter.dump_python(adapter.validate_python(content, from_attributes=True), mode="json")
+    return orjson.dumps(content)
+
+
+def tenant_cached_response(request: Request, organization_id: str, route: str, params: Dict[str, Any],
+                           build: Callable[[], Any], response_model: Any = None) -> Response:
+    """A JSON response for tenant data, answered with 304 or from cache while the data is unchanged.
+
+    `build` runs the endpoint's queries and returns what the endpoint would have,
+    shaped by `response_model` if given. It isn't called when the client's copy
+    or this worker's cached body is current.
+    """
+    # Read before building: a write landing in between leaves newer data under
+    # the older ETag, which the bump then retires, never the other way round
+    version = tenant_version(organization_id)
+    if version is None:
+        return Response(_render(build(), response_model), media_type="application/json")
+
+    params_key = "&".join(f"{name}={value}" for name, value in sorted(params.items()))
+    etag = tenant_etag(organization_id, version, route, params_key)
+    headers = {"etag": etag, "cache-control": "private, no-cache"}
+    if is_not_modified(request, etag):
+        record_cache_lookup("tenant_etag", "hit")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if "if-none-match" in request.headers:
+        record_cache_lookup("tenant_etag", "miss")
+
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return Response(_render(build(), response_model), media_type="application/json", headers=headers)
+
+    key = (organization_id, route, params_key)
+    with _lock:
+        cached = _responses.get(key)
+        if cached is not None and cached[0] == etag:
+            _responses.move_to_end(key)
+    if cached is not None and cached[0] == etag:
+        record_cache_lookup("tenant_responses", "hit")
+        return Response(cached[1], media_type="application/json", headers=headers)
+
+    record_cache_lookup("tenant_responses", "stale" if cached is not None else "miss")
+    body = _render(build(), response_model)
+    with _lock:
+        _responses[key] = (etag, body)
+        _responses.move_to_end(key)
+        while len(_responses) > settings.RESPONSE_CACHE_MAX_ENTRIES:
+            _responses.popitem(last=False)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,456 @@
+"""Semantic search over document chunks, with one in-memory vector index per organization.
+
+Chunk embeddings live in the document_chunks table. The first query for an
+organization loads them into a VectorIndex (int8 rows plus per-row scales, about
+a quarter of the float32 size); later queries only check the organization's
+embedding generation, which every write to its chunks bumps in the same
+transaction. Embedding and deleting documents update a cached index in place
+once the session commits, instead of reloading it.
+"""
+import asyncio
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.tracing import span
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.models.organization import Organization
+from app.services.embeddings import chunk_text, get_embedder, normalize, quantize
+
+SEARCH_BLOCK_ROWS = 16384  # Rows dequantized at a time, bounding a query's scratch memory
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_CENTROID = 64
+CHUNKS_PER_DOCUMENT = 4  # Initial chunk hits fetched per requested document
+
+
+class ChunkHit(NamedTuple):
+    chunk_id: str
+    document_id: str
+    score: float  # Cosine similarity
+
+
+class VectorIndex:
+    """One organization's chunk vectors, searchable by cosine similarity.
+
+    Below settings.EMBEDDING_ANN_THRESHOLD live rows every query is a vectorized
+    brute-force scan. Above it the index trains an IVF partition (spherical
+    k-means) and scans only the rows of the EMBEDDING_IVF_PROBES nearest
+    centroids. Deletes are tombstones until a quarter of the rows are dead.
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self._vectors = np.empty((0, dimensions), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._assignments = np.empty(0, dtype=np.int32)  # IVF list of each row
+        self._size = 0
+        self._dead = 0
+        self._chunk_ids: List[str] = []
+        self._document_ids: List[str] = []
+        self._rows_by_document: Dict[str, List[int]] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size - self._dead
+
+    @property
+    def uses_ann(self) -> bool:
+        return self._centroids is not None
+
+    def _reserve(self, rows: int):
+        capacity = len(self._scales)
+        if self._size + rows <= capacity:
+            return
+        capacity = max(capacity * 2, self._size + rows, 1024)
+        for name, shape in (
+            ("_vectors", (capacity, self.dimensions)),
+            ("_scales", (capacity,)),
+            ("_alive", (capacity,)),
+            ("_assignments", (capacity,)),
+        ):
+            old = getattr(self, name)
+            grown = np.zeros(shape, dtype=old.dtype)
+            grown[:self._size] = old[:self._size]
+            setattr(self, name, grown)
+
+    def _dequantized(self, rows: np.ndarray) -> np.ndarray:
+        return self._vectors[rows].astype(np.float32) * self._scales[rows, None]
+
+    def _assign(self, rows: np.ndarray):
+        for block in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            part = rows[block:block + SEARCH_BLOCK_ROWS]
+            self._assignments[part] = np.argmax(self._dequantized(part) @ self._centroids.T, axis=1)
+
+    def add(self, chunk_ids: Sequence[str], document_ids: Sequence[str], vectors: np.ndarray, scales: np.ndarray):
+        """Append int8 rows (see embeddings.quantize)."""
+        with self._lock:
+            self._reserve(len(chunk_ids))
+            rows = np.arange(self._size, self._size + len(chunk_ids))
+            self._vectors[rows] = vectors
+            self._scales[rows] = scales
+            self._alive[rows] = True
+            for row, chunk_id, document_id in zip(rows.tolist(), chunk_ids, document_ids):
+                self._chunk_ids.append(chunk_id)
+                self._document_ids.append(document_id)
+                self._rows_by_document.setdefault(document_id, []).append(row)
+            self._size += len(chunk_ids)
+            if self._centroids is not None:
+                self._assign(rows)
+            self._maybe_train()
+
+    def remove_documents(self, document_ids: Iterable[str]):
+        with self._lock:
+            for document_id in document_ids:
+                rows = self._rows_by_document.pop(document_id, [])
+                self._alive[rows] = False
+                self._dead += len(rows)
+            if self._dead > SEARCH_BLOCK_ROWS // 4 and self._dead * 4 > self._size:
+                self._compact()
+
+    def _compact(self):
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._vectors = self._vectors[keep]
+        self._scales = self._scales[keep]
+        self._alive = self._alive[keep]
+        self._assignments = self._assignments[keep]
+        self._chunk_ids = [self._chunk_ids[row] for row in keep.tolist()]
+        self._document_ids = [self._document_ids[row] for row in keep.tolist()]
+        self._rows_by_document = {}
+        for row, document_id in enumerate(self._document_ids):
+            self._rows_by_document.setdefault(document_id, []).append(row)
+        self._size = len(keep)
+        self._dead = 0
+        self._maybe_train()
+
+    def _maybe_train(self):
+        """(Re)train the IVF partition when the index first passes the threshold, and each time it doubles."""
+        live = len(self)
+        if live < settings.EMBEDDING_ANN_THRESHOLD:
+            self._centroids = None
+            return
+        if self._centroids is not None and live < self._trained_size * 2:
+            return
+
+        rng = np.random.default_rng(0)
+        rows = np.flatnonzero(self._alive[:self._size])
+        centroid_count = max(16, int(np.sqrt(live)))
+        sample = normalize(self._dequantized(
+            rng.choice(rows, min(live, centroid_count * KMEANS_SAMPLE_PER_CENTROID), replace=False)
+        ))
+        centroids = sample[rng.choice(len(sample), centroid_count, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            # Centroids that lost every sample keep their previous position
+            moved = np.bincount(labels, minlength=centroid_count) > 0
+            centroids[moved] = normalize(sums[moved])
+
+        self._centroids = centroids
+        self._trained_size = live
+        self._assign(rows)
+
+    def search(self, query: np.ndarray, k: int, exclude_document_ids: Sequence[str] = ()) -> List[ChunkHit]:
+        """The k rows most similar to a normalized float32 query vector."""
+        with self._lock:
+            alive = self._alive[:self._size]
+            candidates = None
+            if self._centroids is not None:
+                probes = np.argsort(self._centroids @ query)[-settings.EMBEDDING_IVF_PROBES:]
+                candidates = np.flatnonzero(np.isin(self._assignments[:self._size], probes) & alive)
+                if len(candidates) < k:
+                    candidates = None
+            if candidates is None:
+                candidates = np.flatnonzero(alive)
+            excluded = [row for document_id in exclude_document_ids for row in self._rows_by_document.get(document_id, [])]
+            if excluded:
+                candidates = np.setdiff1d(candidates, excluded, assume_unique=True)
+            if not len(candidates):
+                return []
+
+            scores = np.empty(len(candidates), dtype=np.float32)
+            for block in range(0, len(candidates), SEARCH_BLOCK_ROWS):
+                part = candidates[block:block + SEARCH_BLOCK_ROWS]
+                scores[block:block + len(part)] = (self._vectors[part].astype(np.float32) @ query) * self._scales[part]
+
+            top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            return [
+                ChunkHit(self._chunk_ids[row], self._document_ids[row], float(score))
+                for row, score in zip(candidates[top].tolist(), scores[top].tolist())
+            ]
+
+    def document_vector(self, document_id: str) -> Optional[np.ndarray]:
+        """The normalized mean of a document's chunk vectors, or None if it has none."""
+        with self._lock:
+            rows = self._rows_by_document.get(document_id)
+            if not rows:
+                return None
+            return normalize(self._dequantized(np.array(rows)).mean(axis=0))
+
+
+class _CachedIndex:
+    def __init__(self, index: VectorIndex, generation: int):
+        self.index = index
+        self.generation = generation
+
+
+_indexes: "OrderedDict[str, _CachedIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+# Index changes waiting for their session to commit: (organization_id, change)
+_PENDING_KEY = "vector_index_changes"
+
+
+def _generation(connection, organization_id: str) -> int:
+    """The organization's embedding generation; changes with every committed write to its chunks."""
+    return connection.execute(
+        select(Organization.embedding_generation).where(Organization.id == organization_id)
+    ).scalar() or 0
+
+
+def _bump_generation(db: Session, organization_id: str):
+    db.execute(
+        update(Organization)
+        .where(Organization.id == organization_id)
+        # Keep updated_at: re-embedding isn't a change to the organization's settings
+        .values(embedding_generation=Organization.embedding_generation + 1, updated_at=Organization.updated_at)
+    )
+
+
+def _load_index(db: Session, organization_id: str, embedder) -> VectorIndex:
+    index = VectorIndex(embedder.dimensions)
+    rows = db.query(
+        DocumentChunk.id,
+        DocumentChunk.document_id,
+        DocumentChunk.embedding,
+        DocumentChunk.embedding_scale
+    ).filter(
+        DocumentChunk.organization_id == organization_id,
+        DocumentChunk.embedder == embedder.name
+    ).yield_per(5000)
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == 5000:
+            _add_rows(index, batch)
+            batch = []
+    if batch:
+        _add_rows(index, batch)
+    return index
+
+
+def _add_rows(index: VectorIndex, rows: list):
+    vectors = np.frombuffer(b"".join(row.embedding for row in rows), dtype=np.int8).reshape(len(rows), -1)
+    index.add(
+        [row.id for row in rows],
+        [row.document_id for row in rows],
+        vectors,
+        np.array([row.embedding_scale for row in rows], dtype=np.float32)
+    )
+
+
+def get_index(db: Session, organization_id: str) -> VectorIndex:
+    """The organization's index for the current embedder, loading it if missing or stale."""
+    embedder = get_embedder()
+    # Read before loading: a write landing in between leaves newer rows under the older
+    # generation, so the next query reloads, never the other way round
+    generation = _generation(db, organization_id)
+    with _indexes_lock:
+        cached = _indexes.get(organization_id)
+        if cached is not None and cached.generation == generation and cached.index.dimensions == embedder.dimensions:
+            _indexes.move_to_end(organization_id)
+            return cached.index
+
+    with span("vector_index.load", **{"organization.id": organization_id}):
+        index = _load_index(db, organization_id, embedder)
+    with _indexes_lock:
+        _indexes[organization_id] = _CachedIndex(index, generation)
+        _indexes.move_to_end(organization_id)
+        while len(_indexes) > settings.EMBEDDING_INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def _queue_change(db: Session, organization_id: str, change: Optional[Callable[[VectorIndex], None]]):
+    _bump_generation(db, organization_id)
+    db.info.setdefault(_PENDING_KEY, []).append((organization_id, change))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_pending_changes(session: Session):
+    """Apply committed changes to cached indexes.
+
+    A cached index is only patched when the generation moved by exactly this
+    session's changes; otherwise another process also wrote, and the index is
+    dropped so the next query reloads it.
+    """
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for organization_id in {change[0] for change in pending}:
+        changes = [change for pending_organization_id, change in pending if pending_organization_id == organization_id]
+        with _indexes_lock:
+            cached = _indexes.get(organization_id)
+        if cached is None:
+            continue
+        if any(change is None for change in changes):
+            with _indexes_lock:
+                _indexes.pop(organization_id, None)
+            continue
+
+        # The session can't run queries between commit and its next transaction
+        with session.get_bind().connect() as connection:
+            generation = _generation(connection, organization_id)
+        with _indexes_lock:
+            if generation != cached.generation + len(changes):
+                _indexes.pop(organization_id, None)
+                continue
+            for change in changes:
+                change(cached.index)
+            cached.generation = generation
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_pending_changes(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+async def embed_document(db: Session, document: Document) -> int:
+    """Chunk and embed a document's extracted text, replacing any earlier chunks; commits.
+
+    Chunks whose text already has an embedding in the organization (from this or
+    another document) reuse it instead of running the model again. Returns the
+    number of chunks embedded by the model.
+    """
+    embedder = get_embedder()
+    text = document.extracted_text or ""
+    chunks = chunk_text(text)
+
+    known: Dict[str, Tuple[bytes, float]] = {}
+    hashes = list({chunk.content_hash for chunk in chunks})
+    for batch in range(0, len(hashes), 500):
+        for row in db.query(DocumentChunk.content_hash, DocumentChunk.embedding, DocumentChunk.embedding_scale).filter(
+            DocumentChunk.organization_id == document.organization_id,
+            DocumentChunk.embedder == embedder.name,
+            DocumentChunk.content_hash.in_(hashes[batch:batch + 500])
+        ):
+            known[row.content_hash] = (row.embedding, row.embedding_scale)
+
+    missing = [chunk for chunk in chunks if chunk.content_hash not in known]
+    if missing:
+        with span("embeddings.embed", **{"document.id": document.id, "chunks": len(missing)}):
+            vectors, scales = quantize(await asyncio.to_thread(
+                embedder.embed, [text[chunk.start:chunk.end] for chunk in missing]
+            ))
+        for chunk, vector, scale in zip(missing, vectors, scales.tolist()):
+            known[chunk.content_hash] = (vector.tobytes(), scale)
+
+    db.query(DocumentChunk).filter(
+        DocumentChunk.document_id == document.id
+    ).delete(synchronize_session=False)
+    rows = [
+        DocumentChunk(
+            id=str(uuid.uuid4()),
+            document_id=document.id,
+            chunk_index=chunk.index,
+            start_offset=chunk.start,
+            end_offset=chunk.end,
+            content_hash=chunk.content_hash,
+            embedder=embedder.name,
+            embedding=known[chunk.content_hash][0],
+            embedding_scale=known[chunk.content_hash][1],
+            organization_id=document.organization_id
+        )
+        for chunk in chunks
+    ]
+    db.add_all(rows)
+
+    def change(index: VectorIndex):
+        index.remove_documents([document.id])
+        if rows:
+            _add_rows(index, rows)
+
+    _queue_change(db, document.organization_id, change)
+    db.commit()
+    return len(missing)
+
+
+def remove_document_embeddings(db: Session, organization_id: str, document_ids: Sequence[str]):
+    """Delete documents' chunks; the caller commits, and cached indexes follow once it does."""
+    if not document_ids:
+        return
+    db.query(DocumentChunk).filter(
+        DocumentChunk.document_id.in_(document_ids)
+    ).delete(synchronize_session=False)
+    _queue_change(db, organization_id, lambda index: index.remove_documents(document_ids))
+
+
+def remove_organization_embeddings(db: Session, organization_id: str):
+    """Delete all of an organization's chunks; the caller commits."""
+    db.query(DocumentChunk).filter(
+        DocumentChunk.organization_id == organization_id
+    ).delete(synchronize_session=False)
+    _queue_change(db, organization_id, None)
+
+
+def _best_per_document(hits: List[ChunkHit], limit: int) -> List[ChunkHit]:
+    best: Dict[str, ChunkHit] = {}
+    for hit in hits:
+        best.setdefault(hit.document_id, hit)
+    return list(best.values())[:limit]
+
+
+async def nearest_documents(
+    db: Session,
+    organization_id: str,
+    query: np.ndarray,
+    limit: int,
+    exclude_document_ids: Sequence[str] = ()
+) -> List[ChunkHit]:
+    """The best-matching chunk of each of the `limit` documents closest to a query vector.
+
+    Similar chunks cluster in few documents, so the chunk search widens until
+    it covers enough distinct documents or the whole index.
+    """
+    index = get_index(db, organization_id)
+    k = limit * CHUNKS_PER_DOCUMENT
+    with span("vector_index.search", **{"index.size": len(index), "index.ann": index.uses_ann}):
+        while True:
+            hits = await asyncio.to_thread(index.search, query, k, exclude_document_ids)
+            best = _best_per_document(hits, limit)
+            if len(best) >= limit or len(hits) < k:
+                return best
+            k *= 4
+
+
+def nearest_chunks(db: Session, document_id: str, query: np.ndarray, k: int) -> List[int]:
+    """Chunk indexes of the k chunks of one document most similar to a query vector, best first.
+
+    Scores the document's own rows straight from document_chunks rather than
+    loading the organization's whole index for them.
+    """
+    rows = db.query(DocumentChunk.chunk_index, DocumentChunk.embedding, DocumentChunk.embedding_scale).filter(
+        DocumentChunk.document_id == document_id,
+        DocumentChunk.embedder == get_embedder().name
+    ).all()
+    if not rows:
+        return []
+    vectors = np.frombuffer(b"".join(row.embedding for row in rows), dtype=np.int8).reshape(len(rows), -1)
+    scales = np.array([row.embedding_scale for row in rows], dtype=np.float32)
+    scores = (vectors.astype(np.float32) @ query) * scales
+    return [rows[row].chunk_index for row in np.argsort(-scores)[:k].tolist()]
+
+
+async def embed_query(text: str) -> np.ndarray:
+    return (await asyncio.to_thread(get_embedder().embed, [text]))[0]
@@ -0,0 +1,284 @@
+"""API load benchmark.
+
+Boots the FastAPI app in-process over httpx's ASGI transport, against a scratch
+SQLite database (or any --database-url) with fake Gemini and Stripe, seeds
+tenants and documents, then drives each scenario at a fixed concurrency and
+writes throughput and latency percentiles to a JSON report.
+
+    cd backend
+    python -m benchmarks.api_load --tenants 10 --documents 50 --concurrency 16
+    python -m benchmarks.compare benchmarks/results/api-<old>.json benchmarks/results/api-<new>.json
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import random
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.harness import (
+    install_fake_llm,
+    prepare_environment,
+    reset_database,
+    run_metadata,
+    summarize_latencies,
+    write_report,
+)
+
+PASSWORD = "benchmark-password"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+SCENARIOS = ["login", "upload", "list_documents", "create_summary", "dashboard_stats", "activity_logs"]
+
+WORDS = (
+    "revenue quarter customer contract policy renewal invoice storage tenant report "
+    "forecast summary document review compliance budget roadmap release incident audit"
+).split()
+
+
+def _paragraphs(rng: random.Random, count: int) -> List[str]:
+    return [" ".join(rng.choice(WORDS) for _ in range(60)) for _ in range(count)]
+
+
+def seed(tenants: int, documents: int, activity: int, rng: random.Random) -> List[dict]:
+    """Create tenants with an admin, documents with extracted text and activity history."""
+    from app.core.database import SessionLocal
+    from app.core.security import get_password_hash
+    from app.models import ActivityLog, ActivityType, Document, Organization, User, UserRole
+
+    # Hashing is deliberately slow; one hash serves every seeded user
+    hashed_password = get_password_hash(PASSWORD)
+    action_types = list(ActivityType)
+    seeded = []
+
+    db = SessionLocal()
+    try:
+        for t in range(tenants):
+            org = Organization(name=f"Benchmark Tenant {t}", summaries_limit=10 ** 9)
+            db.add(org)
+            db.flush()
+            user = User(
+                email=f"admin{t}@bench.test",
+                full_name=f"Admin {t}",
+                hashed_password=hashed_password,
+                role=UserRole.ADMIN,
+                organization_id=org.id,
+            )
+            db.add(user)
+            db.flush()
+
+            document_ids = []
+            for d in range(documents):
+                text = "\n".join(_paragraphs(rng, 8))
+                document = Document(
+                    filename=f"seed-{t}-{d}.docx",
+                    original_filename=f"report-{d}.docx",
+                    file_path=f"{org.id}/seed-{t}-{d}.docx",
+                    file_type=DOCX_TYPE,
+                    file_size=len(text),
+                    extracted_text=text,
+                    page_count=8,
+                    organization_id=org.id,
+                    uploaded_by=user.id,
+                    status="completed",
+                )
+                db.add(document)
+                db.flush()
+                document_ids.append(document.id)
+
+            for a in range(activity):
+                db.add(ActivityLog(
+                    user_id=user.id,
+                    organization_id=org.id,
+                    action_type=rng.choice(action_types),
+                    target=f"report-{a % max(documents, 1)}.docx",
+                    details="seeded",
+                ))
+            db.commit()
+            seeded.append({"email": user.email, "document_ids": document_ids})
+    finally:
+        db.close()
+    return seeded
+
+
+def _docx_bytes(rng: random.Random) -> bytes:
+    from docx import Document as DocxDocument
+
+    doc = DocxDocument()
+    for paragraph in _paragraphs(rng, 20):
+        doc.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+async def _login(client, email: str):
+    return await client.post("/api/auth/login", data={"username": email, "password": PASSWORD})
+
+
+def build_scenarios(client, tenants: List[dict], upload_body: bytes) -> Dict[str, Callable[[dict], Awaitable]]:
+    """One request function per scenario, each taking the tenant to act as."""
+
+    async def login(tenant):
+        return await _login(client, tenant["email"])
+
+    async def upload(tenant):
+        return await client.post(
+            "/api/documents/upload",
+            headers=tenant["headers"],
+            files={"file": ("benchmark.docx", upload_body, DOCX_TYPE)},
+        )
+
+    async def list_documents(tenant):
+        return await client.get("/api/documents/", headers=tenant["headers"])
+
+    async def create_summary(tenant):
+        document_id = tenant["rng"].choice(tenant["document_ids"])
+        return await client.post(
+            "/api/summaries/",
+            headers=tenant["headers"],
+            params={"document_id": document_id, "summary_type": "brief"},
+        )
+
+    async def dashboard_stats(tenant):
+        return await client.get("/api/analytics/stats", headers=tenant["headers"])
+
+    async def activity_logs(tenant):
+        return await client.get("/api/activity/", headers=tenant["headers"], params={"limit": 50})
+
+    return {
+        "login": login,
+        "upload": upload,
+        "list_documents": list_documents,
+        "create_summary": create_summary,
+        "dashboard_stats": dashboard_stats,
+        "activity_logs": activity_logs,
+    }
+
+
+async def run_scenario(
+    request: Callable[[dict], Awaitable],
+    tenants: List[dict],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict:
+    """Issue `requests` calls from `concurrency` workers, rotating through tenants."""
+    for tenant in itertools.islice(itertools.cycle(tenants), warmup):
+        await request(tenant)
+
+    tenant_cycle = itertools.cycle(tenants)
+    remaining = iter(range(requests))
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def worker():
+        for _ in remaining:
+            tenant = next(tenant_cycle)
+            start = time.perf_counter()
+            try:
+                response = await request(tenant)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": requests,
+        "errors": errors,
+        "statuses": statuses,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round((requests - errors) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize_latencies(latencies),
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    reset_database()
+    install_fake_llm(args.llm_latency_ms)
+    seeded = seed(args.tenants, args.documents, args.activity, rng)
+    upload_body = _docx_bytes(rng)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        tenants = []
+        for index, tenant in enumerate(seeded):
+            response = await _login(client, tenant["email"])
+            response.raise_for_status()
+            tenants.append({
+                **tenant,
+                "headers": {"Authorization": f"Bearer {response.json()['access_token']}"},
+                "rng": random.Random(args.seed + index),
+            })
+
+        scenarios = build_scenarios(client, tenants, upload_body)
+        results = {}
+        for name in args.scenarios:
+            print(f"{name}: {args.requests} requests at concurrency {args.concurrency}...", file=sys.stderr)
+            results[name] = await run_scenario(
+                scenarios[name], tenants, args.requests, args.concurrency, args.warmup
+            )
+            latency = results[name]["latency_ms"]
+            print(
+                f"  {results[name]['throughput_rps']} req/s  p50 {latency['p50']}ms  "
+                f"p95 {latency['p95']}ms  p99 {latency['p99']}ms  errors {results[name]['errors']}",
+                file=sys.stderr
+            )
+
+    from app.core.database import engine
+    return {
+        "meta": run_metadata(
+            tenants=args.tenants,
+            documents=args.documents,
+            activity=args.activity,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            warmup=args.warmup,
+            llm_latency_ms=args.llm_latency_ms,
+            seed=args.seed,
+            database=engine.dialect.name,
+        ),
+        "scenarios": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=5)
+    parser.add_argument("--documents", type=int, default=20, help="documents seeded per tenant")
+    parser.add_argument("--activity", type=int, default=200, help="activity log entries seeded per tenant")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per scenario")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="simulated Gemini latency")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--database-url", help="run against this database instead of a scratch SQLite file; it is wiped")
+    parser.add_argument("--workdir", help="scratch directory for the database and uploads")
+    parser.add_argument("--output", help="report path (default: benchmarks/results/api-<git revision>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="api-bench-")
+    prepare_environment(workdir, args.database_url)
+    report = asyncio.run(run(args))
+    path = write_report(report, args.output, "api")
+    print(f"Report written to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
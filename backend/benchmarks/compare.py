@@ -0,0 +1,92 @@
+"""Compare two benchmark reports and flag regressions.
+
+Works on any report with a "scenarios" mapping of name -> {"throughput_rps" or
+"pages_per_second", "latency_ms": {"p50", "p95", "p99"}, optionally "peak_rss_mb"};
+entries missing from either side are skipped.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Exits with status 1 if any p95/p99 latency or peak RSS grew, or throughput
+fell, by more than the threshold percentage.
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional, Tuple
+
+THROUGHPUT_KEYS = ["throughput_rps", "pages_per_second"]
+LATENCY_KEYS = ["p50", "p95", "p99"]
+# Lower is better for everything except throughput; p50 is shown but too noisy to gate on
+GATED_METRICS = {"p95_ms", "p99_ms", "peak_rss_mb"}
+
+
+def _change(old: float, new: float) -> Optional[float]:
+    if not old:
+        return None
+    return (new - old) / old * 100
+
+
+def _format_change(change: Optional[float]) -> str:
+    return "n/a" if change is None else f"{change:+.1f}%"
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """Table lines for every shared scenario, and descriptions of any regressions."""
+    lines = [f"{'scenario':<28}{'metric':<16}{'baseline':>12}{'candidate':>12}{'change':>10}"]
+    regressions = []
+
+    for name, old in baseline.get("scenarios", {}).items():
+        new = candidate.get("scenarios", {}).get(name)
+        if new is None:
+            continue
+
+        rows = []
+        for key in THROUGHPUT_KEYS:
+            if key in old and key in new:
+                rows.append((key, old[key], new[key], True))
+        for key in LATENCY_KEYS:
+            if key in old.get("latency_ms", {}) and key in new.get("latency_ms", {}):
+                rows.append((f"{key}_ms", old["latency_ms"][key], new["latency_ms"][key], False))
+        if "peak_rss_mb" in old and "peak_rss_mb" in new:
+            rows.append(("peak_rss_mb", old["peak_rss_mb"], new["peak_rss_mb"], False))
+
+        for metric, old_value, new_value, higher_is_better in rows:
+            change = _change(old_value, new_value)
+            lines.append(f"{name:<28}{metric:<16}{old_value:>12}{new_value:>12}{_format_change(change):>10}")
+            if change is None:
+                continue
+            if higher_is_better and change < -threshold:
+                regressions.append(f"{name} {metric} fell {-change:.1f}%")
+            elif not higher_is_better and metric in GATED_METRICS and change > threshold:
+                regressions.append(f"{name} {metric} grew {change:.1f}%")
+
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    for label, report in (("baseline", baseline), ("candidate", candidate)):
+        meta = report.get("meta", {})
+        print(f"{label}: {meta.get('git_revision')} at {meta.get('started_at')}")
+    lines, regressions = compare(baseline, candidate, args.threshold)
+    print("\n".join(lines))
+
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Deterministic synthetic documents for the extraction benchmark.
+
+PDFs are written directly (uncompressed content streams with the built-in
+Helvetica font) so no PDF authoring library is needed; DOCX files use
+python-docx, which the app already depends on, and PPTX files are zipped by hand. The same seed always produces
+the same text, so runs on different commits parse identical input.
+"""
+import html
+import os
+import random
+import zipfile
+from typing import Callable, Dict, List, NamedTuple
+
+PDF_TYPE = "application/pdf"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+TEXT_TYPE = "text/plain"
+MARKDOWN_TYPE = "text/markdown"
+HTML_TYPE = "text/html"
+
+EXTENSIONS = {
+    PDF_TYPE: "pdf",
+    DOCX_TYPE: "docx",
+    PPTX_TYPE: "pptx",
+    TEXT_TYPE: "txt",
+    MARKDOWN_TYPE: "md",
+    HTML_TYPE: "html",
+}
+
+WORDS = (
+    "the of and to in a is that for it as was with be by on not he this are or his from at "
+    "which but have an they you were her she there been one all we their has would when if "
+    "revenue quarter customer contract policy renewal invoice storage tenant report forecast "
+    "summary document review compliance budget roadmap release incident audit agreement "
+    "liability indemnity warranty termination confidential obligations schedule appendix"
+).split()
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter, in points
+
+
+class CorpusCase(NamedTuple):
+    name: str
+    file_type: str
+    structure: str
+    pages: int
+
+
+# A spread of sizes for the common layout plus a few harder structures
+CASES: List[CorpusCase] = [
+    CorpusCase("pdf-prose-1p", PDF_TYPE, "prose", 1),
+    CorpusCase("pdf-prose-10p", PDF_TYPE, "prose", 10),
+    CorpusCase("pdf-prose-50p", PDF_TYPE, "prose", 50),
+    CorpusCase("pdf-prose-200p", PDF_TYPE, "prose", 200),
+    CorpusCase("pdf-columns-20p", PDF_TYPE, "columns", 20),
+    CorpusCase("pdf-table-20p", PDF_TYPE, "table", 20),
+    CorpusCase("pdf-sparse-50p", PDF_TYPE, "sparse", 50),
+    CorpusCase("docx-prose-1p", DOCX_TYPE, "prose", 1),
+    CorpusCase("docx-prose-10p", DOCX_TYPE, "prose", 10),
+    CorpusCase("docx-prose-50p", DOCX_TYPE, "prose", 50),
+    CorpusCase("docx-headings-20p", DOCX_TYPE, "headings", 20),
+    CorpusCase("docx-table-20p", DOCX_TYPE, "table", 20),
+    CorpusCase("pptx-slides-30p", PPTX_TYPE, "slides", 30),
+    CorpusCase("txt-prose-50p", TEXT_TYPE, "prose", 50),
+    CorpusCase("md-sections-20p", MARKDOWN_TYPE, "sections", 20),
+    CorpusCase("html-sections-20p", HTML_TYPE, "sections", 20),
+]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text_at(x: float, y: float, size: int, text: str) -> str:
+    return f"BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({_pdf_escape(text)}) Tj ET"
+
+
+def _prose_page(rng: random.Random) -> List[str]:
+    # About 50 lines of running text, roughly a dense report page
+    return [_text_at(54, 740 - line * 13.5, 10, _sentence(rng, 14)) for line in range(50)]
+
+
+def _columns_page(rng: random.Random) -> List[str]:
+    ops = []
+    for column_x in (54, 320):
+        for line in range(55):
+            ops.append(_text_at(column_x, 740 - line * 12.5, 9, _sentence(rng, 7)))
+    return ops
+
+
+def _table_page(rng: random.Random) -> List[str]:
+    # A 6-column grid of short cells, each placed individually like a rendered table
+    ops = []
+    for row in range(40):
+        for column in range(6):
+            cell = _sentence(rng, 2) if column else f"{rng.randint(1000, 9999)}"
+            ops.append(_text_at(54 + column * 85, 740 - row * 17, 8, cell))
+    return ops
+
+
+def _sparse_page(rng: random.Random) -> List[str]:
+    return [_text_at(54, 700 - line * 40, 14, _sentence(rng, 6)) for line in range(4)]
+
+
+PDF_LAYOUTS: Dict[str, Callable[[random.Random], List[str]]] = {
+    "prose": _prose_page,
+    "columns": _columns_page,
+    "table": _table_page,
+    "sparse": _sparse_page,
+}
+
+
+def write_pdf(path: str, structure: str, pages: int, rng: random.Random):
+    """Write a PDF with one content stream per page."""
+    layout = PDF_LAYOUTS[structure]
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then (page, content) pairs
+    objects: Dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    kids = []
+    for index in range(pages):
+        page_number, content_number = 4 + index * 2, 5 + index * 2
+        stream = "\n".join(layout(rng)).encode("latin-1")
+        objects[content_number] = (
+            b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream"
+        )
+        objects[page_number] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_number} 0 R >>"
+        ).encode()
+        kids.append(f"{page_number} 0 R")
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = {}
+        for number in sorted(objects):
+            offsets[number] = f.tell()
+            f.write(f"{number} 0 obj\n".encode() + objects[number] + b"\nendobj\n")
+        xref_offset = f.tell()
+        count = max(objects) + 1
+        f.write(f"xref\n0 {count}\n0000000000 65535 f \n".encode())
+        for number in range(1, count):
+            f.write(f"{offsets[number]:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def write_docx(path: str, structure: str, pages: int, rng: random.Random):
+    """Write a DOCX with an explicit page break after each page's worth of content."""
+    from docx import Document as DocxDocument
+
+    doc = DocxDocument()
+    for page in range(pages):
+        if structure == "headings":
+            doc.add_heading(_sentence(rng, 5), level=1)
+            for section in range(3):
+                doc.add_heading(_sentence(rng, 4), level=2)
+                doc.add_paragraph(_sentence(rng, 60))
+                for _ in range(3):
+                    doc.add_paragraph(_sentence(rng, 10), style="List Bullet")
+        elif structure == "table":
+            table = doc.add_table(rows=25, cols=5)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = _sentence(rng, 2)
+        else:
+            for _ in range(6):
+                doc.add_paragraph(_sentence(rng, 80))
+        if page < pages - 1:
+            doc.add_page_break()
+    doc.save(path)
+
+
+PPTX_PARTS = {
+    "[Content_Types].xml": (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/ppt/presentation.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="ppt/presentation.xml" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/officeDocument"/></Relationships>'
+    ),
+}
+SLIDE_XML = (
+    '<p:sld xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"><p:cSld><p:spTree>{shapes}'
+    '</p:spTree></p:cSld></p:sld>'
+)
+SHAPE_XML = '<p:sp><p:txBody>{paragraphs}</p:txBody></p:sp>'
+
+
+def write_pptx(path: str, structure: str, pages: int, rng: random.Random):
+    """Write a PPTX with a title and a bulleted body shape per slide."""
+    def paragraphs(lines: List[str]) -> str:
+        return "".join(f"<a:p><a:r><a:t>{html.escape(line)}</a:t></a:r></a:p>" for line in lines)
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, xml in PPTX_PARTS.items():
+            archive.writestr(name, xml)
+        slide_ids, relationships = [], []
+        for index in range(1, pages + 1):
+            shapes = SHAPE_XML.format(paragraphs=paragraphs([_sentence(rng, 5)]))
+            shapes += SHAPE_XML.format(paragraphs=paragraphs([_sentence(rng, 12) for _ in range(6)]))
+            archive.writestr(f"ppt/slides/slide{index}.xml", SLIDE_XML.format(shapes=shapes))
+            slide_ids.append(f'<p:sldId id="{255 + index}" r:id="rId{index}"/>')
+            relationships.append(
+                f'<Relationship Id="rId{index}" Target="slides/slide{index}.xml" Type="http://schemas.'
+                'openxmlformats.org/officeDocument/2006/relationships/slide"/>'
+            )
+        archive.writestr(
+            "ppt/presentation.xml",
+            '<p:presentation xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<p:sldIdLst>{"".join(slide_ids)}</p:sldIdLst></p:presentation>'
+        )
+        archive.writestr(
+            "ppt/_rels/presentation.xml.rels",
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{"".join(relationships)}</Relationships>'
+        )
+
+
+def write_text(path: str, structure: str, pages: int, rng: random.Random):
+    """Write plain text, Markdown or HTML with one page's worth of prose per page or section."""
+    extension = os.path.splitext(path.removesuffix(".tmp"))[1]
+    with open(path, "w", encoding="utf-8") as f:
+        if extension == ".html":
+            f.write("<!DOCTYPE html><html><head><title>Report</title>"
+                    "<style>body { font-family: sans-serif; }</style></head><body>\n")
+        for page in range(pages):
+            paragraphs = [_sentence(rng, 80) for _ in range(6)]
+            if extension == ".md":
+                f.write(f"## {_sentence(rng, 5)}\n\n" + "\n\n".join(paragraphs) + "\n\n")
+            elif extension == ".html":
+                f.write(f"<h2>{_sentence(rng, 5)}</h2>\n")
+                f.write("".join(f"<p>{paragraph}</p>\n" for paragraph in paragraphs))
+            else:
+                # Sixty-line pages, matching the extractor's page estimate for plain text
+                for _ in range(60):
+                    f.write(_sentence(rng, 12) + "\n")
+        if extension == ".html":
+            f.write("</body></html>\n")
+
+
+WRITERS = {
+    PDF_TYPE: write_pdf,
+    DOCX_TYPE: write_docx,
+    PPTX_TYPE: write_pptx,
+    TEXT_TYPE: write_text,
+    MARKDOWN_TYPE: write_text,
+    HTML_TYPE: write_text,
+}
+
+
+def generate_corpus(directory: str, seed: int = 2024) -> Dict[str, str]:
+    """Write every case into directory (skipping files already there); returns name -> path."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for case in CASES:
+        path = os.path.join(directory, f"{case.name}-s{seed}.{EXTENSIONS[case.file_type]}")
+        if not os.path.exists(path):
+            # Each case gets its own generator so adding a case doesn't change the others
+            rng = random.Random(f"{seed}:{case.name}")
+            WRITERS[case.file_type](path + ".tmp", case.structure, case.pages, rng)
+            os.replace(path + ".tmp", path)
+        paths[case.name] = path
+    return paths
@@ -0,0 +1,156 @@
+"""Text extraction micro-benchmark.
+
+Generates (or reuses) a synthetic corpus, then times extract_text_from_file
+on each file in a fresh subprocess, so peak RSS is
+per case rather than cumulative. --engine picks the PDF engine to try first. Reports pages/sec, per-page latency
+percentiles and peak RSS, and compares against the stored baseline.
+
+    cd backend
+    python -m benchmarks.extraction                    # compare with benchmarks/baselines/extraction.json
+    python -m benchmarks.extraction --update-baseline  # record a new baseline on this machine
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.compare import compare
+from benchmarks.corpus import CASES, generate_corpus
+from benchmarks.harness import BACKEND_DIR, prepare_environment, run_metadata, summarize_latencies, write_report
+
+BASELINE_PATH = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "extraction.json")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(path: str, file_type: str, iterations: int, warmup: int) -> dict:
+    """Time one file's extraction; meant to run in its own process."""
+    prepare_environment(tempfile.mkdtemp(prefix="extraction-bench-"))
+    from app.services.document_service import extract_text_from_file
+
+    async def extract(path):
+        return await extract_text_from_file(path, file_type)
+
+    rss_before = _peak_rss_mb()
+
+    async def _timed_runs():
+        # One event loop for every run, so its worker threads are started only once
+        for _ in range(warmup):
+            await extract(path)
+        durations = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            text, pages = await extract(path)
+            durations.append(time.perf_counter() - start)
+        return durations, text, pages
+
+    durations, text, pages = asyncio.run(_timed_runs())
+    return {
+        "durations": durations,
+        "pages": pages,
+        "characters": len(text),
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def measure(path: str, file_type: str, pages: int, iterations: int, warmup: int, engine: str) -> dict:
+    """Run one case in a subprocess; rates use the corpus page count, not the extractor's estimate."""
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.extraction", "--worker", path, file_type, str(iterations), str(warmup)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, "PDF_EXTRACTION_ENGINE": engine}
+    ).stdout
+    raw = json.loads(output.strip().splitlines()[-1])
+
+    document_ms = summarize_latencies([d * 1000 for d in raw["durations"]])
+    return {
+        "pages": pages,
+        "reported_pages": raw["pages"],
+        "characters": raw["characters"],
+        "file_bytes": os.path.getsize(path),
+        "iterations": iterations,
+        # From the median run, so one slow iteration doesn't read as a regression
+        "pages_per_second": round(pages * 1000 / document_ms["p50"], 2) if document_ms["p50"] else 0.0,
+        "latency_ms": summarize_latencies([d * 1000 / max(pages, 1) for d in raw["durations"]]),
+        "document_ms": document_ms,
+        "peak_rss_mb": round(raw["peak_rss_mb"], 1),
+        "rss_growth_mb": round(raw["peak_rss_mb"] - raw["rss_before_mb"], 1),
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "--worker":
+        path, file_type, iterations, warmup = argv[1:5]
+        print(json.dumps(run_case(path, file_type, int(iterations), int(warmup))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--cases", nargs="+", choices=[case.name for case in CASES], help="default: all")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--engine", default="auto", help="PDF engine to try first (PDF_EXTRACTION_ENGINE)")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "extraction-corpus"))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed change in percent")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--output", help="report path (default: benchmarks/results/extraction-<git revision>.json)")
+    args = parser.parse_args(argv)
+
+    paths = generate_corpus(args.corpus_dir, args.seed)
+    selected = [case for case in CASES if not args.cases or case.name in args.cases]
+
+    results = {}
+    for case in selected:
+        results[case.name] = measure(
+            paths[case.name], case.file_type, case.pages, args.iterations, args.warmup, args.engine
+        )
+        result = results[case.name]
+        print(
+            f"{case.name:<20} {result['pages_per_second']:>9} pages/s  "
+            f"p50 {result['latency_ms']['p50']}ms/page  peak RSS {result['peak_rss_mb']}MB",
+            file=sys.stderr
+        )
+
+    report = {
+        "meta": run_metadata(
+            iterations=args.iterations, warmup=args.warmup, seed=args.seed, engine=args.engine
+        ),
+        "scenarios": results,
+    }
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        path = write_report(report, args.baseline, "extraction")
+        print(f"Baseline written to {path}", file=sys.stderr)
+        return
+    path = write_report(report, args.output, "extraction")
+    print(f"Report written to {path}", file=sys.stderr)
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; record one with --update-baseline.", file=sys.stderr)
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    lines, regressions = compare(baseline, report, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold}% against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
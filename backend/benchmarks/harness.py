@@ -0,0 +1,123 @@
+"""Shared plumbing for the benchmark scripts: isolated settings, fakes and reports."""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+
+def prepare_environment(workdir: str, database_url: Optional[str] = None):
+    """Point the app at a scratch database and upload directory, with no external services.
+
+    Credentials are replaced with placeholders so a local .env can't make a
+    benchmark talk to real providers. Must run before anything under `app` is
+    imported, since settings are read once.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    placeholders = [
+        "SECRET_KEY",
+        "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET", "GOOGLE_REDIRECT_URI",
+        "MICROSOFT_CLIENT_ID", "MICROSOFT_CLIENT_SECRET", "MICROSOFT_REDIRECT_URI",
+        "STRIPE_SECRET_KEY", "STRIPE_PUBLISHABLE_KEY", "STRIPE_WEBHOOK_SECRET",
+        "GEMINI_API_KEY",
+    ]
+    os.environ.update({name: "benchmark" for name in placeholders})
+    os.environ.update({
+        "DATABASE_URL": database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "STORAGE_BACKEND": "local",
+        "STRIPE_GATEWAY": "fake",
+        "DEBUG": "false",
+        "ENABLE_SCHEDULER": "false",
+        "TRACING_ENABLED": "false",
+        "QUERY_DEBUG_ENABLED": "false",
+        "REDIS_URL": "",
+    })
+
+
+def reset_database():
+    """Drop everything and migrate a fresh schema to head."""
+    from alembic import command
+    from alembic.config import Config
+    from app.core.database import Base, engine
+    from app import models  # noqa: F401  (registers every table on Base)
+    from app.services.search import INDEX_TABLES
+
+    # Tables owned by migrations alone; drop them first since they reference documents
+    with engine.begin() as conn:
+        for table in INDEX_TABLES:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    command.upgrade(config, "head")
+
+
+def install_fake_llm(latency_ms: float = 0.0):
+    """Route every model call to an EchoProvider that answers after latency_ms."""
+    from app.services.llm_providers import EchoProvider
+    from app.services.llm_router import LLMRouter, set_llm_router
+
+    set_llm_router(LLMRouter({"default": ["echo"]}, providers=[EchoProvider(latency_ms)]))
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Linearly interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize_latencies(latencies_ms: List[float]) -> Dict[str, float]:
+    """p50/p95/p99, mean and max of a list of latencies in milliseconds."""
+    values = sorted(latencies_ms)
+    return {
+        "p50": round(percentile(values, 0.50), 3),
+        "p95": round(percentile(values, 0.95), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        "max": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(**config) -> dict:
+    """Where and how a benchmark ran, stored alongside its results."""
+    return {
+        "git_revision": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+    }
+
+
+def write_report(report: dict, output: Optional[str], prefix: str) -> str:
+    """Write a report as JSON, by default to benchmarks/results/<prefix>-<revision>.json."""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        revision = report["meta"].get("git_revision") or "unknown"
+        output = os.path.join(RESULTS_DIR, f"{prefix}-{revision}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return output
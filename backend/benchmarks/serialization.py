@@ -0,0 +1,204 @@
+"""Response serialization and compression micro-benchmark.
+
+Builds the API's largest responses in memory (a document with its full text, a
+page of summaries and a page of activity logs), then times each stage FastAPI
+runs for them: validating and serializing through the response model, rendering
+with the standard library's JSONResponse and with ORJSONResponse, and
+compressing the rendered body with gzip and (when installed) brotli at the
+configured levels. Reports per-payload latency percentiles and body sizes.
+
+    cd backend
+    python -m benchmarks.serialization --iterations 50
+    python -m benchmarks.compare benchmarks/results/serialization-<old>.json benchmarks/results/serialization-<new>.json
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from benchmarks.harness import prepare_environment, run_metadata, summarize_latencies, write_report
+
+PAYLOADS = ["document_text", "summary_list", "activity_logs"]
+
+WORDS = (
+    "revenue quarter customer contract policy renewal invoice storage tenant report "
+    "forecast summary document review compliance budget roadmap release incident audit "
+    "café naïve résumé – “quoted” §"
+).split()
+
+
+def _prose(rng: random.Random, words: int) -> str:
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 24))
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+def build_payloads(pages: int, summaries: int, activity_logs: int, seed: int = 7) -> Dict[str, tuple]:
+    """Response model and raw content for each payload, as the endpoints hand them to FastAPI."""
+    from app.models.activity_log import ActivityType
+    from app.schemas.activity_log import ActivityLogResponse
+    from app.schemas.document import DocumentWithText
+    from app.schemas.summary import SummaryResponse
+
+    rng = random.Random(seed)
+    organization_id = str(uuid.uuid4())
+    user_id = str(uuid.uuid4())
+    document_id = str(uuid.uuid4())
+    created_at = datetime(2026, 1, 1, 9, 0, 0)
+
+    document = {
+        "id": document_id,
+        "filename": f"{document_id}.pdf",
+        "original_filename": "annual-report.pdf",
+        "file_type": "application/pdf",
+        "file_size": pages * 60_000,
+        "status": "completed",
+        "page_count": pages,
+        "version": 1,
+        "previous_version_id": None,
+        "organization_id": organization_id,
+        "uploaded_by": user_id,
+        "created_at": created_at,
+        # About 500 words a page, with page breaks as the extractor leaves them
+        "extracted_text": "\n\n".join(_prose(rng, 500) for _ in range(pages)),
+    }
+    summary_list = [
+        {
+            "id": str(uuid.uuid4()),
+            "document_id": str(uuid.uuid4()),
+            "summary_text": _prose(rng, 350),
+            "summary_type": rng.choice(["brief", "standard", "detailed"]),
+            "tokens_used": rng.randint(2_000, 40_000),
+            "organization_id": organization_id,
+            "created_at": created_at + timedelta(minutes=i),
+        }
+        for i in range(summaries)
+    ]
+    activity_types = list(ActivityType)
+    activity_log_list = [
+        {
+            "id": str(uuid.uuid4()),
+            "action_type": rng.choice(activity_types),
+            "target": f"document:{uuid.uuid4()}",
+            "details": _prose(rng, 12),
+            "user_id": user_id,
+            "organization_id": organization_id,
+            "created_at": created_at + timedelta(seconds=i),
+            "user_name": "Benchmark User",
+        }
+        for i in range(activity_logs)
+    ]
+    return {
+        "document_text": (DocumentWithText, document),
+        "summary_list": (List[SummaryResponse], summary_list),
+        "activity_logs": (List[ActivityLogResponse], activity_log_list),
+    }
+
+
+def _time(func: Callable[[], object], iterations: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def _scenario(durations_ms: List[float], body_bytes: int) -> dict:
+    latency = summarize_latencies(durations_ms)
+    return {
+        "latency_ms": latency,
+        "throughput_rps": round(1000 / latency["p50"], 1) if latency["p50"] else 0.0,
+        "bytes": body_bytes,
+    }
+
+
+def measure(model, content, iterations: int, warmup: int) -> Dict[str, dict]:
+    """Time every stage for one payload; scenario names are <stage> within the payload."""
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from pydantic import TypeAdapter
+    from app.core.compression import brotli
+    from app.core.config import settings
+
+    adapter = TypeAdapter(model)
+
+    def serialize():
+        # What FastAPI does with an endpoint's return value and its response_model
+        return adapter.dump_python(adapter.validate_python(content), mode="json")
+
+    serialized = serialize()
+    json_body = JSONResponse(serialized).body
+    orjson_body = ORJSONResponse(serialized).body
+    if len(json_body) != len(orjson_body):
+        # Both are compact UTF-8; a difference would mean orjson changed the output
+        print(f"warning: json and orjson bodies differ in size ({len(json_body)} vs {len(orjson_body)})", file=sys.stderr)
+
+    def gzip_body():
+        compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+        return compressor.compress(orjson_body) + compressor.flush()
+
+    results = {
+        "serialize": _scenario(_time(serialize, iterations, warmup), len(orjson_body)),
+        "render_json": _scenario(_time(lambda: JSONResponse(serialized), iterations, warmup), len(json_body)),
+        "render_orjson": _scenario(_time(lambda: ORJSONResponse(serialized), iterations, warmup), len(orjson_body)),
+        "gzip": _scenario(_time(gzip_body, iterations, warmup), len(gzip_body())),
+    }
+    if brotli is not None:
+        def brotli_body():
+            return brotli.compress(orjson_body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+        results["br"] = _scenario(_time(brotli_body, iterations, warmup), len(brotli_body()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300, help="Pages of extracted text in the document payload")
+    parser.add_argument("--summaries", type=int, default=100, help="Summaries in the list payload (list_summaries' default page)")
+    parser.add_argument("--activity-logs", type=int, default=200, help="Entries in the activity log payload (the largest page)")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--payloads", nargs="+", choices=PAYLOADS, default=PAYLOADS)
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/serialization-<revision>.json)")
+    args = parser.parse_args()
+
+    prepare_environment(tempfile.mkdtemp(prefix="serialization-bench-"))
+    from app.core.compression import brotli
+    from app.core.config import settings
+
+    payloads = build_payloads(args.pages, args.summaries, args.activity_logs)
+    scenarios = {}
+    print(f"{'scenario':<32}{'p50 ms':>10}{'p95 ms':>10}{'bytes':>12}")
+    for name in args.payloads:
+        model, content = payloads[name]
+        for stage, result in measure(model, content, args.iterations, args.warmup).items():
+            scenarios[f"{name}/{stage}"] = result
+            print(f"{name + '/' + stage:<32}{result['latency_ms']['p50']:>10}{result['latency_ms']['p95']:>10}{result['bytes']:>12}")
+
+    report = {
+        "meta": run_metadata(
+            pages=args.pages,
+            summaries=args.summaries,
+            activity_logs=args.activity_logs,
+            iterations=args.iterations,
+            warmup=args.warmup,
+            gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=settings.COMPRESSION_BROTLI_QUALITY if brotli is not None else None,
+        ),
+        "scenarios": scenarios,
+    }
+    print(f"Report written to {write_report(report, args.output, 'serialization')}")
+
+
+if __name__ == "__main__":
+    main()
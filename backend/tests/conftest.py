@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+# Settings without defaults; tests run against a throwaway SQLite database
+_TEST_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+for name, value in {
+    "DATABASE_URL": f"sqlite:///{_TEST_DIR}/test.db",
+    "SECRET_KEY": "test",
+    "GOOGLE_CLIENT_ID": "test",
+    "GOOGLE_CLIENT_SECRET": "test",
+    "GOOGLE_REDIRECT_URI": "http://localhost/callback",
+    "MICROSOFT_CLIENT_ID": "test",
+    "MICROSOFT_CLIENT_SECRET": "test",
+    "MICROSOFT_REDIRECT_URI": "http://localhost/callback",
+    "STRIPE_SECRET_KEY": "sk_test",
+    "STRIPE_PUBLISHABLE_KEY": "pk_test",
+    "STRIPE_WEBHOOK_SECRET": "whsec_test",
+    "GEMINI_API_KEY": "test",
+    "UPLOAD_DIR": f"{_TEST_DIR}/uploads",
+}.items():
+    os.environ.setdefault(name, value)
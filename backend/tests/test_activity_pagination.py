@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime
+from fastapi import Response
+from app.api.v1.endpoints.activity import list_activity_logs
+from app.core.database import Base, SessionLocal, engine
+from app.models import ActivityLog, ActivityType, Organization, User
+
+
+def _walk(db, user, limit: int) -> list:
+    """Targets of every page, following X-Next-Cursor until it's absent."""
+    seen, cursor = [], None
+    for _ in range(50):
+        response = Response()
+        page = asyncio.run(list_activity_logs(
+            response, limit=limit, action_type=None, user_id=None, start_date=None, end_date=None,
+            target_prefix=None, cursor=cursor, current_user=user, db=db
+        ))
+        seen.extend(item["target"] for item in page)
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return seen
+    raise AssertionError(f"Pagination didn't end; saw {seen}")
+
+
+def test_cursor_walks_tied_and_distinct_timestamps_once():
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        organization = Organization(name="Acme")
+        db.add(organization)
+        db.flush()
+        user = User(email="pages@example.com", full_name="Page Walker", organization_id=organization.id)
+        db.add(user)
+        db.flush()
+        # Server-default timestamps, to the second, mostly tied with each other
+        for number in range(6):
+            db.add(ActivityLog(user_id=user.id, action_type=ActivityType.UPLOAD, target=f"t{number}",
+                               organization_id=organization.id))
+        db.flush()
+        now = datetime.utcnow()
+        # Python-written ones, to the microsecond: some tied, some distinct
+        for number, microsecond in enumerate([0, 250_000, 250_000, 999_999], start=6):
+            db.add(ActivityLog(user_id=user.id, action_type=ActivityType.UPLOAD, target=f"t{number}",
+                               organization_id=organization.id, created_at=now.replace(microsecond=microsecond)))
+        db.commit()
+
+        for limit in (1, 3, 4, 10):
+            seen = _walk(db, user, limit)
+            assert sorted(seen) == sorted(f"t{number}" for number in range(10)), (limit, seen)
+    finally:
+        db.close()
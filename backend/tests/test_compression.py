@@ -0,0 +1,53 @@
+import asyncio
+from app.core.compression import CompressionMiddleware
+
+
+def _scope(accept_encoding: bytes = b"gzip") -> dict:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/documents/1/download",
+        "headers": [(b"accept-encoding", accept_encoding)],
+        "extensions": {"http.response.zerocopysend": {}},
+    }
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def _run(app, scope: dict) -> list:
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(CompressionMiddleware(app, minimum_size=10)(scope, _receive, send))
+    return sent
+
+
+def test_zerocopysend_gets_the_response_start_first():
+    async def download(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain"), (b"accept-ranges", b"bytes"), (b"content-length", b"5000")],
+        })
+        await send({"type": "http.response.zerocopysend", "file": 3, "count": 5000})
+
+    sent = _run(download, _scope())
+
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.zerocopysend"]
+    assert sent[0]["status"] == 200
+    assert (b"content-encoding", b"gzip") not in sent[0]["headers"]
+
+
+def test_json_body_is_compressed():
+    async def listing(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"[" + b"1," * 500 + b"1]"})
+
+    sent = _run(listing, _scope())
+
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.body"]
+    assert (b"content-encoding", b"gzip") in sent[0]["headers"]
@@ -0,0 +1,129 @@
+"""partition_activity_logs
+
+Revision ID: 5f2e7cb9984e
+Revises: 77a93ea0aa20
+Create Date: 2026-10-19 09:00:00.000000+00:00
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2e7cb9984e'
+down_revision: Union[str, None] = '77a93ea0aa20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Monthly partitions to create beyond the current month
+MONTHS_AHEAD = 3
+
+
+def _add_months(dt, months):
+    month_index = dt.month - 1 + months
+    return dt.replace(year=dt.year + month_index // 12, month=month_index % 12 + 1)
+
+
+def _upgrade_postgresql() -> None:
+    conn = op.get_bind()
+
+    # Move the existing table aside; its indexes keep their names, so drop them first
+    op.drop_index('ix_activity_logs_user_id', table_name='activity_logs')
+    op.drop_index('ix_activity_logs_organization_id', table_name='activity_logs')
+    op.drop_index('ix_activity_logs_created_at', table_name='activity_logs')
+    op.drop_index('ix_activity_logs_action_type', table_name='activity_logs')
+    op.execute("ALTER TABLE activity_logs RENAME TO activity_logs_legacy")
+
+    # The partition key must be part of the primary key
+    op.execute("""
+        CREATE TABLE activity_logs (
+            id VARCHAR NOT NULL,
+            user_id VARCHAR NOT NULL REFERENCES users (id),
+            action_type activitytype NOT NULL,
+            target VARCHAR NOT NULL,
+            details TEXT,
+            organization_id VARCHAR NOT NULL REFERENCES organizations (id),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE TABLE activity_logs_default PARTITION OF activity_logs DEFAULT")
+
+    oldest = conn.execute(sa.text("SELECT min(created_at) FROM activity_logs_legacy")).scalar()
+    current_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month = (oldest or current_month).replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    last_month = _add_months(current_month, MONTHS_AHEAD)
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE activity_logs_y{month.year}m{month.month:02d} PARTITION OF activity_logs "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month:%Y-%m-%d}')"
+        )
+        month = next_month
+
+    op.execute("""
+        INSERT INTO activity_logs (id, user_id, action_type, target, details, organization_id, created_at)
+        SELECT id, user_id, action_type, target, details, organization_id, coalesce(created_at, now())
+        FROM activity_logs_legacy
+    """)
+    op.execute("DROP TABLE activity_logs_legacy")
+
+    op.create_index('ix_activity_logs_action_type', 'activity_logs', ['action_type'], unique=False)
+    op.create_index('ix_activity_logs_created_at', 'activity_logs', ['created_at'], unique=False)
+    op.create_index('ix_activity_logs_organization_id', 'activity_logs', ['organization_id'], unique=False)
+    op.create_index('ix_activity_logs_user_id', 'activity_logs', ['user_id'], unique=False)
+
+
+def _downgrade_postgresql() -> None:
+    op.execute("ALTER TABLE activity_logs RENAME TO activity_logs_partitioned")
+    op.create_table('activity_logs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('action_type', sa.Enum('UPLOAD', 'DELETE', 'INVITE', 'ROLE_CHANGE', 'SETTINGS_UPDATE', 'WORKSPACE_CREATE', 'SUMMARY_CREATE', name='activitytype', create_type=False), nullable=False),
+    sa.Column('target', sa.String(), nullable=False),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('organization_id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', name='activity_logs_unpartitioned_pkey')
+    )
+    op.execute("INSERT INTO activity_logs SELECT * FROM activity_logs_partitioned")
+    # Dropping the parent drops every partition and its indexes
+    op.execute("DROP TABLE activity_logs_partitioned")
+    op.create_index('ix_activity_logs_action_type', 'activity_logs', ['action_type'], unique=False)
+    op.create_index('ix_activity_logs_created_at', 'activity_logs', ['created_at'], unique=False)
+    op.create_index('ix_activity_logs_organization_id', 'activity_logs', ['organization_id'], unique=False)
+    op.create_index('ix_activity_logs_user_id', 'activity_logs', ['user_id'], unique=False)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _upgrade_postgresql()
+        return
+
+    # SQLite has no partitioning; old rows are moved into an archive table instead
+    op.create_table('activity_logs_archive',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('action_type', sa.Enum('UPLOAD', 'DELETE', 'INVITE', 'ROLE_CHANGE', 'SETTINGS_UPDATE', 'WORKSPACE_CREATE', 'SUMMARY_CREATE', name='activitytype'), nullable=False),
+    sa.Column('target', sa.String(), nullable=False),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('organization_id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_activity_logs_archive_org_created', 'activity_logs_archive', ['organization_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _downgrade_postgresql()
+        return
+
+    op.execute("INSERT INTO activity_logs SELECT * FROM activity_logs_archive")
+    op.drop_index('ix_activity_logs_archive_org_created', table_name='activity_logs_archive')
+    op.drop_table('activity_logs_archive')
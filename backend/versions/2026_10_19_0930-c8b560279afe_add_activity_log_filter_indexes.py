@@ -0,0 +1,37 @@
+"""add_activity_log_filter_indexes
+
+Revision ID: c8b560279afe
+Revises: 5f2e7cb9984e
+Create Date: 2026-10-19 09:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8b560279afe'
+down_revision: Union[str, None] = '5f2e7cb9984e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # On PostgreSQL, indexes on the partitioned parent cascade to every partition
+    op.create_index('ix_activity_logs_org_action_created', 'activity_logs', ['organization_id', 'action_type', 'created_at'], unique=False)
+    op.create_index('ix_activity_logs_org_user_created', 'activity_logs', ['organization_id', 'user_id', 'created_at'], unique=False)
+
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_activity_logs_archive_org_action_created', 'activity_logs_archive', ['organization_id', 'action_type', 'created_at'], unique=False)
+        op.create_index('ix_activity_logs_archive_org_user_created', 'activity_logs_archive', ['organization_id', 'user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_activity_logs_archive_org_user_created', table_name='activity_logs_archive')
+        op.drop_index('ix_activity_logs_archive_org_action_created', table_name='activity_logs_archive')
+
+    op.drop_index('ix_activity_logs_org_user_created', table_name='activity_logs')
+    op.drop_index('ix_activity_logs_org_action_created', table_name='activity_logs')
@@ -0,0 +1,26 @@
+"""add_documents_org_created_index
+
+Revision ID: 807205d15fd0
+Revises: c8b560279afe
+Create Date: 2026-10-19 10:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '807205d15fd0'
+down_revision: Union[str, None] = 'c8b560279afe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_documents_org_created', 'documents', ['organization_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_org_created', table_name='documents')
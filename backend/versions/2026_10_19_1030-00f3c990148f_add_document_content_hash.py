@@ -0,0 +1,29 @@
+"""add_document_content_hash
+
+Revision ID: 00f3c990148f
+Revises: 807205d15fd0
+Create Date: 2026-10-19 10:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '00f3c990148f'
+down_revision: Union[str, None] = '807205d15fd0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows are hashed lazily on their first download
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
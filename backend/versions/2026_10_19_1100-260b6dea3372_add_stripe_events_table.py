@@ -0,0 +1,49 @@
+"""add_stripe_events_table
+
+Revision ID: 260b6dea3372
+Revises: 00f3c990148f
+Create Date: 2026-10-19 11:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '260b6dea3372'
+down_revision: Union[str, None] = '00f3c990148f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('stripe_events',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('customer_id', sa.String(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('stripe_created', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stripe_events_customer_id'), 'stripe_events', ['customer_id'], unique=False)
+    op.create_index(op.f('ix_stripe_events_status'), 'stripe_events', ['status'], unique=False)
+
+    with op.batch_alter_table('organizations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('stripe_event_created', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('organizations', schema=None) as batch_op:
+        batch_op.drop_column('stripe_event_created')
+
+    op.drop_index(op.f('ix_stripe_events_status'), table_name='stripe_events')
+    op.drop_index(op.f('ix_stripe_events_customer_id'), table_name='stripe_events')
+    op.drop_table('stripe_events')
@@ -0,0 +1,45 @@
+"""add_invoice_cache
+
+Revision ID: 9286d52a009f
+Revises: 260b6dea3372
+Create Date: 2026-10-19 11:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9286d52a009f'
+down_revision: Union[str, None] = '260b6dea3372'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('invoices',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('organization_id', sa.String(), nullable=False),
+    sa.Column('stripe_customer_id', sa.String(), nullable=False),
+    sa.Column('amount_paid', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('invoice_pdf', sa.String(), nullable=True),
+    sa.Column('stripe_created', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_invoices_organization_id'), 'invoices', ['organization_id'], unique=False)
+
+    with op.batch_alter_table('organizations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('invoices_synced_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('organizations', schema=None) as batch_op:
+        batch_op.drop_column('invoices_synced_at')
+
+    op.drop_index(op.f('ix_invoices_organization_id'), table_name='invoices')
+    op.drop_table('invoices')
@@ -0,0 +1,79 @@
+"""add_search_index
+
+Revision ID: 4b1d7e3a9c52
+Revises: 9286d52a009f
+Create Date: 2026-10-19 12:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1d7e3a9c52'
+down_revision: Union[str, None] = '9286d52a009f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.services.search
+SEARCH_CONFIG = 'english'
+MAX_INDEXED_CHARS = 500000
+
+
+def _upgrade_postgresql() -> None:
+    op.execute("""
+        CREATE TABLE search_index (
+            document_id VARCHAR NOT NULL PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,
+            organization_id VARCHAR NOT NULL REFERENCES organizations (id) ON DELETE CASCADE,
+            search_vector TSVECTOR NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+        )
+    """)
+    op.execute(f"""
+        INSERT INTO search_index (document_id, organization_id, search_vector)
+        SELECT d.id, d.organization_id,
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(d.original_filename, '')), 'A') ||
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(
+                (SELECT string_agg(s.summary_text, ' ') FROM summaries s WHERE s.document_id = d.id), ''
+            )), 'B') ||
+            setweight(to_tsvector('{SEARCH_CONFIG}', left(coalesce(d.extracted_text, ''), {MAX_INDEXED_CHARS})), 'D')
+        FROM documents d
+        WHERE d.status = 'completed'
+    """)
+    # Built after the backfill, which is much faster than maintaining it row by row
+    op.execute("CREATE INDEX ix_search_index_vector ON search_index USING GIN (search_vector)")
+    op.create_index('ix_search_index_organization_id', 'search_index', ['organization_id'], unique=False)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _upgrade_postgresql()
+        return
+
+    # SQLite: FTS5 stores its own copy of the text, which snippet() reads from
+    op.execute("""
+        CREATE VIRTUAL TABLE search_index_fts USING fts5(
+            document_id UNINDEXED, organization_id UNINDEXED, title, summary, body,
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute(f"""
+        INSERT INTO search_index_fts (document_id, organization_id, title, summary, body)
+        SELECT d.id, d.organization_id, d.original_filename,
+            (SELECT group_concat(s.summary_text, ' ') FROM summaries s WHERE s.document_id = d.id),
+            substr(coalesce(d.extracted_text, ''), 1, {MAX_INDEXED_CHARS})
+        FROM documents d
+        WHERE d.status = 'completed'
+    """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_search_index_organization_id', table_name='search_index')
+        op.execute("DROP INDEX ix_search_index_vector")
+        op.drop_table('search_index')
+        return
+
+    op.execute("DROP TABLE search_index_fts")
@@ -0,0 +1,47 @@
+"""add_document_chunks
+
+Revision ID: a63f0c2d81e4
+Revises: 4b1d7e3a9c52
+Create Date: 2026-10-19 12:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a63f0c2d81e4'
+down_revision: Union[str, None] = '4b1d7e3a9c52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('document_chunks',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('document_id', sa.String(), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('start_offset', sa.Integer(), nullable=False),
+    sa.Column('end_offset', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(), nullable=False),
+    sa.Column('embedder', sa.String(), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=False),
+    sa.Column('embedding_scale', sa.Float(), nullable=False),
+    sa.Column('organization_id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_document_chunks_document_id'), 'document_chunks', ['document_id'], unique=False)
+    op.create_index('ix_document_chunks_org_embedder', 'document_chunks', ['organization_id', 'embedder'], unique=False)
+    op.create_index('ix_document_chunks_org_hash', 'document_chunks', ['organization_id', 'content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_chunks_org_hash', table_name='document_chunks')
+    op.drop_index('ix_document_chunks_org_embedder', table_name='document_chunks')
+    op.drop_index(op.f('ix_document_chunks_document_id'), table_name='document_chunks')
+    op.drop_table('document_chunks')
@@ -0,0 +1,43 @@
+"""add_document_answers
+
+Revision ID: d27e95b1f0a8
+Revises: a63f0c2d81e4
+Create Date: 2026-10-19 13:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27e95b1f0a8'
+down_revision: Union[str, None] = 'a63f0c2d81e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('document_answers',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('document_id', sa.String(), nullable=False),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('question_hash', sa.String(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=False),
+    sa.Column('source_chunks', sa.String(), nullable=False),
+    sa.Column('tokens_used', sa.Integer(), nullable=True),
+    sa.Column('organization_id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_document_answers_document_question', 'document_answers', ['document_id', 'question_hash'], unique=True)
+    op.create_index(op.f('ix_document_answers_organization_id'), 'document_answers', ['organization_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_document_answers_organization_id'), table_name='document_answers')
+    op.drop_index('ix_document_answers_document_question', table_name='document_answers')
+    op.drop_table('document_answers')
@@ -0,0 +1,53 @@
+"""add_document_versions_and_chunk_summaries
+
+Revision ID: 6e0b9c4f2a17
+Revises: d27e95b1f0a8
+Create Date: 2026-10-19 13:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e0b9c4f2a17'
+down_revision: Union[str, None] = 'd27e95b1f0a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('previous_version_id', sa.String(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_documents_previous_version_id'), ['previous_version_id'], unique=False)
+        batch_op.create_foreign_key('fk_documents_previous_version_id', 'documents', ['previous_version_id'], ['id'])
+
+    op.create_table('chunk_summaries',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('content_hash', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('summary_text', sa.Text(), nullable=False),
+    sa.Column('tokens_used', sa.Integer(), nullable=True),
+    sa.Column('organization_id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_chunk_summaries_org_hash_model', 'chunk_summaries', ['organization_id', 'content_hash', 'model'], unique=True)
+    op.create_index('ix_chunk_summaries_org_last_used', 'chunk_summaries', ['organization_id', 'last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunk_summaries_org_last_used', table_name='chunk_summaries')
+    op.drop_index('ix_chunk_summaries_org_hash_model', table_name='chunk_summaries')
+    op.drop_table('chunk_summaries')
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_documents_previous_version_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_documents_previous_version_id'))
+        batch_op.drop_column('previous_version_id')
+        batch_op.drop_column('version')
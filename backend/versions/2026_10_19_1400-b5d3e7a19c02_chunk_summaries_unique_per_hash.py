@@ -0,0 +1,33 @@
+"""chunk_summaries_unique_per_hash
+
+Revision ID: b5d3e7a19c02
+Revises: 6e0b9c4f2a17
+Create Date: 2026-10-19 14:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d3e7a19c02'
+down_revision: Union[str, None] = '6e0b9c4f2a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Section summaries are looked up by content hash alone; keep one per hash
+    op.execute(sa.text(
+        "DELETE FROM chunk_summaries WHERE id NOT IN ("
+        "SELECT MIN(id) FROM chunk_summaries GROUP BY organization_id, content_hash)"
+    ))
+    op.drop_index('ix_chunk_summaries_org_hash_model', table_name='chunk_summaries')
+    op.create_index('ix_chunk_summaries_org_hash', 'chunk_summaries', ['organization_id', 'content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunk_summaries_org_hash', table_name='chunk_summaries')
+    op.create_index('ix_chunk_summaries_org_hash_model', 'chunk_summaries', ['organization_id', 'content_hash', 'model'], unique=True)
@@ -0,0 +1,28 @@
+"""add_organization_embedding_generation
+
+Revision ID: c81f4d2e6b90
+Revises: b5d3e7a19c02
+Create Date: 2026-10-19 14:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f4d2e6b90'
+down_revision: Union[str, None] = 'b5d3e7a19c02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('organizations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('embedding_generation', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('organizations', schema=None) as batch_op:
+        batch_op.drop_column('embedding_generation')
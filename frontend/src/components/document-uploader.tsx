@@ -8,6 +8,16 @@ import { Button } from "@/components/ui/button"
 import { Progress } from "@/components/ui/progress"
 import { useRouter } from "next/navigation"
 
+const SUPPORTED_TYPES = [
+  "application/pdf",
+  "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+  "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+  "text/plain",
+  "text/markdown",
+  "text/html",
+]
+const SUPPORTED_EXTENSIONS = [".pdf", ".docx", ".pptx", ".txt", ".md", ".html", ".htm"]
+
 export function DocumentUploader() {
   const router = useRouter()
   const [isDragging, setIsDragging] = useState(false)
@@ -30,7 +40,7 @@ export function DocumentUploader() {
     setIsDragging(false)
 
     const droppedFiles = Array.from(e.dataTransfer.files).filter(
-      (file) => file.type === "application/pdf" || file.type.includes("document"),
+      (file) => SUPPORTED_TYPES.includes(file.type) || SUPPORTED_EXTENSIONS.some((ext) => file.name.toLowerCase().endsWith(ext)),
     )
 
     setFiles((prev) => [...prev, ...droppedFiles])
@@ -144,7 +154,7 @@ export function DocumentUploader() {
           <input
             type="file"
             multiple
-            accept=".pdf,.docx,application/pdf,application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            accept={[...SUPPORTED_EXTENSIONS, ...SUPPORTED_TYPES].join(",")}
             onChange={handleFileSelect}
             className="hidden"
             id="file-upload"
@@ -155,7 +165,7 @@ export function DocumentUploader() {
             </Button>
           </label>
 
-          <p className="text-xs text-muted-foreground">Supports: PDF, DOCX (Office 2007+) only (Max 10MB per file)</p>
+          <p className="text-xs text-muted-foreground">Supports: PDF, DOCX, PPTX (Office 2007+), TXT, Markdown and HTML (Max 10MB per file)</p>
         </div>
       </Card>
 